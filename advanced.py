@@ -2,11 +2,13 @@
 Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
 '''
 
-import random
+import logging
 from beginner import AgentBeginner
 from regular import AdventurerRegular, AgentRegular, CityTileRegular
 from base import Player, Token, WindDirection, TileEdges, Card
 
+logger = logging.getLogger(__name__)
+
 class CardAdvanced(Card):
     '''Modifies the rules for objects from other Cartolan classes.
     '''
@@ -40,32 +42,32 @@ class CardAdvanced(Card):
         '''
         if isinstance(target, Token):
             player_name = target.player.name
-            print("Adding card buffs for "+player_name+"...")
+            logger.debug("Adding card buffs for %s...", player_name)
             for buff_attr in self.buffs:
                 #Check that the token has the attribute associated with the buff
                 current_attr_val = getattr(target, buff_attr, None) 
                 if current_attr_val is not None:
-                    print("For "+player_name+" "+target.__class__.__name__+", adding a buff to their "+buff_attr)
+                    logger.debug("For %s %s, adding a buff to their %s", player_name, target.__class__.__name__, buff_attr)
                     #Apply the buff
                     if self.buffs[buff_attr]["buff_type"] == "boost":
                         setattr(target, buff_attr, self.add(current_attr_val, self.buffs[buff_attr]["buff_val"]))
                     elif self.buffs[buff_attr]["buff_type"] == "new":
                         setattr(target, buff_attr, self.buffs[buff_attr]["buff_val"])
-                    print(player_name+" " +target.__class__.__name__+"'s "+buff_attr+" now has value "+str(getattr(target, buff_attr, None)))
+                    logger.debug("%s %s's %s now has value %s", player_name, target.__class__.__name__, buff_attr, getattr(target, buff_attr, None))
         elif isinstance(target, Player):
             player_name = target.name
-            print("Adding card buffs for "+player_name+"...")
+            logger.debug("Adding card buffs for %s...", player_name)
             for buff_attr in self.buffs:
                 #Check that the token has the attribute associated with the buff
                 current_attr_val = getattr(self.game, buff_attr, None)
                 #@TODO allow for games sharing all attributes with adventurers and agents...
                 if isinstance(current_attr_val, dict):
                     if current_attr_val[target] is not None:
-                        print("For "+player_name+", adding a buff to their "+buff_attr)
+                        logger.debug("For %s, adding a buff to their %s", player_name, buff_attr)
                         #Apply the buff
                         current_attr_val[target] = self.buffs[buff_attr]["buff_val"]
             #                    setattr(self.game, buff_attr, current_attr_val)
-                        print(player_name+"'s "+buff_attr+" now has value "+str(getattr(self.game, buff_attr, None)[target]))
+                        logger.debug("%s's %s now has value %s", player_name, buff_attr, getattr(self.game, buff_attr, None)[target])
         else:
             player_name = "Anonymous"
         
@@ -75,7 +77,7 @@ class CardAdvanced(Card):
         '''
         if isinstance(target, Token):
             player_name = target.player.name
-            print("Removing card buffs for "+player_name+"...")
+            logger.debug("Removing card buffs for %s...", player_name)
             for buff_attr in self.buffs:
                 #Check that the token has the attribute associated with the buff
                 current_attr_val = getattr(target, buff_attr, None) 
@@ -86,7 +88,7 @@ class CardAdvanced(Card):
                     elif self.buffs[buff_attr]["buff_type"] == "new":
                         #@TODO if a buff has been doubled up then it shouldn't be lost
                         setattr(target, buff_attr, getattr(self.game, buff_attr))
-                    print(player_name+"'s "+buff_attr+" now has value "+str(getattr(target, buff_attr, None)))
+                    logger.debug("%s's %s now has value %s", player_name, buff_attr, getattr(target, buff_attr, None))
         elif isinstance(target, Player):
             player_name = target.name
         else:
@@ -95,6 +97,10 @@ class CardAdvanced(Card):
 class AdventurerAdvanced(AdventurerRegular):
     '''Extends to allow a set of map tiles to be carried by each Adventurer in their chest and placed instead of a random one
     '''
+    __slots__ = ("agent_on_existing", "attacks_abandon", "character_card", "confiscate_treasure", "cost_agent_rest", "defence_rounds"
+                 , "discovery_cards", "free_rests", "num_free_rests", "pool_maps", "rechoose_at_agents", "rest_after_placing"
+                 , "rest_with_adventurers", "transfers_to_agents")
+
     def __init__(self, game, player, starting_city):
         super().__init__(game, player, starting_city)
         
@@ -133,7 +139,7 @@ class AdventurerAdvanced(AdventurerRegular):
         '''Lets the player choose a character card from a random subset
         '''
         character_cards = self.game.character_cards
-        card_options = random.sample(character_cards, k=self.game.num_character_choices[self.player])
+        card_options = self.game.rng.sample(character_cards, k=self.game.num_character_choices[self.player])
         self.character_card = self.player.choose_card(self, card_options)
         character_cards.remove(self.character_card)
         #Take on the changes to rules based on the Character card
@@ -149,7 +155,7 @@ class AdventurerAdvanced(AdventurerRegular):
     def discover_card(self, card):
         '''Adds a Discovery card to the Adventurer, modifying rules according to the card's buffs
         '''
-        print(self.player.name+"'s Adventurer has received the card of type "+card.card_type)
+        logger.info("%s's Adventurer has received the card of type %s", self.player.name, card.card_type)
         self.discovery_cards.append(card)
         card.apply_buffs(self)
         # Now some ugly fixes where the card buff alone wasn't enough for desired behaviour
@@ -168,7 +174,7 @@ class AdventurerAdvanced(AdventurerRegular):
     def lose_card(self, card):
         '''Removes a discovery card from the Adventurer, modifying rules according to what buffs were previously being provided
         '''
-        print(self.player.name+"'s Adventurer has lost a card of type "+card.card_type)
+        logger.info("%s's Adventurer has lost a card of type %s", self.player.name, card.card_type)
         self.discovery_cards.remove(card)
         card.remove_buffs(self)
         # Now some ugly fixes where the card buff alone wasn't enough for desired behaviour
@@ -257,7 +263,7 @@ class AdventurerAdvanced(AdventurerRegular):
         #If the target Adventurer has a defensive buff to force multiple rounds of attack then these need to be won first
         if isinstance(token, AdventurerAdvanced):
             for defence_round in range(0, token.defence_rounds-1):
-                if random.random() > self.attack_success_prob:
+                if self.game.rng.random() > self.attack_success_prob:
                     return False
         if super().attack(token):
             if isinstance(self.current_tile, CityTileRegular): #If on a city then there's no attacking
@@ -358,7 +364,7 @@ class AdventurerAdvanced(AdventurerRegular):
             agent = self.current_tile.agent
             if (agent.agents_arrest and not agent.is_dispossessed 
                 and self.pirate_token and not agent.player == self.player):
-                if random.random() < self.game.attack_success_prob:
+                if self.game.rng.random() < self.game.attack_success_prob:
                     AdventurerAdvanced.arrest(agent, self) #The arrest function should only use common features of the common parent Token class
 #                   self.current_tile.agent.arrest(self) #The arrest function should only use common features of the common parent Token class
                     self.end_turn()
@@ -368,6 +374,19 @@ class AdventurerAdvanced(AdventurerRegular):
                 #Offer the opportunity to move wealth around between Agents
                 self.transfer_to_agent()
     
+    def get_token_actions(self):
+        '''Extends regular to include attacks on poor Adventurers and rests with Adventurers, if buffs allow them
+        '''
+        actions = super().get_token_actions()
+        for adventurer in self.current_tile.adventurers:
+            if (self.attacks_abandon and adventurer.wealth == 0 
+                and not self == adventurer
+                and ("attack", None, adventurer) not in actions):
+                actions.append(("attack", None, adventurer))
+            if self.rest_with_adventurers and self.can_rest(adventurer):
+                actions.append(("rest", None, adventurer))
+        return actions
+    
     def arrest(self, pirate):
         '''Extends regular behaviour to allow capture of wealth for particular buffs.
         '''
@@ -384,6 +403,8 @@ class AdventurerAdvanced(AdventurerRegular):
 class AgentAdvanced(AgentRegular):
     '''Extends Regular mode to allow Agents' rules to be changed by cards
     '''
+    __slots__ = ("agents_arrest", "confiscate_treasure", "resting_refurnishes", "transfer_agent_earnings", "value_agent_trade", "value_arrest")
+
     def __init__(self, game, player, tile):
         super().__init__(game, player, tile)
         #Inherit player-specific characteristics that have been buffed
@@ -402,22 +423,22 @@ class AgentAdvanced(AgentRegular):
         '''
         if AgentRegular.give_rest(self, adventurer):
             if self.resting_refurnishes and adventurer.pirate_token:
-                print("Agent is refurnishing Adventurer, getting rid of their Pirate token.")
+                logger.debug("Agent is refurnishing Adventurer, getting rid of their Pirate token.")
                 adventurer.pirate_token = False
             if self.transfer_agent_earnings and self.wealth > 0:
-                print("Agent is moving income from providing rest directly to player's Vault")
-                self.game.player_wealths[self.player] += self.game.cost_agent_rest
+                logger.debug("Agent is moving income from providing rest directly to player's Vault")
+                self.game.change_vault_wealth(self.player, self.game.cost_agent_rest)
                 self.wealth -= self.game.cost_agent_rest
             if adventurer.rechoose_at_agents and adventurer.wealth > self.game.cost_refresh_maps:
-                print("Agent is offering Adventurer the chance to swap all their Chest maps.")
+                logger.debug("Agent is offering Adventurer the chance to swap all their Chest maps.")
                 if adventurer.player.check_buy_maps(adventurer):
                     adventurer.wealth -= self.game.cost_refresh_maps
                     adventurer.rechoose_chest_tiles()
             if adventurer.num_free_rests > 0:
-                print("Agent is refunding Adventurer for free rest perk,")
+                logger.debug("Agent is refunding Adventurer for free rest perk,")
                 adventurer.wealth += self.game.cost_agent_rest
                 self.wealth -= self.game.cost_agent_rest
-                adventurer.num_fre_rests -= 1 #a free rest has been used up
+                adventurer.num_free_rests -= 1 #a free rest has been used up
             return True
         else:
             return False
@@ -434,20 +455,20 @@ class AgentAdvanced(AgentRegular):
         #check whether Adventurer trading is from the same player
         elif adventurer.player == self.player:
             if self.transfer_agent_earnings:
-                print("Agent on tile "+str(self.current_tile.tile_position.longitude)+", "+str(self.current_tile.tile_position.latitude)+
-                      " has transferred trade income direct to the bank instead of to the Adventurer")
+                logger.debug("Agent on tile %s, %s has transferred trade income direct to the bank instead of to the Adventurer", self.current_tile.tile_position.longitude, self.current_tile.tile_position.latitude)
                 adventurer.wealth -= adventurer.value_trade
-                self.game.player_wealths[adventurer.player] += adventurer.value_trade
+                self.game.change_vault_wealth(adventurer.player, adventurer.value_trade)
         else:
             # retain wealth if they are a different player
-            print("Agent on tile " +str(self.current_tile.tile_position.longitude)+","
-                  +str(self.current_tile.tile_position.longitude)+ " has kept monopoly bonus")
+            logger.debug("Agent on tile %s,%s has kept monopoly bonus", self.current_tile.tile_position.longitude, self.current_tile.tile_position.longitude)
             self.wealth += self.value_agent_trade
         return True
 
 class CityTileAdvanced(CityTileRegular):
     '''Extends to replenish Chest Tiles, and offer purchase of refreshed chest tiles
     '''
+    __slots__ = ()
+
     def offer_purchases(self, adventurer):
        '''Extends to allow rule changes from cards
        '''
@@ -462,20 +483,19 @@ class CityTileAdvanced(CityTileRegular):
         Args:
             adventurer: the visiting adventurer
         '''
-        print(
-            "Offering " + adventurer.player.name + "'s adventurer the chance to upgrade the Adventurer with a Discovery/Manuscript card")
+        logger.debug("Offering %s's adventurer the chance to upgrade the Adventurer with a Discovery/Manuscript card", adventurer.player.name)
         available_cards = self.game.discovery_cards
         rejected_cards = []
         while (available_cards
                and adventurer.game.player_wealths[adventurer.player] >= self.game.cost_tech
                and adventurer.player.check_buy_tech(adventurer)):
 
-            print(adventurer.player.name + "'s has chosen to buy a Manuscript card")
+            logger.info("%s's has chosen to buy a Manuscript card", adventurer.player.name)
             card_options = []
             # Offer several cards, but only those which don't duplicate another one time card buff the Adventurer already has
             while (len(card_options) < self.game.num_discovery_choices[adventurer.player]
                    and available_cards):
-                new_tech_card = available_cards.pop(random.randint(0, len(available_cards) - 1))
+                new_tech_card = available_cards.pop(self.game.rng.randint(0, len(available_cards) - 1))
                 # Check whether this is a one off perk and then whether its a duplicate, returning it and drawing another if so
                 for buff_attr in new_tech_card.buffs:
                     if new_tech_card.buffs[buff_attr]["buff_type"] == "new":
@@ -491,7 +511,7 @@ class CityTileAdvanced(CityTileRegular):
                 chosen_card = adventurer.player.choose_card(adventurer, card_options)
                 card_options.remove(chosen_card)
                 adventurer.discover_card(chosen_card)
-                adventurer.game.player_wealths[adventurer.player] -= self.game.cost_tech
+                adventurer.game.change_vault_wealth(adventurer.player, -self.game.cost_tech)
             available_cards += card_options  # Return the remaining options to the deck
             available_cards += rejected_cards  # Return the cards that weren't suitable to the Discovery deck
 
@@ -512,12 +532,16 @@ class CityTileAdvanced(CityTileRegular):
 
 
 class CapitalTileAdvanced(CityTileAdvanced):
+    __slots__ = ()
+
     def __init__(self, game, tile_back = "water"
                  , wind_direction = WindDirection(True,True)
                  , tile_edges = TileEdges(True,True,True,True)):
         return super().__init__(game, wind_direction, tile_edges, True, True)
 
 class MythicalTileAdvanced(CityTileAdvanced):
+    __slots__ = ()
+
     def __init__(self, game, tile_back = "land"
                  , wind_direction = WindDirection(True,True)
                  , tile_edges = TileEdges(False,False,False,False)):
@@ -3,110 +3,296 @@ Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
 '''
 
 import random
-import copy
 import uuid
-from utils import replace_references
+import itertools
+import logging
+from utils import attribute_names
+
+logger = logging.getLogger(__name__)
 
 class Game:
     '''A template for maintaining a record of the game state in different modes of Cartolan.
     
     Methods:
-    __init__ taking a list full of Player objects
+    __init__ taking a list full of Player objects, and optionally an int seed for the game's random number generator
     establish_turn_order taking no arguments
+    fork taking no arguments, and returning an independent copy of the rules state
+    update_agent_network taking a Player
+    change_vault_wealth taking a Player and an int amount
+    update_wealth_standings taking no arguments
+    new_tile_id taking no arguments
     '''
     MAX_PLAYERS = 4
     MIN_PLAYERS = 2
     
-    def __init__(self, players):
+    def __init__(self, players, seed=None):
         if len(players) in range(self.MIN_PLAYERS, self.MAX_PLAYERS +1):
             self.players = players
 #            self.establish_turn_order()
         else: raise Exception("Game created with an invalid number of players: should be 2-4, but was " +str(len(players)))
         
+        #all chance in the game draws on its own generator, so that a seeded game can be replayed exactly
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.num_tiles_created = 0 #counts up to give each Tile in this game a unique id
+        
         #register this game with each of the players
         self.game_id = uuid.uuid4()
         for player in players:
             player.join_game(self)
         
         self.tile_piles = {}
-        self.play_area = {}
+        self.play_area = PlayArea()
+        self.undo_log = UndoLog(self)
         self.player_wealths = {}
         self.adventurers = {}
         self.agents = {}
+        #the network of each player's Agents, kept up to date as Agents are placed, moved, dismissed and dispossessed
+        #these are estimates from distances as the crow flies, which ignore the wind, the land and any gaps in the map
+        self.estimated_agent_network = {} #for each player, the Agents that each of their Agents are within a single turn's moves of as the crow flies
+        self.estimated_agent_distances = {} #for each player, the moves as the crow flies between each pair of their Agents
+        self.agent_routes = {} #for each player, their Agents in the order of a route out from the first city
+        self.estimated_route_values = {} #for each player, the number of Agents in the largest network that an Adventurer might rest its way along
         for player in players:
             self.player_wealths[player] = 0
             self.adventurers[player] = []
             self.agents[player] = []
+            self.estimated_agent_network[player] = {}
+            self.estimated_agent_distances[player] = {}
+            self.agent_routes[player] = ()
+            self.estimated_route_values[player] = 0
         
         self.game_started = False #Keep track of whether the game is running
         self.turn = 0
         
-        #some information to keep track of centrally for players to make decisions
+        #some information to keep track of centrally for players to make decisions, kept up to date as Vaults change
         self.winning_player = None
         self.max_wealth = 0
         self.total_vault_wealth =  0
         self.total_chest_wealth = 0
         self.wealth_difference = 0
         self.num_failed_explorations = 0
-#         self.agent_network = None #placeholder to keep track of which routes are possible in a single turn
-#         self.agent_distances = [[]] #placeholder to keep track of where trade routes could be built
-#         self.most_lucrative_route_value = 0
-#         self.most_lucrative_route_player = None
+        self.estimated_most_lucrative_route_value = 0
+        self.estimated_most_lucrative_route_player = None
 
     def save(self):
-        '''Backs up the game and tokens' states, so that they can be restored later e.g. to undo a mistake
-        '''
-#        print("Backing up game state")
-        self.backup = None #Avoid recursively backing up deep copies of earlier versions
-        self.backup = copy.deepcopy(self)
-#        memo = {}
-#        try: 
-#            self.backup = copy.deepcopy(self, memo)
-#        except Exception as error:
-#            print(error)
-#            print(memo)
-#            exit()
+        '''Sets a checkpoint that the game can be restored to later e.g. to undo a mistake, logging changes from then on
+        '''
+        self.undo_log.start()
         
     def restore(self):
-        '''Restores a previous game state.
-        
-        Thanks to Nithin: https://stackoverflow.com/questions/1216356/is-it-safe-to-replace-a-self-object-by-another-object-of-the-same-type-in-a-meth
-        '''
-        valid_classes = [Game, Token, Card, Tile, TilePile, list, dict]
-        memo = []
-        replace_references(self.backup, self, self.backup, memo, valid_classes) #Make sure that all elements within the backup copy of the game refer up to the true game
-#        print("Investigated objects:")
-#        print(memo)
-        adventurers = self.adventurers #retain the list currently used for adventurers
-        self.__dict__.update(self.backup.__dict__)
-        #Now for each adventurer return to the original object reference, but 
-        #swap its attributes for the deep copy's - so that restoring in the 
-        #middle of an Adventurer's move doesn't break references around it
-        for player in adventurers:
-            for adventurer in adventurers[player]:
-                adventurer_num = adventurers[player].index(adventurer)
-                if len(self.adventurers[player]) > adventurer_num:
-                    restored_copy = self.adventurers[player][adventurer_num]
-    #                print("Restoring attributes of "+str(adventurer)+" from backup "+str(restored_copy)+"but keeping the reference.")
-                    adventurer.__dict__.update(restored_copy.__dict__)
-    #                #Because the adventurers came from the deep-copied game they will have references to the "copy" that has been abandoned
-#                    adventurer.game = self
-                    #adventurers are also referenced by tiles, so these will need updating
-                    memo = []
-                    replace_references(restored_copy, adventurer, self, memo, valid_classes)
-#                    print("Investigated objects:")
-#                    print(memo)
-                else:
-                    #If this adventurer wasn't in the backup, then discard it
-                    adventurers[player].pop(adventurer)
-            for agent in self.agents[player]:
-                #Because the agents came from the deep-copied game they will have references to the "copy" that has been abandoned
-                agent.game = self        
-#        print("Replacing the new replica of the game's Adventurer's list, "+str(self.adventurers)+", with the original full of original Adventurer references, "+str(adventurers))
-        self.adventurers = adventurers
-        #Tiles may still have references to the 
-        #Now make sure there is a backup still in place for subsequent restores (the backup had no backup iteself)
-        self.save()
+        '''Restores the game state at the last checkpoint, by reversing the changes logged since then
+        '''
+        self.undo_log.undo()
+    
+    def fork(self, players=None):
+        '''Makes an independent copy of the rules state of the game, e.g. for players to search ahead through possible moves
+        
+        The fork shares the Player objects and game_id, so that players can act in it, but starts with no undo history. 
+        Tile edges and positions never change once made, so are shared rather than copied, as are the Tiles waiting in 
+        piles, which are only copied as they are drawn in the fork.
+        
+        Arguments:
+        players takes an optional dict of stand-in Players to act in the fork, keyed by the Players they replace
+        '''
+        fork = object.__new__(type(self))
+        memo = {id(self):fork}
+        if players is not None:
+            for player in players:
+                memo[id(player)] = players[player]
+        tile_piles = []
+        fork_dict = fork.__dict__
+        for attribute_name, value in self.__dict__.items():
+            if value is not None and not isinstance(value, FORK_SHARED_TYPES):
+                value = self.fork_value(value, memo, tile_piles)
+            fork_dict[attribute_name] = value
+        #piles are filled last, so that any of their tiles already copied for the fork, like undiscovered cities, are not shared
+        for tile_pile, forked_pile in tile_piles:
+            forked_pile.tiles = [memo.get(id(tile), tile) for tile in tile_pile.tiles]
+        return fork
+    
+    def fork_value(self, value, memo, tile_piles):
+        '''Copies part of the game's state for a fork of the game, reusing copies already made and sharing what won't change
+        
+        Arguments:
+        value takes the part of the game state to copy
+        memo takes a dict of the copies made so far, keyed by the id of the original
+        tile_piles takes a list of the TilePiles copied so far, paired with their copy, to be filled once all else is copied
+        '''
+        if value is None or isinstance(value, FORK_SHARED_TYPES):
+            return value
+        forked = memo.get(id(value))
+        if forked is not None:
+            return forked
+        if isinstance(value, Player):
+            return value
+        elif isinstance(value, Tile):
+            #everything about a tile but its tokens is a shared value or this game
+            forked = object.__new__(type(value))
+            memo[id(value)] = forked
+            for attribute_name in slot_names(type(value)):
+                setattr(forked, attribute_name, getattr(value, attribute_name))
+            forked.game = memo[id(self)]
+            forked.adventurers = [self.fork_value(adventurer, memo, tile_piles) for adventurer in value.adventurers]
+            if value.agent is not None:
+                forked.agent = self.fork_value(value.agent, memo, tile_piles)
+        elif isinstance(value, Token):
+            forked = object.__new__(type(value))
+            memo[id(value)] = forked
+            for attribute_name in slot_names(type(value)):
+                try:
+                    attribute = getattr(value, attribute_name)
+                except AttributeError:
+                    continue #this attribute isn't used in this game mode
+                if attribute is not None and not isinstance(attribute, FORK_SHARED_TYPES):
+                    attribute = self.fork_value(attribute, memo, tile_piles)
+                setattr(forked, attribute_name, attribute)
+        elif isinstance(value, list):
+            forked = []
+            memo[id(value)] = forked
+            forked.extend([self.fork_value(element, memo, tile_piles) for element in value])
+        elif isinstance(value, dict):
+            forked = {}
+            memo[id(value)] = forked
+            for key in value:
+                forked[self.fork_value(key, memo, tile_piles)] = self.fork_value(value[key], memo, tile_piles)
+        elif isinstance(value, (set, tuple)):
+            forked = type(value)(self.fork_value(element, memo, tile_piles) for element in value)
+            memo[id(value)] = forked
+        elif isinstance(value, Card):
+            #cards' buffs are fixed, so only the game they apply to needs changing
+            forked = object.__new__(type(value))
+            forked.__dict__.update(value.__dict__)
+            forked.game = memo[id(self)]
+            memo[id(value)] = forked
+        elif isinstance(value, TilePile):
+            forked = TilePile(value.tile_back, [])
+            forked.game = memo[id(self)]
+            memo[id(value)] = forked
+            tile_piles.append((value, forked))
+        elif isinstance(value, PlayArea):
+            forked = object.__new__(PlayArea)
+            memo[id(value)] = forked
+            forked.__dict__.update(value.__dict__)
+            forked.grid = list(value.grid)
+            forked.latitudes = {longitude:list(value.latitudes[longitude]) for longitude in value.latitudes}
+            forked.frontier = dict(value.frontier)
+            forked.routes = {}
+            for longitude in value.latitudes:
+                column = (longitude - value.min_longitude) * value.height - value.min_latitude
+                for latitude in value.latitudes[longitude]:
+                    forked.grid[column + latitude] = self.fork_value(value.grid[column + latitude], memo, tile_piles)
+        elif isinstance(value, UndoLog):
+            forked = UndoLog(memo[id(self)])
+            memo[id(value)] = forked
+        elif isinstance(value, random.Random):
+            forked = random.Random.__new__(random.Random) #skip seeding from the system, as the state is about to be replaced
+            forked.setstate(value.getstate())
+            memo[id(value)] = forked
+        else:
+            return value
+        return forked
+    
+    def update_agent_network(self, player):
+        '''Rebuilds the estimated network of a player's Agents after one is placed, moved, dismissed or dispossessed
+        
+        Agents are estimated to be in reach of one another if they are within a turn's moves as the crow flies, 
+        rather than searching routes, which would need an Adventurer to search with and would go stale as tiles are placed.
+        Only the one player's Agents are revisited, and each of their records is replaced rather than changed in place, 
+        so that undoing back to a checkpoint restores them along with the rest of the game.
+        
+        Arguments:
+        player takes the Player whose Agents have changed
+        '''
+        if not player in self.estimated_agent_network:
+            return #the game is still being set up
+        agents = [agent for agent in self.agents[player] 
+                  if agent.current_tile is not None and not agent.is_dispossessed]
+        positions = {agent:agent.current_tile.tile_position for agent in agents}
+        network = {}
+        distances = {}
+        for agent in agents:
+            position = positions[agent]
+            reachable = []
+            for other_agent in agents:
+                if other_agent is agent:
+                    continue
+                other_position = positions[other_agent]
+                distance = abs(position.longitude - other_position.longitude) + abs(position.latitude - other_position.latitude)
+                distances[(agent, other_agent)] = distance
+                if distance <= self.max_downwind_moves:
+                    reachable.append(other_agent)
+            network[agent] = tuple(reachable)
+        self.estimated_agent_network[player] = network
+        self.estimated_agent_distances[player] = distances
+        
+        #order the Agents by visiting the nearest one not yet visited, starting from the first city
+        route = []
+        remaining = list(agents)
+        if self.cities:
+            longitude, latitude = self.cities[0].tile_position.longitude, self.cities[0].tile_position.latitude
+        elif agents:
+            longitude, latitude = positions[agents[0]].longitude, positions[agents[0]].latitude
+        while remaining:
+            nearest_agent = min(remaining, key=lambda agent: abs(positions[agent].longitude - longitude) + abs(positions[agent].latitude - latitude))
+            remaining.remove(nearest_agent)
+            route.append(nearest_agent)
+            longitude, latitude = positions[nearest_agent].longitude, positions[nearest_agent].latitude
+        self.agent_routes[player] = tuple(route)
+        
+        #the route value is the size of the largest group of Agents that are each a single turn from another
+        route_value = 0
+        grouped = set()
+        for agent in agents:
+            if agent in grouped:
+                continue
+            group = [agent]
+            grouped.add(agent)
+            for group_agent in group:
+                for other_agent in network[group_agent]:
+                    if not other_agent in grouped:
+                        grouped.add(other_agent)
+                        group.append(other_agent)
+            route_value = max(route_value, len(group))
+        self.estimated_route_values[player] = route_value
+        self.estimated_most_lucrative_route_value = 0
+        self.estimated_most_lucrative_route_player = None
+        for other_player in self.players:
+            if self.estimated_route_values[other_player] > self.estimated_most_lucrative_route_value:
+                self.estimated_most_lucrative_route_value = self.estimated_route_values[other_player]
+                self.estimated_most_lucrative_route_player = other_player
+    
+    def change_vault_wealth(self, player, amount):
+        '''Adds wealth to a player's Vault, or takes it away for a negative amount, keeping the game's totals and standings up to date
+        
+        Arguments:
+        player takes the Player whose Vault changes
+        amount takes an int for the change in wealth
+        '''
+        self.player_wealths[player] += amount
+        self.total_vault_wealth += amount
+        self.update_wealth_standings()
+    
+    def update_wealth_standings(self):
+        '''Works out which player's Vault is wealthiest and by how much they lead the next wealthiest
+        '''
+        self.max_wealth = 0
+        self.wealth_difference = 0
+        for player in self.players:
+            # is this player wealthier than the wealthiest player checked so far?
+            if self.player_wealths[player] > self.max_wealth:
+                self.wealth_difference = self.player_wealths[player] - self.max_wealth
+                self.max_wealth = self.player_wealths[player]
+                self.winning_player = player
+            # if this player is behind in wealth, are they still closer than anyone else?
+            elif self.max_wealth - self.player_wealths[player] < self.wealth_difference:
+                    self.wealth_difference = self.max_wealth - self.player_wealths[player]
+    
+    def new_tile_id(self):
+        '''Gives the next in a sequence of int ids for the Tiles created in this game
+        '''
+        self.num_tiles_created += 1
+        return self.num_tiles_created
     
 #    def establish_turn_order(self):
 #        '''Randomises the order in which Player objects will be activated'''
@@ -119,16 +305,23 @@ class Player:
     __init__ taking a name string
     
     Interfaces:
-    continue_turn; continue_move 
+    continue_turn; continue_move; end_game
     '''
+    id_counter = itertools.count() #players are created before their game, so are numbered rather than drawing from any game's random numbers
+    
     def __init__(self, name = "red"):
         self.name = name
         self.games = {}
-        self.player_id = name+str(random.random())
+        self.player_id = name+str(next(self.id_counter))
         
     def __hash__(self):
         return hash(self.player_id)
     
+    def __reduce_ex__(self, protocol):
+        '''Pickles the player so that it is hashable as soon as it is recreated, for games sent to other processes
+        '''
+        return (restore_with_id, (type(self), "player_id", self.player_id)) + super().__reduce_ex__(protocol)[2:]
+    
     def __eq__(self, other):
         if isinstance(other, Player):
             return self.player_id == other.player_id
@@ -165,6 +358,10 @@ class Player:
     def continue_turn(self, adventurer):
         '''placeholder for responding to the state of the game'''
         pass
+    
+    def end_game(self, game):
+        '''placeholder for letting go of anything kept for a game once it is over'''
+        pass
 
 class Token:
     '''A template for actual tokens used in play.
@@ -175,6 +372,8 @@ class Token:
     Interfaces:
     None
     '''
+    __slots__ = ("game", "player", "current_tile", "wealth", "route", "turn_route")
+    
     def __init__(self, game, player, current_tile):
         self.game = game
         self.player = player
@@ -193,11 +392,16 @@ class Card:
         self.game = game
         self.card_type = card_type
         self.buffs = None
-        self.card_id = card_type+str(random.random())
+        self.card_id = card_type+str(game.rng.random())
         
     def __hash__(self):
         return hash(self.card_id)
     
+    def __reduce_ex__(self, protocol):
+        '''Pickles the card so that it is hashable as soon as it is recreated, for games sent to other processes
+        '''
+        return (restore_with_id, (type(self), "card_id", self.card_id)) + super().__reduce_ex__(protocol)[2:]
+    
     def __eq__(self, other):
         if isinstance(other, Card):
             return self.card_id == other.card_id
@@ -218,10 +422,13 @@ class Adventurer(Token):
     
     Methods:
     __init__ taking a Game and a Player and a Tile from the Cartolan module
+    record_action taking no arguments
     
     Interfaces:
     move; explore; discover; trade; rest; 
     '''
+    __slots__ = ("turns_moved",)
+    
     def __init__(self, game, player, current_tile):
         super().__init__(game, player, current_tile)
         game.adventurers[player].append(self)
@@ -235,6 +442,25 @@ class Adventurer(Token):
 #        '''
 #        return self
     
+    def record_action(self):
+        '''Logs the state around this Adventurer before it takes an action that a player might later want to undo
+        
+        Later changes further afield, like moving onto another tile, are logged as they happen
+        '''
+        undo_log = self.game.undo_log
+        if undo_log.recording:
+            game = self.game
+            undo_log.capture(self)
+            undo_log.capture(self.current_tile)
+            undo_log.capture(self.current_tile.agent)
+            for adventurer in self.current_tile.adventurers:
+                undo_log.capture(adventurer)
+            for agent in game.agents[self.player]:
+                undo_log.capture(agent)
+                undo_log.capture(agent.current_tile)
+            for tile_pile in list(game.tile_piles.values()) + list(getattr(game, "discard_piles", {}).values()):
+                undo_log.capture(tile_pile)
+    
     def move(self, compass_point):
         '''placeholder for movement'''
         pass
@@ -268,9 +494,13 @@ class Agent(Token):
     Interfaces:
     give_rest; manage_trade 
     '''
+    __slots__ = ("is_dispossessed",)
+    
     def __init__(self, game, player, current_tile):
+        self.is_dispossessed = False #only Regular and Advanced modes let Agents be dispossessed
         super().__init__(game, player, current_tile)
         game.agents[player].append(self)
+        game.update_agent_network(player)
         
     def give_rest(self, adventurer):
         '''placeholder for resting adventurers'''
@@ -281,8 +511,327 @@ class Agent(Token):
         pass
 
 
+class UndoLog:
+    '''Logs reversible changes to a game as it is played, so that it can be rolled back to a checkpoint
+    
+    Rather than copying the whole game at the checkpoint, only the Game and its tokens are captured then. Tiles and 
+    piles are captured just before they first change, and each Tile laid is logged so that it can be lifted again. 
+    Undoing then costs in proportion to what was changed, not the size of the map.
+    Nothing is logged until a checkpoint is set, so simulations pay only for checking whether to record.
+    
+    Methods:
+    __init__ taking the Game to log
+    start taking no arguments, to set a checkpoint and begin recording
+    stop taking no arguments
+    capture taking an object from the game, such as a Token, Tile, TilePile or the Game itself
+    record_placement taking a Tile and two int coordinates
+    undo taking no arguments, to return to the last checkpoint
+    '''
+    UNCAPTURED = ["undo_log", "play_area"] #tracked through placements rather than copied
+    
+    def __init__(self, game):
+        self.game = game
+        self.recording = False
+        self.commands = [] #pairs of an undo function and its arguments, in the order changes were made
+        self.captured = set() #ids of the objects captured since the checkpoint, which the log keeps alive
+    
+    def start(self):
+        '''Sets a checkpoint to undo back to, and records changes from then on
+        '''
+        self.commands = []
+        self.captured = set()
+        self.recording = True
+        #players can draw random numbers and adjust their tokens between actions, so the game and tokens are captured up front
+        game = self.game
+        self.capture(game)
+        for player in game.players:
+            for adventurer in game.adventurers[player]:
+                self.capture(adventurer)
+            for agent in game.agents[player]:
+                self.capture(agent)
+    
+    def stop(self):
+        '''Stops recording, and forgets the changes since the checkpoint
+        '''
+        self.commands = []
+        self.captured = set()
+        self.recording = False
+    
+    def snapshot(self, value, depth=2):
+        '''Pairs a value with a copy of its contents, nested to the given depth for containers of containers
+        '''
+        if depth > 0:
+            if isinstance(value, list):
+                return (value, [self.snapshot(element, depth - 1) for element in value])
+            elif isinstance(value, dict):
+                return (value, [(key, self.snapshot(value[key], depth - 1)) for key in value])
+            elif isinstance(value, set):
+                return (value, set(value))
+            elif isinstance(value, random.Random):
+                return (value, value.getstate())
+        return (value, None)
+    
+    def revert(self, snapshot):
+        '''Puts a snapshot's contents back into the same container, so that other references to it see the restored contents
+        '''
+        value, contents = snapshot
+        if contents is not None:
+            if isinstance(value, list):
+                value[:] = [self.revert(element) for element in contents]
+            elif isinstance(value, dict):
+                value.clear()
+                for key, element in contents:
+                    value[key] = self.revert(element)
+            elif isinstance(value, set):
+                value.clear()
+                value.update(contents)
+            elif isinstance(value, random.Random):
+                value.setstate(contents)
+        return value
+    
+    def capture(self, subject):
+        '''Logs the attributes of an object the first time it is about to change after the checkpoint
+        '''
+        if subject is None or id(subject) in self.captured:
+            return
+        self.captured.add(id(subject))
+        state = {}
+        for attribute_name in attribute_names(subject):
+            if not attribute_name in self.UNCAPTURED:
+                state[attribute_name] = self.snapshot(getattr(subject, attribute_name))
+        self.commands.append((self.restore_state, (subject, state)))
+    
+    def restore_state(self, subject, state):
+        '''Returns an object's attributes to those captured, dropping any that have been set since
+        '''
+        for attribute_name in attribute_names(subject):
+            if not attribute_name in state and not attribute_name in self.UNCAPTURED:
+                delattr(subject, attribute_name)
+        for attribute_name in state:
+            setattr(subject, attribute_name, self.revert(state[attribute_name]))
+    
+    def record_placement(self, tile, longitude, latitude):
+        '''Logs a Tile being laid in the PlayArea, so that it can be lifted again
+        '''
+        self.commands.append((self.game.play_area.remove_tile, (longitude, latitude)))
+    
+    def undo(self):
+        '''Reverses the logged changes, latest first, and then sets a fresh checkpoint at the restored state
+        '''
+        for undo_function, arguments in reversed(self.commands):
+            undo_function(*arguments)
+        logger.info("Undid %s logged changes to the game", len(self.commands))
+        self.start()
+
+
+class PlayArea:
+    '''The grid of Tiles laid in a game of Cartolan, held in a flat array that grows in any direction around an offset origin
+    
+    Looking up the Tile at some coordinates is just index arithmetic, rather than a chain of dict lookups. For existing 
+    callers the grid can still be read like the dict of dicts, keyed by longitude then latitude, that it replaced.
+    
+    Methods:
+    __init__ taking no arguments
+    get_tile taking two int coordinates, and returning a Tile or None
+    get_neighbour taking two int coordinates and a compass point string, and returning a Tile or None
+    set_tile taking two int coordinates and a Tile
+    remove_tile taking two int coordinates
+    get_adjoining_edges taking two int coordinates, and returning a tuple of whether the edges facing them are water
+    update_frontier taking two int coordinates
+    all_tiles taking no arguments
+    get, keys, values, items and the usual dict operators, for reading columns of tiles by longitude
+    '''
+    GROWTH_MARGIN = 8 #spare rows and columns to add beyond a new tile whenever the grid has to grow
+    NEIGHBOUR_INCREMENTS = {"n":(0, 1), "north":(0, 1), "e":(1, 0), "east":(1, 0)
+                            , "s":(0, -1), "south":(0, -1), "w":(-1, 0), "west":(-1, 0)}
+    
+    def __init__(self):
+        self.min_longitude = 0
+        self.min_latitude = 0
+        self.width = 0
+        self.height = 0
+        self.grid = [] #column by column, so index = (longitude - min_longitude) * height + (latitude - min_latitude)
+        self.latitudes = {} #the occupied latitudes at each longitude, in the order they were laid, so iteration matches the old dicts
+        self.num_tiles = 0
+        self.routes = {} #the next steps of routes found over the map as it stands, which any change to the map clears
+        #the empty spaces next to laid tiles, keyed by coordinates, with whether the edges facing them from the north, east, south and west are water, or None with no tile there
+        self.frontier = {}
+    
+    def get_tile(self, longitude, latitude):
+        '''Returns the Tile at the given coordinates, or None if there isn't one'''
+        column = longitude - self.min_longitude
+        row = latitude - self.min_latitude
+        if 0 <= column < self.width and 0 <= row < self.height:
+            return self.grid[column * self.height + row]
+        return None
+    
+    def get_neighbour(self, longitude, latitude, compass_point):
+        '''Returns the Tile next to the given coordinates in a compass direction, or None if there isn't one'''
+        longitude_increment, latitude_increment = self.NEIGHBOUR_INCREMENTS[compass_point.lower()]
+        return self.get_tile(longitude + longitude_increment, latitude + latitude_increment)
+    
+    def set_tile(self, longitude, latitude, tile):
+        '''Records a Tile at the given coordinates, growing the grid if they lie outside it'''
+        column = longitude - self.min_longitude
+        row = latitude - self.min_latitude
+        if not (0 <= column < self.width and 0 <= row < self.height):
+            self.grow(longitude, latitude)
+            column = longitude - self.min_longitude
+            row = latitude - self.min_latitude
+        index = column * self.height + row
+        if self.grid[index] is None:
+            self.latitudes.setdefault(longitude, []).append(latitude)
+            self.num_tiles += 1
+        self.grid[index] = tile
+        self.routes = {}
+        self.update_frontier(longitude, latitude)
+    
+    def remove_tile(self, longitude, latitude):
+        '''Clears the Tile at the given coordinates, e.g. when undoing its placement'''
+        column = longitude - self.min_longitude
+        row = latitude - self.min_latitude
+        if 0 <= column < self.width and 0 <= row < self.height and self.grid[column * self.height + row] is not None:
+            self.grid[column * self.height + row] = None
+            self.latitudes[longitude].remove(latitude)
+            if not self.latitudes[longitude]:
+                del self.latitudes[longitude]
+            self.num_tiles -= 1
+            self.routes = {}
+            self.update_frontier(longitude, latitude)
+    
+    def get_adjoining_edges(self, longitude, latitude):
+        '''Gives whether the edges of neighbouring tiles that face some coordinates are water, clockwise from the north, or None where there is no tile'''
+        adjoining_edges = []
+        for compass_index, (longitude_increment, latitude_increment) in enumerate(FRONTIER_INCREMENTS):
+            neighbour_tile = self.get_tile(longitude + longitude_increment, latitude + latitude_increment)
+            if neighbour_tile is None:
+                adjoining_edges.append(None)
+            else:
+                #it is the facing edge that matters, e.g. the eastern edge of the tile to the west
+                adjoining_edges.append(EDGE_WATER[(neighbour_tile.edge_mask * 4 + neighbour_tile.orientation) * 4 + (compass_index + 2) % 4])
+        return tuple(adjoining_edges)
+    
+    def update_frontier(self, longitude, latitude):
+        '''Brings the frontier up to date around coordinates where a tile has just been laid or lifted'''
+        for longitude_increment, latitude_increment in ((0, 0),) + FRONTIER_INCREMENTS:
+            space_longitude, space_latitude = longitude + longitude_increment, latitude + latitude_increment
+            adjoining_edges = None
+            if self.get_tile(space_longitude, space_latitude) is None:
+                adjoining_edges = self.get_adjoining_edges(space_longitude, space_latitude)
+            if adjoining_edges is None or adjoining_edges == (None, None, None, None):
+                self.frontier.pop((space_longitude, space_latitude), None)
+            else:
+                self.frontier[(space_longitude, space_latitude)] = adjoining_edges
+    
+    def grow(self, longitude, latitude):
+        '''Reallocates the grid so that it covers the given coordinates, with a margin to spare'''
+        if self.width == 0:
+            min_longitude, max_longitude = longitude, longitude
+            min_latitude, max_latitude = latitude, latitude
+        else:
+            min_longitude = min(self.min_longitude, longitude)
+            max_longitude = max(self.min_longitude + self.width - 1, longitude)
+            min_latitude = min(self.min_latitude, latitude)
+            max_latitude = max(self.min_latitude + self.height - 1, latitude)
+        #Only extend in the directions that were exceeded, so the grid grows in step with the map
+        if longitude < self.min_longitude or self.width == 0:
+            min_longitude -= self.GROWTH_MARGIN
+        if longitude >= self.min_longitude + self.width or self.width == 0:
+            max_longitude += self.GROWTH_MARGIN
+        if latitude < self.min_latitude or self.height == 0:
+            min_latitude -= self.GROWTH_MARGIN
+        if latitude >= self.min_latitude + self.height or self.height == 0:
+            max_latitude += self.GROWTH_MARGIN
+        width = max_longitude - min_longitude + 1
+        height = max_latitude - min_latitude + 1
+        grid = [None] * (width * height)
+        for tile_longitude in self.latitudes:
+            for tile_latitude in self.latitudes[tile_longitude]:
+                grid[(tile_longitude - min_longitude) * height + tile_latitude - min_latitude] = self.get_tile(tile_longitude, tile_latitude)
+        self.grid = grid
+        self.min_longitude, self.min_latitude = min_longitude, min_latitude
+        self.width, self.height = width, height
+    
+    def all_tiles(self):
+        '''Lists every Tile laid, column by column in the order they were laid'''
+        return [self.get_tile(longitude, latitude) for longitude in self.latitudes for latitude in self.latitudes[longitude]]
+    
+    def __getitem__(self, longitude):
+        if not longitude in self.latitudes:
+            raise KeyError(longitude)
+        return PlayAreaColumn(self, longitude)
+    
+    def get(self, longitude, default=None):
+        if longitude in self.latitudes:
+            return PlayAreaColumn(self, longitude)
+        return default
+    
+    def __contains__(self, longitude):
+        return longitude in self.latitudes
+    
+    def __iter__(self):
+        return iter(self.latitudes)
+    
+    def __len__(self):
+        return len(self.latitudes)
+    
+    def keys(self):
+        return self.latitudes.keys()
+    
+    def values(self):
+        return [PlayAreaColumn(self, longitude) for longitude in self.latitudes]
+    
+    def items(self):
+        return [(longitude, PlayAreaColumn(self, longitude)) for longitude in self.latitudes]
+
+
+class PlayAreaColumn:
+    '''A view of the Tiles at one longitude of a PlayArea, which can be read and written like a dict keyed by latitude'''
+    def __init__(self, play_area, longitude):
+        self.play_area = play_area
+        self.longitude = longitude
+    
+    def __getitem__(self, latitude):
+        tile = self.play_area.get_tile(self.longitude, latitude)
+        if tile is None:
+            raise KeyError(latitude)
+        return tile
+    
+    def get(self, latitude, default=None):
+        tile = self.play_area.get_tile(self.longitude, latitude)
+        if tile is None:
+            return default
+        return tile
+    
+    def __setitem__(self, latitude, tile):
+        self.play_area.set_tile(self.longitude, latitude, tile)
+    
+    def __contains__(self, latitude):
+        return self.play_area.get_tile(self.longitude, latitude) is not None
+    
+    def __iter__(self):
+        return iter(self.play_area.latitudes.get(self.longitude, []))
+    
+    def __len__(self):
+        return len(self.play_area.latitudes.get(self.longitude, []))
+    
+    def keys(self):
+        return list(self)
+    
+    def values(self):
+        return [self.play_area.get_tile(self.longitude, latitude) for latitude in self]
+    
+    def items(self):
+        return [(latitude, self.play_area.get_tile(self.longitude, latitude)) for latitude in self]
+    
+    def copy(self):
+        return dict(self.items())
+
+
 class TilePosition: 
     '''keeps track of the coordinates of a Tile entity in a PlayArea for the game Cartolan'''
+    __slots__ = ("longitude", "latitude")
+    
     def __init__(self, longitude = None, latitude = None):
         '''keep track of the tile's position in two ints'''
         self.longitude = longitude
@@ -291,20 +840,79 @@ class TilePosition:
 
 class WindDirection:
     '''keeps track of the direction of the diagonal wind arrow on a Tile entity in the game Cartolan'''
+    __slots__ = ("north", "east")
+    
     def __init__(self, north = True, east = True):
         '''keep track of the wind direction with two bits'''
         self.north = north
         self.east = east
+    
+    def get_orientation(self):
+        '''Gives the wind direction as an int counting clockwise quarter turns from north-east: NE=0, SE=1, SW=2, NW=3'''
+        return ORIENTATIONS[(bool(self.north), bool(self.east))]
 
         
 class TileEdges:
     '''keeps track of whether each of the edges are land or water, relative to wind direction, for a Tile entity in the game Cartolan'''
+    __slots__ = ("upwind_clock_water", "upwind_anti_water", "downwind_clock_water", "downwind_anti_water")
+    
     def __init__(self, uc_water = True, ua_water = True, dc_water = True, da_water = True):
         ''' keep track of the edges of the tile in four bits'''
         self.upwind_clock_water = uc_water
         self.upwind_anti_water = ua_water
         self.downwind_clock_water = dc_water
         self.downwind_anti_water = da_water
+    
+    def get_edge_mask(self):
+        '''Gives the edges as a 4-bit int, with a bit set for each water edge: upwind clock=1, upwind anti=2, downwind clock=4, downwind anti=8'''
+        return (UPWIND_CLOCK * bool(self.upwind_clock_water) + UPWIND_ANTI * bool(self.upwind_anti_water)
+                + DOWNWIND_CLOCK * bool(self.downwind_clock_water) + DOWNWIND_ANTI * bool(self.downwind_anti_water))
+
+
+#Lookup tables so that the innermost checks of movement and exploration are single indexes rather than branching on strings
+#Compass directions as ints, clockwise from north, accepting either the word or the letter
+COMPASS_INDEX = {"n":0, "e":1, "s":2, "w":3, "north":0, "east":1, "south":2, "west":3
+                 , "N":0, "E":1, "S":2, "W":3, "North":0, "East":1, "South":2, "West":3}
+#Tile orientations as ints, indexed by the north and east bits of the wind direction, and back again
+ORIENTATIONS = {(True, True):0, (False, True):1, (False, False):2, (True, False):3}
+WIND_DIRECTIONS = [(True, True), (False, True), (False, False), (True, False)]
+#The bits of a tile's edge mask
+UPWIND_CLOCK, UPWIND_ANTI, DOWNWIND_CLOCK, DOWNWIND_ANTI = 1, 2, 4, 8
+#Which edge faces each compass direction, for each orientation e.g. when the wind points north-east, north is downwind anti
+EDGE_FACING = [[DOWNWIND_ANTI, DOWNWIND_CLOCK, UPWIND_ANTI, UPWIND_CLOCK] #NE
+               , [UPWIND_CLOCK, DOWNWIND_ANTI, DOWNWIND_CLOCK, UPWIND_ANTI] #SE
+               , [UPWIND_ANTI, UPWIND_CLOCK, DOWNWIND_ANTI, DOWNWIND_CLOCK] #SW
+               , [DOWNWIND_CLOCK, UPWIND_ANTI, UPWIND_CLOCK, DOWNWIND_ANTI]] #NW
+#Whether each compass edge is water, indexed by (edge mask * 4 + orientation) * 4 + compass direction
+EDGE_WATER = [bool(edge_mask & EDGE_FACING[orientation][compass_index])
+              for edge_mask in range(16) for orientation in range(4) for compass_index in range(4)]
+#Whether the wind arrow points to each compass edge, indexed by orientation * 4 + compass direction
+EDGE_DOWNWIND = [compass_index in [[0, 1], [1, 2], [2, 3], [3, 0]][orientation]
+                 for orientation in range(4) for compass_index in range(4)]
+#The steps to the neighbouring spaces, clockwise from north to match the compass direction ints
+FRONTIER_INCREMENTS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+
+#Values that forks of a game can share with the original, because they are never changed in place
+FORK_SHARED_TYPES = (int, float, str, TilePosition, WindDirection, TileEdges)
+SLOT_NAMES = {}
+
+def restore_with_id(object_type, id_name, id_value):
+    '''Recreates an object being unpickled with the id that it is hashed by, ahead of the rest of its state
+    '''
+    restored = object_type.__new__(object_type)
+    setattr(restored, id_name, id_value)
+    return restored
+
+def slot_names(cls):
+    '''Lists the attributes declared in __slots__ across a class and its bases, caching them for each class
+    '''
+    names = SLOT_NAMES.get(cls)
+    if names is None:
+        names = []
+        for base_cls in reversed(cls.__mro__):
+            names.extend(base_cls.__dict__.get("__slots__", ()))
+        names = SLOT_NAMES[cls] = tuple(names)
+    return names
 
 
 class Tile:
@@ -314,6 +922,9 @@ class Tile:
     __init__ taking Game, WindDirection, and TileEdges objects from Cartolan module, and a tile_back string
     place_tile taking two int arguments for coordinates
     '''
+    __slots__ = ("game", "tile_back", "orientation", "tile_edges", "edge_mask", "tile_position", "is_wonder"
+                 , "adventurers", "agent", "dropped_wealth", "tile_id")
+    
     def __init__(self, game
                  , tile_back = "water"
                  , wind_direction = WindDirection(True,True)
@@ -321,34 +932,53 @@ class Tile:
                 , is_wonder = False):
         self.game = game
         self.tile_back = tile_back
-        self.wind_direction = wind_direction
+        self.orientation = wind_direction.get_orientation() #clockwise quarter turns of the wind arrow from north-east
         self.tile_edges = tile_edges
+        self.edge_mask = tile_edges.get_edge_mask() #offset into the EDGE_WATER table for this tile's edges
         self.tile_position = TilePosition(None, None)
         self.is_wonder = is_wonder
         
         self.adventurers = [] # to keep track of the Adventurer tokens on a tile at any point
         self.agent = None # there can only be one Agent token on a given tile
         self.dropped_wealth = 0 # to keep track of wealth dropped when returning abruptly to a City
-        self.tile_id = tile_back+str(wind_direction.north)+str(wind_direction.east)+str(tile_edges.upwind_clock_water)+str(tile_edges.upwind_anti_water)+str(tile_edges.downwind_clock_water) + str(tile_edges.downwind_anti_water)+str(random.random())
+        self.tile_id = game.new_tile_id()
         
     def __hash__(self):
-        return hash(self.tile_id)
+        return self.tile_id
+    
+    def __reduce_ex__(self, protocol):
+        '''Pickles the tile so that it is hashable as soon as it is recreated, for games sent to other processes
+        
+        Sets of tiles, like the Wonders an Adventurer has visited, can be rebuilt while unpickling before the rest of a tile they hold.
+        '''
+        return (restore_with_id, (type(self), "tile_id", self.tile_id)) + super().__reduce_ex__(protocol)[2:]
     
     def __eq__(self, other):
-        if isinstance(other, Tile):
+        #the same object is by far the most common match, so check identity before falling back on ids, which forked tiles share
+        if self is other:
+            return True
+        elif isinstance(other, Tile):
             return self.tile_id == other.tile_id
         else: return False
         
     def __ne__(self, other):
-        if isinstance(other, Tile):
-            return not self.tile_id == other.tile_id
-        else: return True
+        return not self.__eq__(other)
         
 #    def __deepcopy__(self, memo):
 #        '''Excludes creation of new version from deep copying, copying only the reference
 #        '''
 #        return self
     
+    @property
+    def wind_direction(self):
+        '''A WindDirection equivalent to the tile's orientation, for callers that check the north and east bits'''
+        north, east = WIND_DIRECTIONS[self.orientation]
+        return WindDirection(north, east)
+    
+    @wind_direction.setter
+    def wind_direction(self, wind_direction):
+        self.orientation = wind_direction.get_orientation()
+    
     def place_tile(self, longitude, latitude):
         '''records the location of a Tile object in the PlayArea of a Cartolan game
         
@@ -356,45 +986,43 @@ class Tile:
         int longitude
         int latitude
         '''
-        print("Placing tile " +str(longitude)+", "+str(latitude))
+        logger.debug("Placing tile %s, %s", longitude, latitude)
         play_area = self.game.play_area
-        if play_area.get(longitude) is None:
-            play_area[longitude] = {latitude:self}
-            self.tile_position = TilePosition(longitude, latitude)
-        elif play_area.get(longitude).get(latitude) is None: 
-            play_area[longitude][latitude] = self
+        if play_area.get_tile(longitude, latitude) is None: 
+            undo_log = self.game.undo_log
+            if undo_log.recording:
+                undo_log.capture(self)
+                undo_log.record_placement(self, longitude, latitude)
+            play_area.set_tile(longitude, latitude, self)
             self.tile_position = TilePosition(longitude, latitude)
         else: raise Exception("Tried to place a tile on top of another")
     
+    def copy_into(self, game):
+        '''Copies a Tile that is still in a pile into a fork of its game, sharing the tile's edges
+        '''
+        tile = object.__new__(type(self))
+        for attribute_name in slot_names(type(self)):
+            setattr(tile, attribute_name, getattr(self, attribute_name))
+        tile.game = game
+        tile.tile_position = TilePosition(None, None)
+        tile.adventurers = []
+        tile.agent = None
+        tile.dropped_wealth = 0
+        return tile
+    
     def rotate_tile_clock(self):
         '''Replicates the change in direction of the wind arrow on a tile from rotating it
         
         Rotates the tie sequentially: NE->SE, SE->SW, SW->NW, NW->NE
         '''
-        if self.wind_direction.north and self.wind_direction.east:
-            self.wind_direction.north = False
-        elif not self.wind_direction.north and self.wind_direction.east:
-            self.wind_direction.east = False
-        elif not self.wind_direction.north and not self.wind_direction.east:
-            self.wind_direction.north = True
-        elif self.wind_direction.north and not self.wind_direction.east:
-            self.wind_direction.east = True
-        else: raise Exception("Tile orientations have become confused")
+        self.orientation = (self.orientation + 1) % 4
     
     def rotate_tile_anti(self):
         '''Replicates the change in direction of the wind arrow on a tile from rotating it
         
         Rotates the tie sequentially: NE->NW, NW->SW, SW->SE, SE->NE
         '''
-        if self.wind_direction.north and self.wind_direction.east:
-            self.wind_direction.east = False
-        elif self.wind_direction.north and not self.wind_direction.east:
-            self.wind_direction.north = False
-        elif not self.wind_direction.north and not self.wind_direction.east:
-            self.wind_direction.east = True
-        elif not self.wind_direction.north and self.wind_direction.east:
-            self.wind_direction.north = True
-        else: raise Exception("Tile orientations have become confused")
+        self.orientation = (self.orientation + 3) % 4
     
     def compass_edge_water(self, compass_point):
         '''Reports whether a tile edge is land or water, based on tile orientation rather than wind direction
@@ -402,47 +1030,12 @@ class Tile:
         key arguments:
         string giving either the word or letter for one of the four cardinal compass directions
         '''
-        if self.wind_direction.north and self.wind_direction.east: # NE orientation => N = downwind anti
-            if compass_point.lower() in ["north", "n"]:
-                return self.tile_edges.downwind_anti_water
-            elif compass_point.lower() in ["east", "e"]:
-                return self.tile_edges.downwind_clock_water
-            elif compass_point.lower() in ["south", "s"]:
-                return self.tile_edges.upwind_anti_water
-            elif compass_point.lower() in ["west", "w"]:
-                return self.tile_edges.upwind_clock_water
-            else: raise Exception("Tile orientations have become confused")
-        elif not self.wind_direction.north and self.wind_direction.east: # SE orientation => N = upwind clock 
-            if compass_point.lower() in ["north", "n"]:
-                return self.tile_edges.upwind_clock_water
-            elif compass_point.lower() in ["east", "e"]:
-                return self.tile_edges.downwind_anti_water
-            elif compass_point.lower() in ["south", "s"]:
-                return self.tile_edges.downwind_clock_water
-            elif compass_point.lower() in ["west", "w"]:
-                return self.tile_edges.upwind_anti_water
-            else: raise Exception("Tile orientations have become confused")
-        elif not self.wind_direction.north and not self.wind_direction.east: # SW orientation => N = upwind anti
-            if compass_point.lower() in ["north", "n"]:
-                return self.tile_edges.upwind_anti_water
-            elif compass_point.lower() in ["east", "e"]:
-                return self.tile_edges.upwind_clock_water
-            elif compass_point.lower() in ["south", "s"]:
-                return self.tile_edges.downwind_anti_water
-            elif compass_point.lower() in ["west", "w"]:
-                return self.tile_edges.downwind_clock_water
-            else: raise Exception("Tile orientations have become confused")
-        elif self.wind_direction.north and not self.wind_direction.east: # NW orientation => N = downwind clock
-            if compass_point.lower() in ["north", "n"]:
-                return self.tile_edges.downwind_clock_water
-            elif compass_point.lower() in ["east", "e"]:
-                return self.tile_edges.upwind_anti_water
-            elif compass_point.lower() in ["south", "s"]:
-                return self.tile_edges.upwind_clock_water
-            elif compass_point.lower() in ["west", "w"]:
-                return self.tile_edges.downwind_anti_water
-            else: raise Exception("Tile orientations have become confused")
-        else: raise Exception("Tile orientations have become confused")
+        compass_index = COMPASS_INDEX.get(compass_point)
+        if compass_index is None:
+            compass_index = COMPASS_INDEX.get(compass_point.lower())
+            if compass_index is None:
+                raise Exception("Tile orientations have become confused")
+        return EDGE_WATER[(self.edge_mask * 4 + self.orientation) * 4 + compass_index]
     
     
     def compass_edge_downwind(self, compass_point):
@@ -451,15 +1044,12 @@ class Tile:
         key arguments:
         string giving either the word or letter for one of the four cardinal compass directions
         '''
-        if compass_point.lower() in ["north","n"]:
-            return self.wind_direction.north
-        elif compass_point.lower() in ["east","e"]:
-            return self.wind_direction.east
-        elif compass_point.lower() in ["south","s"]:
-            return not self.wind_direction.north
-        elif compass_point.lower() in ["west","w"]:
-            return not self.wind_direction.east
-        else: raise Exception("Invalid compass direction checked")
+        compass_index = COMPASS_INDEX.get(compass_point)
+        if compass_index is None:
+            compass_index = COMPASS_INDEX.get(compass_point.lower())
+            if compass_index is None:
+                raise Exception("Invalid compass direction checked")
+        return EDGE_DOWNWIND[self.orientation * 4 + compass_index]
         
     
     def move_onto_tile(self, token):
@@ -469,13 +1059,22 @@ class Tile:
         Token either an Agent or an Adventurer from the Cartolan module
         '''
         if isinstance(token, Token):
+            undo_log = self.game.undo_log
+            if undo_log.recording:
+                #the tokens already here may be affected too, when the arriving token interacts with them
+                undo_log.capture(self)
+                undo_log.capture(token)
+                undo_log.capture(token.current_tile)
+                undo_log.capture(self.agent)
+                for adventurer in self.adventurers:
+                    undo_log.capture(adventurer)
             #Collect any wealth that has been dropped on this tile
             if self.dropped_wealth > 0:
                 token.wealth += self.dropped_wealth
                 self.dropped_wealth = 0
                 
             if isinstance(token, Adventurer):
-                print("Moving adventurer for " +str(token.player.name)+ " onto tile at " +str(self.tile_position.longitude)+ ", " +str(self.tile_position.latitude))
+                logger.debug("Moving adventurer for %s onto tile at %s, %s", token.player.name, self.tile_position.longitude, self.tile_position.latitude)
                 if token.current_tile:
                     if token in token.current_tile.adventurers:
                         token.current_tile.adventurers.remove(token)
@@ -485,24 +1084,25 @@ class Tile:
                 token.turn_route.append(self)
                 
             elif isinstance(token, Agent):
-                if token.__dict__.get("is_dispossessed"):
+                if token.is_dispossessed:
                     token.is_dispossessed = False                 
                 if self.agent is None or self.agent == token:
-                    print("Moving agent for " +str(token.player.name)+ " onto tile at " +str(self.tile_position.longitude)+ ", " +str(self.tile_position.latitude))
+                    logger.debug("Moving agent for %s onto tile at %s, %s", token.player.name, self.tile_position.longitude, self.tile_position.latitude)
                     if token.current_tile:
                         token.current_tile.agent = None
                     token.current_tile = self
                     self.agent = token
                     token.route.append(self) 
                     token.turn_route.append(self)
-                elif self.agent.__dict__.get("is_dispossessed"):
+                elif self.agent.is_dispossessed:
                     self.agent.dismiss()
-                    print("Moving agent for " +str(token.player.name)+ " onto tile at " +str(self.tile_position.longitude)+ ", " +str(self.tile_position.latitude))
+                    logger.debug("Moving agent for %s onto tile at %s, %s", token.player.name, self.tile_position.longitude, self.tile_position.latitude)
                     self.agent = token
                     self.agent.current_tile = self
                     token.route.append(self) # relevant only in Regular and Advanced mode
                     token.turn_route.append(self)
                 else: raise Exception("Tried to add multiple Agents to a tile: adding and agent of " +token.player.name+ " where there was an existing agent of " +self.agent.player.name)
+                self.game.update_agent_network(token.player)
             else: raise Exception("Didn't know how to handle this kind of token")
         else: raise Exception("Tried to move something other than a token onto a tile")
     
@@ -512,9 +1112,14 @@ class Tile:
         key arguments:
         Token either an Agent or an Adventurer from the Cartolan module
         '''
+        undo_log = self.game.undo_log
+        if undo_log.recording:
+            undo_log.capture(self)
+            undo_log.capture(token)
         if token == self.agent:
             self.agent.current_tile = None
             self.agent = None
+            self.game.update_agent_network(token.player)
             return True
         elif token in self.adventurers:
             self.adventurers.remove(token)
@@ -542,12 +1147,19 @@ class Tile:
 class TilePile:
     '''Represents a stack of tiles in the game Cartolan
     
+    Tiles are drawn at random rather than from the top, so the order of the pile never matters, and tiles can be put 
+    back into it without shuffling the whole pile again.
+    
     methods:
     __init__ optionally takes a tile_back string and a List of tiles
+    add_tile takes a Tile
+    draw_tile takes a random.Random
+    shuffle_tiles takes a random.Random
     '''
     def __init__(self, tile_back = "water", tiles = []):
         self.tile_back = tile_back
         self.tiles = tiles
+        self.game = None #set for forks of a game, whose piles share tiles with the original until they are drawn
     
     def add_tile(self, tile):
         '''Includes another Tile in this pile
@@ -561,16 +1173,32 @@ class TilePile:
             else: raise Exception ("Tried adding a tile to the wrong pile")
         else: raise Exception("Tried adding something other than a tile to a pile")
     
-    def draw_tile(self):
-        '''Removes and returns a Tile from the pile'''
-        if self.tiles:
-            return self.tiles.pop()
+    def draw_tile(self, rng):
+        '''Removes and returns a Tile picked at random from the pile
+        
+        key arguments:
+        random.Random of the game, so that seeded games draw the same tiles
+        '''
+        tiles = self.tiles
+        if tiles:
+            #swap the picked tile with the last one, so that it can be removed without shifting the rest along
+            tile_index = rng.randrange(len(tiles))
+            tile = tiles[tile_index]
+            tiles[tile_index] = tiles[-1]
+            tiles.pop()
+            if self.game is not None and not tile.game is self.game:
+                tile = tile.copy_into(self.game)
+            return tile
         else:
             return None
     
-    def shuffle_tiles(self):
-        '''Randomises the order of tiles in the pile'''
-        random.shuffle(self.tiles)
+    def shuffle_tiles(self, rng):
+        '''Randomises the order of tiles in the pile
+        
+        key arguments:
+        random.Random of the game, so that seeded games lay out the same piles
+        '''
+        rng.shuffle(self.tiles)
 
 class CityTile(Tile):
     '''A template for Tiles representing cities in the game Cartolan
@@ -581,6 +1209,8 @@ class CityTile(Tile):
     Interfaces:
     visit_city, bank_wealth, buy_adventurers, buy_agents
     '''
+    __slots__ = ("is_capital", "is_discovered")
+    
     def __init__(self, game, wind_direction, tile_edges, is_capital, is_discovered):
         super().__init__(game, "land", wind_direction, tile_edges, False)
         self.is_capital = is_capital
@@ -2,7 +2,56 @@
 Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
 '''
 
-from base import Adventurer, Agent, CityTile, Tile, WindDirection, TileEdges
+from base import Adventurer, Agent, CityTile, Tile, WindDirection, TileEdges, COMPASS_INDEX, EDGE_WATER, EDGE_DOWNWIND, FRONTIER_INCREMENTS
+import heapq
+import logging
+
+logger = logging.getLogger(__name__)
+
+#The orientations a tile can be tried in when exploring, relative to the orientation of the tile being moved from
+#indexed by exploration rules, then whether the wind is NE/SW (0) or SE/NW (1), then whether the movement is N/S (0) or E/W (1)
+EXPLORATION_ROTATIONS = {"clockwise":[[[0, 1, 3], [0, 1, 3]], [[0, 1, 3], [0, 1, 3]]]
+                         , "continuous":[[[0, 3], [0, 1]], [[0, 1], [0, 3]]] #to line up arrows head to toe
+                         }
+ROTATION_FITS = {}
+
+def get_rotation_fits(exploration_rules):
+    '''Gives the table of orientations that newly explored tiles will fit in, building it on first use for the exploration rules
+    
+    The table is indexed by ((edge mask * 81 + adjoining edges) * 4 + orientation moved from) * 4 + direction moved,
+    where adjoining edges counts each of N, E, S, W in base 3, as unexplored (0), land (1) or water (2).
+    Entries are the orientation the tile will be placed in, or None if it won't fit.
+    
+    key arguments:
+    string naming the exploration rules, either "clockwise" or "continuous"
+    '''
+    rotation_fits = ROTATION_FITS.get(exploration_rules)
+    if rotation_fits is not None:
+        return rotation_fits
+    if not exploration_rules in EXPLORATION_ROTATIONS:
+        raise Exception("Unrecognised exploration rules")
+    rotations = EXPLORATION_ROTATIONS[exploration_rules]
+    rotation_fits = []
+    for edge_mask in range(16):
+        for adjoining_state in range(81):
+            #decode the required edges, skipping those with no tile adjoining
+            required_edges = []
+            for compass_index in range(4):
+                edge_state = adjoining_state // 3**compass_index % 3
+                if edge_state:
+                    required_edges.append((compass_index, edge_state == 2))
+            for orientation in range(4):
+                for move_index in range(4):
+                    fit_orientation = None
+                    for rotation in rotations[orientation % 2][move_index % 2]:
+                        candidate = (orientation + rotation) % 4
+                        offset = (edge_mask * 4 + candidate) * 4
+                        if all(EDGE_WATER[offset + compass_index] == edge_water for compass_index, edge_water in required_edges):
+                            fit_orientation = candidate
+                            break
+                    rotation_fits.append(fit_orientation)
+    ROTATION_FITS[exploration_rules] = rotation_fits
+    return rotation_fits
 
 class AdventurerBeginner(Adventurer):
     '''Representing an Adventurer token with the movement and action possibilities from Beginner mode of Cartolan
@@ -10,7 +59,15 @@ class AdventurerBeginner(Adventurer):
     Methods:
     __init__ taking Game, Player, and CityTile objects from the Cartolan module
     can_move taking a string compass point
+    within_move_budget taking a string move type and three Ints counting moves since resting
+    move_budgets
+    route_towards taking two Int coordinates and a list of coordinates to avoid
+    route_away_from taking two Int coordinates and a list of coordinates to avoid
+    search_routes taking a starting position, a set of coordinates to avoid, and optionally two Int coordinates to stop at
     exploration_needed taking two Int coordinates
+    get_best_gaps taking a list of coordinates to avoid
+    get_legal_actions
+    get_token_actions
     choose_pile
     choose_discard_pile
     move taking a string compass point
@@ -24,10 +81,16 @@ class AdventurerBeginner(Adventurer):
     can_collect_wealth
     collect_wealth
     '''
+    __slots__ = ("agents_rested", "banked", "bought_adventurer", "bought_agent", "collected", "cost_adventurer"
+                 , "cost_agent_exploring", "cost_agent_from_city", "downwind_moves", "land_moves", "latest_city", "max_downwind_moves"
+                 , "max_exploration_attempts", "max_land_moves", "max_upwind_moves", "moved", "moved_agent", "placed"
+                 , "preferred_tile_num", "rested", "traded", "upwind_moves", "value_discover_wonder", "value_fill_map_gap"
+                 , "value_trade", "wonders_visited")
+
     def __init__(self, game, player, starting_city):
         super().__init__(game, player, starting_city)
         
-        print("adding an adventurer for " +str(player.name))
+        logger.debug("adding an adventurer for %s", player.name)
         
         #Mirror game variables, mostly in anticipation of Advanced mode and modifying these
         self.max_exploration_attempts = game.max_exploration_attempts
@@ -47,8 +110,8 @@ class AdventurerBeginner(Adventurer):
         self.land_moves = 0
         self.turns_moved = 0
         self.latest_city = starting_city
-        self.wonders_visited = []
-        self.agents_rested = []
+        self.wonders_visited = set() #sets, as they are checked far more often than they change
+        self.agents_rested = set()
         
         #Some records of actions taken each move
         self.moved = None
@@ -60,6 +123,7 @@ class AdventurerBeginner(Adventurer):
         self.bought_adventurer = 0
         self.bought_agent = 0 #@TODO this variable may need to store different information
         self.moved_agent = None #@TODO this variable may need to store different information
+        self.preferred_tile_num = None #the Chest map selected for exploring, which visualisations may clear in any mode
     
     
     def has_remaining_moves(self):
@@ -80,7 +144,7 @@ class AdventurerBeginner(Adventurer):
         
         # check that instruction is valid: a direction provided or an explicit general check through a None
         if compass_point is None:
-            print("Adventurer is checking whether any movement at all is possible")
+            logger.debug("Adventurer is checking whether any movement at all is possible")
             if ((self.game.movement_rules == "initial" or self.game.movement_rules == "budgetted")
                 and self.max_downwind_moves <= self.land_moves + self.downwind_moves + self.upwind_moves):
                 return False
@@ -91,49 +155,167 @@ class AdventurerBeginner(Adventurer):
         elif not (compass_point.lower() in ["north","n","east","e","south","s","west","w"]): 
             raise Exception("invalid direction given for movement")
         
-        # check whether move is possible over the edge
-#        print("Adventurer is checking whether movement is possible over the " +compass_point
-#              + " edge from their tile at " +str(self.current_tile.tile_position.longitude)+ "," 
-#              + str(self.current_tile.tile_position.latitude))
+        # check whether move is possible over the edge, given the kind of movement it would be
+        if not self.current_tile.compass_edge_water(compass_point): #land movement needed
+            move_type = "land"
+        elif self.current_tile.compass_edge_downwind(compass_point): #downwind movement possible
+            move_type = "downwind"
+        else: #if not land or downwind, then movement must be upwind
+            move_type = "upwind"
+        return self.within_move_budget(move_type, self.land_moves, self.downwind_moves, self.upwind_moves)
+    
+    def within_move_budget(self, move_type, land_moves, downwind_moves, upwind_moves):
+        '''confirm whether the movement rules allow a kind of move, after a given number of each kind since resting
+        
+        key arguments:
+        String move type, out of "land", "downwind" and "upwind"
+        Ints counting the land, downwind and upwind moves since resting
+        '''
         if self.game.movement_rules == "initial": #this version 1 of movement allows land and upwind movement only initially after resting
-            moves_since_rest = self.land_moves + self.downwind_moves + self.upwind_moves
-#            print("Adventurer has determined that they have moved " +str(moves_since_rest)+ " times since resting")
-            if not self.current_tile.compass_edge_water(compass_point): #land movement needed
-                if moves_since_rest < self.max_land_moves:
-                    return True
-                else: return False
-            elif (self.current_tile.compass_edge_water(compass_point) 
-                  and self.current_tile.compass_edge_downwind(compass_point)): #downwind movement possible
-                if (moves_since_rest < self.max_downwind_moves):
-                    return True
-                else: return False
-            else: #if not land or downwind, then movement must be upwind
-                if moves_since_rest < self.max_upwind_moves:
-                    return True
-                elif self.downwind_moves < self.max_downwind_moves:
-#                     return None
-                        return False
-                else: return False
+            moves_since_rest = land_moves + downwind_moves + upwind_moves
+            if move_type == "land":
+                return moves_since_rest < self.max_land_moves
+            elif move_type == "downwind":
+                return moves_since_rest < self.max_downwind_moves
+            else:
+                return moves_since_rest < self.max_upwind_moves
         elif self.game.movement_rules == "budgetted": #this version 2 of movement allows land and upwind movement any time, but a limited number before resting
-            print("Adventurer has moved " +str(self.upwind_moves)+ " times upwind, " +str(self.land_moves)+ " times overland, and " +str(self.downwind_moves)+ " times downwind, since resting")
-            if not self.current_tile.compass_edge_water(compass_point): #land movement needed
-                if self.land_moves < self.max_land_moves and self.upwind_moves == 0:
-                    return True
-                else: return False
-            elif (self.current_tile.compass_edge_water(compass_point) 
-                  and self.current_tile.compass_edge_downwind(compass_point)): #downwind movement possible
-                if (self.downwind_moves + self.land_moves + self.upwind_moves < self.max_downwind_moves):
-                    return True
-                else: return False
-            else: #if not land or downwind, then movement must be upwind
-                if self.upwind_moves < self.max_upwind_moves and self.land_moves == 0:
-                    return True
-                elif self.downwind_moves < self.max_downwind_moves:
-#                     return None
-                    return False
-                else: return False
+            if move_type == "land":
+                return land_moves < self.max_land_moves and upwind_moves == 0
+            elif move_type == "downwind":
+                return downwind_moves + land_moves + upwind_moves < self.max_downwind_moves
+            else:
+                return upwind_moves < self.max_upwind_moves and land_moves == 0
         else: raise Exception("Invalid movement rules specified")
+    
+    def move_budgets(self):
+        '''Gives the limits deciding which moves are allowed, so that routes found for one Adventurer can be reused for others alike
+        '''
+        return (self.game.movement_rules, self.max_land_moves, self.max_downwind_moves, self.max_upwind_moves)
+    
+    def route_towards(self, longitude, latitude, locations_to_avoid=[]):
+        '''Finds the quickest route over the tiles already placed to some coordinates, in turns and then moves, and gives its first step
+        
+        Returns a compass point to move in, "wait" if it would be quicker to start again next turn, or None if there is no route
+        
+        key arguments:
+        two Ints giving the coordinates to reach
+        List of coordinate pairs for tiles to route around
+        '''
+        play_area = self.game.play_area
+        avoided = frozenset((location[0], location[1]) for location in locations_to_avoid)
+        route_key = (longitude, latitude, self.move_budgets(), avoided)
+        position = self.current_tile.tile_position
+        start = (position.longitude, position.latitude, self.land_moves, self.downwind_moves, self.upwind_moves)
+        routes = play_area.routes
+        if (route_key, start) in routes:
+            return routes[(route_key, start)]
+        costs, steps, end = self.search_routes(start, avoided, longitude, latitude)
+        #every position along the route has the rest of the same route as its own quickest, so all its steps are kept
+        routes[(route_key, start)] = None
+        while end is not None and end != start:
+            previous_state, step = steps[end]
+            routes[(route_key, previous_state)] = step
+            end = previous_state
+        return routes[(route_key, start)]
+    
+    def route_away_from(self, longitude, latitude, locations_to_avoid=[]):
+        '''Finds the tile reachable this turn that is furthest from some coordinates, and gives the first step of the quickest route there
+        
+        Returns a compass point to move in, or None if no tile reachable this turn is further away than the current one
         
+        key arguments:
+        two Ints giving the coordinates to get away from
+        List of coordinate pairs for tiles to route around
+        '''
+        avoided = frozenset((location[0], location[1]) for location in locations_to_avoid)
+        position = self.current_tile.tile_position
+        start = (position.longitude, position.latitude, self.land_moves, self.downwind_moves, self.upwind_moves)
+        costs, steps, end = self.search_routes(start, avoided)
+        #the furthest tile reachable this turn, and then the quickest to reach
+        furthest = abs(position.longitude - longitude) + abs(position.latitude - latitude)
+        for state in costs:
+            distance = abs(state[0] - longitude) + abs(state[1] - latitude)
+            if distance > furthest or (distance == furthest and end is not None and costs[state] < costs[end]):
+                furthest, end = distance, state
+        #the best route depends on where the Adventurer starts, so unlike routes towards somewhere it isn't kept
+        step = None
+        while end is not None and end != start:
+            end, step = steps[end]
+        return step
+    
+    def search_routes(self, start, avoided, longitude=None, latitude=None):
+        '''Searches outwards over the tiles already placed for the quickest routes from a position, by the A* algorithm
+        
+        Positions combine coordinates with the land, downwind and upwind moves made since resting, so that the moves allowed 
+        from each are those can_move would allow. Arriving at a city ends the turn, as does choosing to wait. Without 
+        coordinates to stop at, only the positions reachable this turn are searched.
+        Returns the cost in turns and then moves to reach each position, the previous position and step towards each, and 
+        the first position found at the coordinates to stop at
+        '''
+        play_area = self.game.play_area
+        costs = {start:(0, 0)}
+        steps = {}
+        within_budget = {} #whether each kind of move is allowed after each combination of moves, as many positions share them
+        queue = [(0, 0, 0, 0, 0, start)]
+        num_queued = 1 #breaks ties by the order positions were found, so that positions themselves needn't be compared
+        while queue:
+            turns_estimate, moves_estimate, _, turns, moves, state = heapq.heappop(queue)
+            if costs[state] < (turns, moves):
+                continue
+            state_longitude, state_latitude, land_moves, downwind_moves, upwind_moves = state
+            if state_longitude == longitude and state_latitude == latitude:
+                return costs, steps, state
+            next_states = []
+            moves_since_rest = land_moves + downwind_moves + upwind_moves
+            if moves_since_rest > 0 and longitude is not None:
+                next_states.append(((turns + 1, moves), (state_longitude, state_latitude, 0, 0, 0), "wait"))
+            if moves_since_rest < self.max_downwind_moves:
+                tile = play_area.get_tile(state_longitude, state_latitude)
+                edge_offset = (tile.edge_mask * 4 + tile.orientation) * 4
+                for compass_point in ["n", "e", "s", "w"]:
+                    longitude_increment, latitude_increment = play_area.NEIGHBOUR_INCREMENTS[compass_point]
+                    next_longitude = state_longitude + longitude_increment
+                    next_latitude = state_latitude + latitude_increment
+                    next_tile = play_area.get_tile(next_longitude, next_latitude)
+                    if next_tile is None or (next_longitude, next_latitude) in avoided:
+                        continue
+                    compass_index = COMPASS_INDEX[compass_point]
+                    if not EDGE_WATER[edge_offset + compass_index]:
+                        move_type = "land"
+                        next_state = (next_longitude, next_latitude, land_moves + 1, downwind_moves, upwind_moves)
+                    elif EDGE_DOWNWIND[tile.orientation * 4 + compass_index]:
+                        move_type = "downwind"
+                        next_state = (next_longitude, next_latitude, land_moves, downwind_moves + 1, upwind_moves)
+                    else:
+                        move_type = "upwind"
+                        next_state = (next_longitude, next_latitude, land_moves, downwind_moves, upwind_moves + 1)
+                    budget_key = (move_type, land_moves, downwind_moves, upwind_moves)
+                    allowed = within_budget.get(budget_key)
+                    if allowed is None:
+                        allowed = within_budget[budget_key] = self.within_move_budget(move_type, land_moves, downwind_moves, upwind_moves)
+                    if not allowed:
+                        continue
+                    if isinstance(next_tile, CityTile) and not (next_longitude == longitude and next_latitude == latitude):
+                        #visiting a city ends the turn, so routes through cities start afresh from them next turn
+                        if longitude is not None:
+                            next_states.append(((turns + 1, moves + 1), (next_longitude, next_latitude, 0, 0, 0), compass_point))
+                    else:
+                        next_states.append(((turns, moves + 1), next_state, compass_point))
+            for cost, next_state, step in next_states:
+                if next_state not in costs or cost < costs[next_state]:
+                    costs[next_state] = cost
+                    steps[next_state] = (state, step)
+                    #positions are prioritised by the fewest turns and then moves they could total, with each turn allowing at most the downwind moves
+                    turns_estimate, moves_estimate = cost
+                    if longitude is not None:
+                        distance = abs(next_state[0] - longitude) + abs(next_state[1] - latitude)
+                        moves_remaining = self.max_downwind_moves - next_state[2] - next_state[3] - next_state[4]
+                        turns_estimate += max(0, -((moves_remaining - distance) // self.max_downwind_moves))
+                        moves_estimate += distance
+                    num_queued += 1
+                    heapq.heappush(queue, (turns_estimate, moves_estimate, num_queued, cost[0], cost[1], next_state))
+        return costs, steps, None
     
     def exploration_needed(self, longitude, latitude):
         '''check whether there is a tile already in a given space, or if exploration is needed
@@ -142,18 +324,108 @@ class AdventurerBeginner(Adventurer):
         int longitude
         int latitude
         '''
-        return self.game.play_area.get(longitude) is None or self.game.play_area.get(longitude).get(latitude) is None
+        return self.game.play_area.get_tile(longitude, latitude) is None
+    
+    def get_best_gaps(self, locations_to_avoid=[]):
+        '''Finds the gaps in the map that the Adventurer could reach and explore this turn, looking them up in the frontier of gaps next to laid tiles
+        
+        Returns a list of tuples of the exploration value, the moves needed to reach the gap, its coordinates, and the compass 
+        point of the first step towards it, with the most valuable and then nearest gaps first
+        
+        key arguments:
+        List of coordinate pairs for tiles to route around and gaps to leave alone
+        '''
+        play_area = self.game.play_area
+        frontier = play_area.frontier
+        position = self.current_tile.tile_position
+        start = (position.longitude, position.latitude, self.land_moves, self.downwind_moves, self.upwind_moves)
+        avoided = frozenset((location[0], location[1]) for location in locations_to_avoid)
+        costs, steps, _ = self.search_routes(start, avoided)
+        best_gaps = {}
+        for state in costs:
+            state_longitude, state_latitude, land_moves, downwind_moves, upwind_moves = state
+            if land_moves + downwind_moves + upwind_moves >= self.max_downwind_moves:
+                continue
+            tile = play_area.get_tile(state_longitude, state_latitude)
+            for compass_index, (longitude_increment, latitude_increment) in enumerate(FRONTIER_INCREMENTS):
+                gap = (state_longitude + longitude_increment, state_latitude + latitude_increment)
+                adjoining_edges = frontier.get(gap)
+                if adjoining_edges is None or gap in avoided:
+                    continue
+                #the gap's edge facing back is the one being moved over, which doesn't count towards the gap's value
+                facing_index = (compass_index + 2) % 4
+                if not adjoining_edges[facing_index]:
+                    move_type = "land"
+                elif EDGE_DOWNWIND[tile.orientation * 4 + compass_index]:
+                    move_type = "downwind"
+                else:
+                    move_type = "upwind"
+                if not self.within_move_budget(move_type, land_moves, downwind_moves, upwind_moves):
+                    continue
+                num_adjacent_water = 0
+                num_adjacent_land = 0
+                for edge_index, edge_water in enumerate(adjoining_edges):
+                    if edge_index == facing_index or edge_water is None:
+                        continue
+                    elif edge_water:
+                        num_adjacent_water += 1
+                    else:
+                        num_adjacent_land += 1
+                exploration_value = self.value_fill_map_gap[num_adjacent_water][num_adjacent_land]
+                moves = costs[state][1]
+                if gap in best_gaps and best_gaps[gap][:2] >= (exploration_value, -moves):
+                    continue
+                #trace the route back to find its first step
+                step = ["n", "e", "s", "w"][compass_index]
+                route_state = state
+                while route_state != start:
+                    route_state, step = steps[route_state]
+                best_gaps[gap] = (exploration_value, -moves, step)
+        logger.debug("%s's Adventurer can reach %s gaps in the map this turn", self.player.name, len(best_gaps))
+        return sorted([(exploration_value, -negative_moves, gap, step) for gap, (exploration_value, negative_moves, step) in best_gaps.items()]
+                      , key=lambda best_gap: (-best_gap[0], best_gap[1]))
+    
+    def get_legal_actions(self):
+        '''Lists every action open to the Adventurer in its current state, so that players needn't repeat the checks
+        
+        Returns a list of tuples of an action type, out of "move", "explore", "rest", "attack" and "wait",
+        a compass point for movements, and either the coordinates moved into or the Token interacted with
+        '''
+        actions = []
+        if self.has_remaining_moves():
+            play_area = self.game.play_area
+            longitude = self.current_tile.tile_position.longitude
+            latitude = self.current_tile.tile_position.latitude
+            for compass_point in ["n", "e", "s", "w"]:
+                if self.can_move(compass_point):
+                    longitude_increment, latitude_increment = play_area.NEIGHBOUR_INCREMENTS[compass_point]
+                    coordinates = (longitude + longitude_increment, latitude + latitude_increment)
+                    if play_area.get_tile(*coordinates) is None:
+                        actions.append(("explore", compass_point, coordinates))
+                    else:
+                        actions.append(("move", compass_point, coordinates))
+        actions += self.get_token_actions()
+        actions.append(("wait", None, None))
+        return actions
+    
+    def get_token_actions(self):
+        '''Lists the interactions open to the Adventurer with the other tokens on its tile, as for get_legal_actions
+        '''
+        agent = self.current_tile.agent
+        if agent is not None and self.can_rest(agent):
+            return [("rest", None, agent)]
+        return []
         
     def choose_pile(self, compass_point):
         ''' establish which pile to draw from - always the water tile in beginner mode'''
         tile_pile = self.game.tile_piles["water"]
-        print("Identifying the " +tile_pile.tile_back+ " tile pile, which still has " +str(len(tile_pile.tiles)) +" tiles")
+        logger.debug("Identifying the %s tile pile, which still has %s tiles", tile_pile.tile_back, len(tile_pile.tiles))
         return tile_pile
     
     def choose_discard_pile(self, compass_point):
         ''' establish which pile to draw from - always the water tile in beginner mode'''
         discard_pile = self.game.discard_piles["water"]
-        print("Identifying the " +discard_pile.tile_back+ " discard pile, which still has " +str(len(discard_pile.tiles)) +" tiles")
+        logger.debug("Identifying the %s discard pile, which still has %s tiles", discard_pile.tile_back, len(discard_pile.tiles))
         return discard_pile 
     
     def interact_tokens(self):
@@ -166,8 +438,8 @@ class AdventurerBeginner(Adventurer):
                         self.collect_wealth()
             if self.can_rest(agent):
                 if self.player.check_rest(self, agent):
-                    if self.rest(agent) and agent not in self.agents_rested:
-                        self.agents_rested.append(agent)
+                    if self.rest(agent):
+                        self.agents_rested.add(agent)
     
     def interact_tile(self):
         #check whether this is a wonder, and if the player wants to trade
@@ -184,15 +456,14 @@ class AdventurerBeginner(Adventurer):
         self.land_moves = 0
         self.upwind_moves = 0
         #the list of agents rested with is reset
-        self.agents_rested = []
+        self.agents_rested = set()
         #reset Adventurer's list of visited Wonders
-        self.wonders_visited = []
-        #return any discarded tiles to the main piles (if they weren't already empty)
+        self.wonders_visited = set()
+        #return any discarded tiles to the main piles, which are drawn from at random so needn't be shuffled
         for discard_pile in self.game.discard_piles.values():
-            if discard_pile:
+            if discard_pile.tiles:
                 main_pile = self.game.tile_piles[discard_pile.tile_back]
                 main_pile.tiles.extend(discard_pile.tiles)
-                main_pile.shuffle_tiles()
                 discard_pile.tiles = []
     
     
@@ -202,6 +473,7 @@ class AdventurerBeginner(Adventurer):
         key arguments:
         String word or letter cardinal compass direction
         '''
+        self.record_action()
         #Reset records of actions taken from the previous move and record the direction of movement
         self.moved = compass_point # even if exlploration fails this still counts as a move
         self.traded = False
@@ -218,13 +490,13 @@ class AdventurerBeginner(Adventurer):
         if self.can_move(compass_point):
             #include this in the number of moves so far since resting - even if exploration subsequently fails
             if not self.current_tile.compass_edge_water(compass_point): #land movement
-                print("Making a land move, with existing treasure "+str(self.wealth))
+                logger.debug("Making a land move, with existing treasure %s", self.wealth)
                 self.land_moves += 1
             elif self.current_tile.compass_edge_downwind(compass_point): #downwind movement possible
-                print("Making a downwind water move, with existing treasure "+str(self.wealth))
+                logger.debug("Making a downwind water move, with existing treasure %s", self.wealth)
                 self.downwind_moves += 1
             else: #if not land or downwind, then movement must have been upwind
-                print("Making an upwind water move, with existing treasure "+str(self.wealth))
+                logger.debug("Making an upwind water move, with existing treasure %s", self.wealth)
                 self.upwind_moves += 1
             
             #locate the space in the play area that the Adventurer is moving into
@@ -242,13 +514,13 @@ class AdventurerBeginner(Adventurer):
                 if self.explore(tile_pile, discard_pile, new_longitude, new_latitude, compass_point):
                     #place the Adventurer on the newly placed Tile
                     self.current_tile.move_off_tile(self)
-                    self.current_tile = self.game.play_area.get(new_longitude).get(new_latitude)
+                    self.current_tile = self.game.play_area.get_tile(new_longitude, new_latitude)
                     self.current_tile.move_onto_tile(self)
                     #as a new tile there are some special considerations
                     self.discover(self.current_tile)
                     moved = True 
                 else:
-                    print("Exploration failed, but offering Adventurer available actions on original tile")
+                    logger.debug("Exploration failed, but offering Adventurer available actions on original tile")
                     if not isinstance(self.current_tile, CityTile): 
                         self.interact_tile()
                         self.interact_tokens()
@@ -256,7 +528,7 @@ class AdventurerBeginner(Adventurer):
             else:
                 #place the Adventurer on the next existing Tile
                 self.current_tile.move_off_tile(self)
-                self.current_tile = self.game.play_area.get(new_longitude).get(new_latitude)
+                self.current_tile = self.game.play_area.get_tile(new_longitude, new_latitude)
                 self.current_tile.move_onto_tile(self)
                 #carry out any actions that are possible given this tile or tokens on it
                 if isinstance(self.current_tile, CityTile):
@@ -268,7 +540,7 @@ class AdventurerBeginner(Adventurer):
         
         #check whether any more moves will be possible
         if not self.can_move(None):
-            print("Adventurer determined that cannot move any more, so finishing turn, with Chest treasure "+str(self.wealth)+", and Vault treasure "+str(self.game.player_wealths[self.player]))
+            logger.debug("Adventurer determined that cannot move any more, so finishing turn, with Chest treasure %s, and Vault treasure %s", self.wealth, self.game.player_wealths[self.player])
             self.end_turn()
         
         return moved #even if exlploration fails this still counts as a move
@@ -276,7 +548,8 @@ class AdventurerBeginner(Adventurer):
     
     def wait(self):
         '''Allows the Adventurer to just wait in place rather than moving, to end a turn early'''
-        print("Adventurer is choosing to wait in place, with treasure "+str(self.wealth))
+        logger.debug("Adventurer is choosing to wait in place, with treasure %s", self.wealth)
+        self.record_action()
         #Reset records of actions taken from previous move, and record that this was a choice to wait in place
         self.moved = "wait"
         self.traded = False
@@ -303,34 +576,20 @@ class AdventurerBeginner(Adventurer):
             self.interact_tokens()
         
         if not self.can_move(None):
-            print("Adventurer determined that cannot move any more, so finishing turn, with Chest treasure "+str(self.wealth)+", and Vault treasure "+str(self.game.player_wealths[self.player]))
+            logger.debug("Adventurer determined that cannot move any more, so finishing turn, with Chest treasure %s, and Vault treasure %s", self.wealth, self.game.player_wealths[self.player])
             self.end_turn()
         
         return True
     
     def get_adjoining_edges(self, longitude, latitude):
         '''for a given set of coordinates, gets the adjoining edges from the neighbouring tiles, if any'''
-        adjoining_edges_water = {"n":None, "e":None, "s":None, "w":None}
-        for longitude_increment in [- 1, 1]:
-            if not self.game.play_area.get(longitude + longitude_increment) is None:
-                neighbour_tile = self.game.play_area.get(longitude + longitude_increment).get(latitude)
-                if not neighbour_tile is None:
-                    #for the tile -1 longitude it will be the eastern edge that is relevant
-                    if longitude_increment == -1:
-                        adjoining_edges_water["w"] = neighbour_tile.compass_edge_water("east")
-                    else:
-                        adjoining_edges_water["e"] = neighbour_tile.compass_edge_water("west")
-        for latitude_increment in [- 1, 1]:
-            if not self.game.play_area.get(longitude) is None:
-                neighbour_tile = self.game.play_area.get(longitude).get(latitude + latitude_increment)
-                if not neighbour_tile is None:
-                    #for the tile -1 latitude it will be the northern edge that is relevant
-                    if latitude_increment == -1:
-                        adjoining_edges_water["s"] = neighbour_tile.compass_edge_water("north")
-                    else:
-                        adjoining_edges_water["n"] = neighbour_tile.compass_edge_water("south")
-        print("Identified adjoining edges as, North: " +str(adjoining_edges_water["n"])+ ", East: " +str(adjoining_edges_water["e"])
-              + ", South: " +str(adjoining_edges_water["s"])+ ", West: " +str(adjoining_edges_water["w"]))
+        play_area = self.game.play_area
+        #gaps next to the map are kept up to date in the frontier as tiles are laid, so only other spaces need their neighbours checking
+        adjoining_edges = play_area.frontier.get((longitude, latitude))
+        if adjoining_edges is None:
+            adjoining_edges = play_area.get_adjoining_edges(longitude, latitude)
+        adjoining_edges_water = {"n":adjoining_edges[0], "e":adjoining_edges[1], "s":adjoining_edges[2], "w":adjoining_edges[3]}
+        logger.debug("Identified adjoining edges as, North: %s, East: %s, South: %s, West: %s", adjoining_edges_water["n"], adjoining_edges_water["e"], adjoining_edges_water["s"], adjoining_edges_water["w"])
         return adjoining_edges_water
     
     def get_exploration_value(self, adjoining_edges_water, compass_point_moving):
@@ -350,18 +609,14 @@ class AdventurerBeginner(Adventurer):
         
         #Calculate the score this represents
         exploration_value = self.value_fill_map_gap[num_adjacent_water][num_adjacent_land]
-        print(self.player.name+" the gap in the  map is adjacent to " +str(num_adjacent_water)
-              + " water tiles and " +str(num_adjacent_land)+ " land tiles, and is worth " 
-              +str(exploration_value))
+        logger.debug("%s the gap in the  map is adjacent to %s water tiles and %s land tiles, and is worth %s", self.player.name, num_adjacent_water, num_adjacent_land, exploration_value)
         return exploration_value
     
     def rotate_and_place(self, potential_tile, longitude, latitude, compass_point_moving, adjoining_edges_water):
         '''For a given potential tile try it in the various rotations that are allowed, and then place it if possible
         '''
         # rotate the potential tile to the orientation of the current tile
-        while not (potential_tile.wind_direction.north == self.current_tile.wind_direction.north and 
-                   potential_tile.wind_direction.east == self.current_tile.wind_direction.east):
-            potential_tile.rotate_tile_clock()
+        potential_tile.orientation = self.current_tile.orientation
 #            print("...after rotating to match wind, it has edges N:" +str(potential_tile.compass_edge_water("n"))
 #                  +";E:"+str(potential_tile.compass_edge_water("e"))
 #                  +";S:"+str(potential_tile.compass_edge_water("s"))
@@ -381,56 +636,24 @@ class AdventurerBeginner(Adventurer):
             return False
         
     def rotated_tile_fits(self, potential_tile, compass_point_moving, adjoining_edges_water):
-        '''Check whether a given tile will fit into an adjacent space to the Adventurer
+        '''Check whether a given tile will fit into an adjacent space to the Adventurer, leaving it rotated to fit if it does
         '''
-        # first establish the set of rotations under this ruleset
-        def null():
-            pass
-        if self.game.exploration_rules == "clockwise": # this version 1 of exploration rules will just try a clockwise rotation and then an anti
-            rotations = [null, potential_tile.rotate_tile_anti, potential_tile.rotate_tile_clock] # remember these will pop in reverse order, print used as a null function that will do nothing to the potential tile
-        elif  self.game.exploration_rules == "continuous": # this version 2 of the exploration rules will try to line up arrows head to toe as a first preference 
-            #the rotation will be anti first if the wind direction is north-east or south-west and the movement is north or south
-            if ((self.current_tile.wind_direction.north and self.current_tile.wind_direction.east) 
-                or (not self.current_tile.wind_direction.north and not self.current_tile.wind_direction.east)):
-                if compass_point_moving in ["n","s"]:
-#                         rotations = [null, potential_tile.rotate_tile_clock, potential_tile.rotate_tile_anti]
-                    rotations = [null, potential_tile.rotate_tile_anti]
-                else:
-#                         rotations = [null, potential_tile.rotate_tile_anti, potential_tile.rotate_tile_clock]
-                    rotations = [null, potential_tile.rotate_tile_clock]
-            #the rotation will be anti first if the wind direction is north-west or south-east and the movement is west or east
-            elif ((self.current_tile.wind_direction.north and not self.current_tile.wind_direction.east) 
-                or (not self.current_tile.wind_direction.north and self.current_tile.wind_direction.east)):
-                if compass_point_moving in ["n","s"]:
-#                         rotations = [null, potential_tile.rotate_tile_anti, potential_tile.rotate_tile_clock]
-                    rotations = [null, potential_tile.rotate_tile_clock]
-                else:
-#                         rotations = [null, potential_tile.rotate_tile_clock, potential_tile.rotate_tile_anti]
-                    rotations = [null, potential_tile.rotate_tile_anti]
-            else: raise Exception("Failed to exhaust wind directions")
-        
-        while len(rotations) > 0:
-            compass_points = ["n", "e", "s", "w"]
-            edge_matches = True
-            while edge_matches and len(compass_points) > 0:
-                compass_point = compass_points.pop()
-#                    print("checking tile matches on the " +compass_point.upper()+ ", where an adjoining edge of "
-#                         +str(adjoining_edges_water[compass_point])+ " must match with the tile's "
-#                          + str(potential_tile.compass_edge_water(compass_point)))
-                edge_matches = adjoining_edges_water[compass_point] is None or adjoining_edges_water[compass_point] == potential_tile.compass_edge_water(compass_point)
-
-            if edge_matches:
-                return True
-            else:
-                #return the tile to the same wind direction as the original
-                while not (potential_tile.wind_direction.north == self.current_tile.wind_direction.north and 
-                       potential_tile.wind_direction.east == self.current_tile.wind_direction.east):
-                    potential_tile.rotate_tile_anti()
-                # rotate the tile according to the alternative options in the exploration method
-                rotations.pop()()
-#                    print("rotated tile, so that its wind points N:" +str(potential_tile.wind_direction.north)
-#                         + ";E:"+ str(potential_tile.wind_direction.east))
-        return False
+        adjoining_state = 0
+        for compass_index, compass_point in enumerate(["n", "e", "s", "w"]):
+            edge_water = adjoining_edges_water[compass_point]
+            if edge_water is not None:
+                adjoining_state += (1 + bool(edge_water)) * 3**compass_index
+        move_index = COMPASS_INDEX.get(compass_point_moving)
+        if move_index is None:
+            move_index = COMPASS_INDEX[compass_point_moving.lower()]
+        fit_orientation = get_rotation_fits(self.game.exploration_rules)[
+            ((potential_tile.edge_mask * 81 + adjoining_state) * 4 + self.current_tile.orientation) * 4 + move_index]
+        if fit_orientation is None:
+            #return the tile to the same wind direction as the original
+            potential_tile.orientation = self.current_tile.orientation
+            return False
+        potential_tile.orientation = fit_orientation
+        return True
         
     
     def explore(self, tile_pile, discard_pile, longitude, latitude, compass_point_moving):        
@@ -443,7 +666,7 @@ class AdventurerBeginner(Adventurer):
         int the latitude of the space to explore
         String giving the word or letter for cardinal compass direction from which the Adventurer is moving
         '''
-        print("Exploring to the " +compass_point_moving+ " into the slot at " +str(longitude)+ "," +str(latitude)+ " which has edges...")
+        logger.debug("Exploring to the %s into the slot at %s,%s which has edges...", compass_point_moving, longitude, latitude)
         
         #establish what edges adjoin the given space
         adjoining_edges_water = self.get_adjoining_edges(longitude, latitude)
@@ -451,17 +674,17 @@ class AdventurerBeginner(Adventurer):
         # take multiple attempts at drawing a suitable tile from the pile
         for attempt in range(0, self.max_exploration_attempts):
             if tile_pile.tiles:
-                print("Drawing a tile from the " +tile_pile.tile_back+ " tile deck, which has " +str(len(tile_pile.tiles))+ " tiles")
-                potential_tile = tile_pile.draw_tile()
+                logger.debug("Drawing a tile from the %s tile deck, which has %s tiles", tile_pile.tile_back, len(tile_pile.tiles))
+                potential_tile = tile_pile.draw_tile(self.game.rng)
             elif discard_pile.tiles:
-                print("Have found main tile pile empty, so shuffling Discard Pile")
+                logger.debug("Have found main tile pile empty, so drawing from the Discard Pile instead")
                 self.game.refresh_pile(tile_pile, discard_pile)
                 tile_pile = self.game.tile_piles[tile_pile.tile_back]
                 discard_pile = self.game.discard_piles[discard_pile.tile_back]
-                potential_tile = tile_pile.draw_tile()
+                potential_tile = tile_pile.draw_tile(self.game.rng)
             else: #the game is over, and so this exploration and the turn too
                 self.turns_moved += 1
-                self.game.player_wealths[self.player] += self.game.value_complete_map
+                self.game.change_vault_wealth(self.player, self.game.value_complete_map)
                 self.game.game_over = True
                 break
 #            print("Have drawn a tile with edges N:" +str(potential_tile.compass_edge_water("n"))
@@ -504,7 +727,7 @@ class AdventurerBeginner(Adventurer):
         if self.current_tile.is_wonder:
             #award wealth
             self.wealth += self.value_discover_wonder[tile.tile_back]
-            self.wonders_visited.append(tile)
+            self.wonders_visited.add(tile)
         #check whether an agent can be placed and then whether the player wants to
         self.place_agent()
         return True
@@ -529,12 +752,11 @@ class AdventurerBeginner(Adventurer):
             return False
         
        # collect appropriate wealth into Chest
-        print("Adventurer is trading on tile " 
-                  +str(tile.tile_position.longitude)+ "," +str(tile.tile_position.latitude))
+        logger.debug("Adventurer is trading on tile %s,%s", tile.tile_position.longitude, tile.tile_position.latitude)
         self.wealth += self.value_trade
         
         # keep track of visiting this Wonder
-        self.wonders_visited.append(tile)
+        self.wonders_visited.add(tile)
         
         return True
     
@@ -576,7 +798,7 @@ class AdventurerBeginner(Adventurer):
 #                 print("Adventurer has placed an Agent and must end their turn to set them up")
 #                 self.turns_moved += 1
                 #prevent the Adventurer using the Agent this turn
-                self.agents_rested.append(agent)
+                self.agents_rested.add(agent)
 #                 #the adventurer will rest now before the next turn and be ready
 #                 self.downwind_moves = 0
 #                 self.land_moves = 0
@@ -598,8 +820,7 @@ class AdventurerBeginner(Adventurer):
         '''rests with an Agent if there is one on the tile'''
         #Record the instruction to rest
         tile = self.current_tile
-        print("Adventurer is resting on tile " 
-                  +str(tile.tile_position.longitude)+ "," +str(tile.tile_position.latitude))
+        logger.debug("Adventurer is resting on tile %s,%s", tile.tile_position.longitude, tile.tile_position.latitude)
         return token.give_rest(self)
     
     def can_collect_wealth(self):
@@ -629,8 +850,7 @@ class AdventurerBeginner(Adventurer):
             agent = tile.agent
             if tile.agent.player == self.player:
                 #transfer wealth
-                print("Adventurer is collecting " +str(agent.wealth)+ " wealth from the agent on tile "
-                     +str(agent.current_tile.tile_position.longitude)+","+str(agent.current_tile.tile_position.latitude))
+                logger.debug("Adventurer is collecting %s wealth from the agent on tile %s,%s", agent.wealth, agent.current_tile.tile_position.longitude, agent.current_tile.tile_position.latitude)
                 self.wealth += agent.wealth
                 agent.wealth = 0
                 return True
@@ -640,14 +860,14 @@ class AdventurerBeginner(Adventurer):
     def end_expedition(self, city=None):
         '''Prematurely returns an Adventurer to the last city they visited and empties their wealth.
         '''
-        print(self.player.name+ "'s expedition has been ended and they've returned to a city")
+        logger.debug("%s's expedition has been ended and they've returned to a city", self.player.name)
         self.wealth = 0
         self.current_tile.move_off_tile(self)
         if isinstance(city, CityTile):
             city.move_onto_tile(self)
         else:
             self.latest_city.move_onto_tile(self)
-        self.wonders_visited = [] #reset the list of where trade can happen
+        self.wonders_visited = set() #reset the record of where trade can happen
         #End the Adventurer's turn so that movement resets
 #        self.end_turn()
         
@@ -655,6 +875,7 @@ class AdventurerBeginner(Adventurer):
         '''Deliberately drops wealth and returns to a city
         city_tile is a Cartolan CityTile
         '''
+        self.record_action()
         self.current_tile.dropped_wealth += self.wealth
         self.end_expedition(city=city_tile)
         if isinstance(self.current_tile, CityTile):
@@ -687,6 +908,8 @@ class AgentBeginner(Agent):
     give_rest takes a Cartolan.Adventurer
     manage_trade takes a Cartolan.Adventurer
     '''
+    __slots__ = ("cost_agent_rest",)
+
     def __init__(self, game, player, tile):
         super().__init__(game, player, tile)
         
@@ -715,8 +938,7 @@ class AgentBeginner(Agent):
         adventurer.land_moves = 0
         
         #remember that this Agent has been used already this turn
-        if self not in adventurer.agents_rested:
-            adventurer.agents_rested.append(self)
+        adventurer.agents_rested.add(self)
         
         return True
 
@@ -730,6 +952,7 @@ class CityTileBeginner(CityTile):
     buy_adventurer takes a Cartolan.Adventurer
     buy_agent takes a Cartolan.Adventurer
     '''
+    __slots__ = ()
        
     def move_off_tile(self, token):
         '''Adds a prompt to check how much wealth Adventurers want to take with them
@@ -739,7 +962,7 @@ class CityTileBeginner(CityTile):
             while not travel_money in range(0, token.game.player_wealths[token.player] +1):
                 travel_money = token.player.check_travel_money(token, token.game.player_wealths[token.player], 0)
             token.wealth += travel_money
-            token.game.player_wealths[token.player] -= travel_money
+            token.game.change_vault_wealth(token.player, -travel_money)
         super().move_off_tile(token)
     
     def visit_city(self, adventurer, abandoned=False):
@@ -782,8 +1005,8 @@ class CityTileBeginner(CityTile):
         #check if wealth is available and move it from the adventurer's Chest to their Vault
         if adventurer.wealth >= wealth_to_bank:
             adventurer.wealth -= wealth_to_bank
-            adventurer.game.player_wealths[adventurer.player] += wealth_to_bank
-            print(adventurer.player.name+ " has banked " +str(wealth_to_bank)+ " in their Vault")
+            adventurer.game.change_vault_wealth(adventurer.player, wealth_to_bank)
+            logger.info("%s has banked %s in their Vault", adventurer.player.name, wealth_to_bank)
             self.game.game_over = self.game.check_win_conditions()
             return True
         else:
@@ -803,7 +1026,7 @@ class CityTileBeginner(CityTile):
                 and adventurer.game.player_wealths[adventurer.player] >= adventurer.cost_adventurer):
             if adventurer.player.check_buy_adventurer(adventurer):
                 #take payment of wealth from their Vault
-                adventurer.game.player_wealths[adventurer.player] -= adventurer.cost_adventurer
+                adventurer.game.change_vault_wealth(adventurer.player, -adventurer.cost_adventurer)
                 #place another Adventurer for this Player on the City tile
 #                 new_adventurer = AdventurerBeginner(adventurer.game, adventurer.player, self)
                 new_adventurer = adventurer.game.ADVENTURER_TYPE(adventurer.game, adventurer.player, self)
@@ -812,8 +1035,7 @@ class CityTileBeginner(CityTile):
                 #Allow this new Adventurer to move this turn
 #                 new_adventurer.turns_moved = adventurer.game.turn - 1 # This new Adventurer will play immediately
                 new_adventurer.turns_moved = adventurer.game.turn # This new Adventurer will play from the next turn
-                print(adventurer.player.name+ " has bought an adventurer from the city at " 
-                      +str(self.tile_position.longitude)+","+str(self.tile_position.latitude))
+                logger.info("%s has bought an adventurer from the city at %s,%s", adventurer.player.name, self.tile_position.longitude, self.tile_position.latitude)
             else:
                 return False
         return True
@@ -852,24 +1074,19 @@ class CityTileBeginner(CityTile):
                 if len(self.game.agents[adventurer.player]) >= self.game.MAX_AGENTS:
                     agent = adventurer.player.check_move_agent(adventurer)
                     if not agent is None:
-                        print(adventurer.player.name+ " is recalling their agent from the tile at " 
-                          +str(agent.current_tile.tile_position.longitude)
-                              +","+str(agent.current_tile.tile_position.latitude))
+                        logger.info("%s is recalling their agent from the tile at %s,%s", adventurer.player.name, agent.current_tile.tile_position.longitude, agent.current_tile.tile_position.latitude)
                         agent.current_tile.move_off_tile(agent)
                         #place the Agent on that tile
                         tile.move_onto_tile(agent)
                     else:
-                        print(adventurer.player.name+ " did not want to move any existing Agents, so moving on.")
+                        logger.debug("%s did not want to move any existing Agents, so moving on.", adventurer.player.name)
                         return False
                 else:
                     agent = adventurer.game.AGENT_TYPE(adventurer.game, adventurer.player, tile)
                 
                 #take payment from the Player's Vault
-                adventurer.game.player_wealths[adventurer.player] -= adventurer.cost_agent_from_city
-                print(adventurer.player.name+ " has hired an agent from the city at " 
-                  +str(self.tile_position.longitude)+","+str(self.tile_position.latitude)
-                     +" and sent them to the tile at "
-                     +str(tile.tile_position.longitude)+","+str(tile.tile_position.latitude))
+                adventurer.game.change_vault_wealth(adventurer.player, -adventurer.cost_agent_from_city)
+                logger.info("%s has hired an agent from the city at %s,%s and sent them to the tile at %s,%s", adventurer.player.name, self.tile_position.longitude, self.tile_position.latitude, tile.tile_position.longitude, tile.tile_position.latitude)
         return True
 
     def offer_purchases(self, adventurer):
@@ -882,12 +1099,16 @@ class CityTileBeginner(CityTile):
         self.buy_agents(adventurer)
 
 class WonderTile(Tile):
+     __slots__ = ()
+
      def __init__(self, game, tile_back = "water"
                  , wind_direction = WindDirection(True,True)
                  , tile_edges = TileEdges(True,True,True,True)):
          super().__init__(game, tile_back, wind_direction, tile_edges, True)
 
 class CapitalTileBeginner(CityTileBeginner):
+    __slots__ = ()
+
     def __init__(self, game, tile_back = "water"
                  , wind_direction = WindDirection(True,True)
                  , tile_edges = TileEdges(True,True,True,True)):
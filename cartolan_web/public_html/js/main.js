@@ -0,0 +1,289 @@
+//Builds up the play area from the frames that the server sends: whole keyframes, and deltas that only replace the
+//rectangles that have changed since the last frame
+function FrameCompositor(onFrame, onLost) {
+  this.frame = document.createElement("canvas"); //an offscreen copy of the server's window, at its own resolution
+  this.frameContext = this.frame.getContext("2d");
+  this.onFrame = onFrame; //called with the offscreen canvas whenever it has been updated
+  this.onLost = onLost; //called when a frame couldn't be drawn, so that a whole keyframe can be asked for
+  this.hasKeyframe = false;
+  this.pending = Promise.resolve(); //frames are applied in the order they arrived, even if their images load out of order
+}
+
+FrameCompositor.prototype.loadImage = function (src) {
+  return new Promise(function (resolve, reject) {
+    var img = new Image();
+    img.onload = function () { resolve(img); };
+    img.onerror = function () { reject("image failed to load"); };
+    img.src = src;
+  });
+};
+
+FrameCompositor.prototype.keyframe = function (src) {
+  //Replaces the whole frame, resizing it to match the image
+  var compositor = this;
+  var loaded = this.loadImage(src);
+  this.pending = this.pending.then(function () { return loaded; }).then(function (img) {
+    compositor.frame.width = img.width;
+    compositor.frame.height = img.height;
+    compositor.frameContext.drawImage(img, 0, 0);
+    compositor.hasKeyframe = true;
+    compositor.onFrame(compositor.frame);
+  }).catch(function (error) {
+    console.log("Keyframe could not be drawn: " + error);
+    compositor.hasKeyframe = false;
+    compositor.onLost();
+  });
+};
+
+FrameCompositor.prototype.delta = function (patchData) {
+  //Replaces each of the rectangles listed in JSON, as objects with x, y and an image src
+  var compositor = this;
+  var patches = JSON.parse(patchData);
+  var loaded = Promise.all(patches.map(function (patch) { return compositor.loadImage(patch.src); }));
+  this.pending = this.pending.then(function () { return loaded; }).then(function (imgs) {
+    //changes can only be drawn over a whole frame, so without one ask for it again rather than drawing fragments
+    if (!compositor.hasKeyframe) {
+      throw "no keyframe to apply the changes to";
+    }
+    for (var i = 0; i < imgs.length; i++) {
+      //the frames have transparent areas, so the old pixels are cleared rather than drawn over
+      compositor.frameContext.clearRect(patches[i].x, patches[i].y, imgs[i].width, imgs[i].height);
+      compositor.frameContext.drawImage(imgs[i], patches[i].x, patches[i].y);
+    }
+    compositor.onFrame(compositor.frame);
+  }).catch(function (error) {
+    //the frame is now out of step with the server's, until a keyframe replaces it
+    console.log("Delta frame could not be drawn: " + error);
+    compositor.hasKeyframe = false;
+    compositor.onLost();
+  });
+};
+
+//Draws the play area from the state of play that the server sends, in the server window's pixel coordinates, so that
+//clicks can be sent back just as for images
+var highlightColours = {"move": "lime", "abandon": "grey", "invalid": "red", "buy": "gold", "attack": "crimson"
+  , "rest": "deepskyblue", "buy_rest": "gold", "move_agent": "lime", "agent_transfer": "gold"};
+
+function StateRenderer(onFrame, onLost) {
+  this.frame = document.createElement("canvas");
+  this.frameContext = this.frame.getContext("2d");
+  this.onFrame = onFrame;
+  this.onLost = onLost; //called when the state of play couldn't be kept up to date, so that the whole state can be asked for
+  this.hasKeyframe = false;
+  this.state = {};
+  this.atlas = {}; //tile art by name, which the server only sends once
+  this.pending = Promise.resolve(); //updates are applied in the order they arrived, once their art has loaded
+}
+
+StateRenderer.prototype.update = function (stateData) {
+  //Merges an update into the state of play, replacing it entirely for keyframes, then redraws
+  var renderer = this;
+  var update = JSON.parse(stateData);
+  var atlas = update.atlas || {};
+  var artNames = Object.keys(atlas);
+  var loaded = Promise.all(artNames.map(function (artName) { return FrameCompositor.prototype.loadImage(atlas[artName]); }));
+  this.pending = this.pending.then(function () { return loaded; }).then(function (imgs) {
+    for (var i = 0; i < imgs.length; i++) {
+      renderer.atlas[artNames[i]] = imgs[i];
+    }
+    var tiles = update.tiles;
+    if (update.keyframe) {
+      renderer.state = update;
+      renderer.hasKeyframe = true;
+    } else if (!renderer.hasKeyframe) {
+      throw "no keyframe to apply the changes to";
+    } else {
+      for (var key in update) {
+        if (key !== "tiles") { renderer.state[key] = update[key]; }
+      }
+      //Only the tiles that have changed are sent, with removed ones as null
+      for (var position in tiles || {}) {
+        if (tiles[position] === null) {
+          delete renderer.state.tiles[position];
+        } else {
+          renderer.state.tiles[position] = tiles[position];
+        }
+      }
+    }
+    renderer.draw();
+    renderer.onFrame(renderer.frame);
+  }).catch(function (error) {
+    console.log("State of play could not be drawn: " + error);
+    renderer.hasKeyframe = false;
+    renderer.onLost();
+  });
+};
+
+StateRenderer.prototype.drawArt = function (artName, x, y, size, rotation) {
+  //Draws a piece of tile art turned clockwise about its centre
+  var art = this.atlas[artName];
+  if (!art) { return; }
+  var ctx = this.frameContext;
+  ctx.save();
+  ctx.translate(x + size / 2, y + size / 2);
+  ctx.rotate(rotation * Math.PI / 180);
+  ctx.drawImage(art, -size / 2, -size / 2, size, size);
+  ctx.restore();
+};
+
+StateRenderer.prototype.drawText = function (text, x, y, colour, fontSize, maxWidth) {
+  //Writes text from its top left, wrapping it at the width given
+  var ctx = this.frameContext;
+  ctx.fillStyle = colour;
+  ctx.font = fontSize + "px sans-serif";
+  ctx.textBaseline = "top";
+  var words = text.split(" ");
+  var line = "";
+  for (var i = 0; i < words.length; i++) {
+    var testLine = line + words[i] + " ";
+    if (maxWidth && line !== "" && ctx.measureText(testLine).width > maxWidth) {
+      ctx.fillText(line, x, y);
+      line = words[i] + " ";
+      y += fontSize;
+    } else {
+      line = testLine;
+    }
+  }
+  ctx.fillText(line, x, y);
+  return y + fontSize;
+};
+
+StateRenderer.prototype.draw = function () {
+  var state = this.state;
+  var layout = state.layout;
+  var ctx = this.frameContext;
+  var i, item;
+  if (this.frame.width !== state.size[0] || this.frame.height !== state.size[1]) {
+    this.frame.width = state.size[0];
+    this.frame.height = state.size[1];
+  }
+  ctx.clearRect(0, 0, this.frame.width, this.frame.height);
+  //The play area's tiles, with any Silk dropped on them
+  for (var position in state.tiles) {
+    item = state.tiles[position];
+    this.drawArt(item[3], item[0], item[1], item[2], item[4]);
+    if (item[5] !== "") {
+      this.drawText(item[5], item[0] + item[2] / 3, item[1] + item[2] / 3, item[6], layout.token_font_size);
+    }
+  }
+  //Outlines where moves and actions are possible
+  ctx.lineWidth = layout.route_thickness;
+  for (i = 0; i < state.highlights.length; i++) {
+    item = state.highlights[i];
+    ctx.strokeStyle = highlightColours[item[4]] || "white";
+    ctx.strokeRect(item[0], item[1], item[2], item[3]);
+  }
+  //Adventurers' routes, dashed for their expedition and solid for the latest turn
+  for (i = 0; i < state.routes.length; i++) {
+    item = state.routes[i];
+    ctx.strokeStyle = item[0];
+    ctx.setLineDash(item[1] ? [layout.route_thickness * 2, layout.route_thickness * 2] : []);
+    ctx.beginPath();
+    ctx.moveTo(item[2][0][0], item[2][0][1]);
+    for (var step = 1; step < item[2].length; step++) {
+      ctx.lineTo(item[2][step][0], item[2][step][1]);
+    }
+    ctx.stroke();
+  }
+  ctx.setLineDash([]);
+  //Adventurers are circles, outlined in black as pirates and white if viewed, while Agents are squares, hollow if dispossessed
+  for (i = 0; i < state.tokens.length; i++) {
+    item = state.tokens[i];
+    ctx.fillStyle = item[4];
+    ctx.strokeStyle = item[4];
+    if (item[0] === "adventurer") {
+      ctx.beginPath();
+      ctx.arc(item[1], item[2], item[3], 0, 2 * Math.PI);
+      ctx.fill();
+      if (item[7]) { ctx.strokeStyle = "black"; ctx.stroke(); }
+      if (item[8]) {
+        ctx.beginPath();
+        ctx.arc(item[1], item[2], item[3] + layout.route_thickness, 0, 2 * Math.PI);
+        ctx.strokeStyle = "white";
+        ctx.stroke();
+      }
+      this.drawText(item[5], item[1] - item[3] / 2, item[2] - item[3], item[6], layout.token_font_size);
+    } else {
+      if (item[7]) {
+        ctx.strokeRect(item[1], item[2], item[3], item[3]);
+      } else {
+        ctx.fillRect(item[1], item[2], item[3], item[3]);
+      }
+      this.drawText(item[5], item[1] + item[3] / 4, item[2], item[6], layout.token_font_size);
+    }
+  }
+  //The table of Silk in the left menu
+  var scores = state.scores;
+  var vertical = this.drawText(scores.title, 0, 0, "white", layout.font_size, layout.play_area_start);
+  for (i = 0; i < scores.rows.length; i++) {
+    item = scores.rows[i];
+    vertical = this.drawText(item[0] + ": " + item[2] + " Vault, " + item[3].join(", ") + " Chest", 0, vertical, item[1], layout.font_size, layout.play_area_start);
+  }
+  this.drawText(scores.active[0], 0, vertical, scores.active[1], layout.font_size, layout.play_area_start);
+  //The right menu, with the moves left, auto-action toggles, chest maps and undo button
+  var menus = state.menus;
+  this.drawText(menus.moves[2], menus.moves[0], menus.moves[1], menus.moves[3], layout.font_size, state.size[0] - menus.moves[0]);
+  for (i = 0; i < menus.toggles.length; i++) {
+    item = menus.toggles[i];
+    ctx.fillStyle = item[5] === true ? "lime" : (item[5] === false ? "red" : "transparent");
+    ctx.fillRect(item[0], item[1], item[2], item[3]);
+    ctx.strokeStyle = highlightColours[item[4]] || "white";
+    ctx.strokeRect(item[0], item[1], item[2], item[3]);
+    this.drawText(item[4], item[0], item[1], "white", layout.token_font_size / 2);
+  }
+  for (i = 0; i < menus.chest.length; i++) {
+    item = menus.chest[i];
+    this.drawArt(item[3], item[0], item[1], item[2], item[4]);
+    ctx.strokeStyle = item[5] ? "lime" : "white";
+    ctx.strokeRect(item[0], item[1], item[2], item[2]);
+  }
+  this.drawText(menus.undo[4], menus.undo[0], menus.undo[1], menus.undo[5], layout.font_size);
+  //The tile piles, shaded for the share drawn, and the discarded tiles beneath them
+  for (i = 0; i < menus.piles.length; i++) {
+    item = menus.piles[i];
+    this.drawArt(item[3], item[0], item[1], item[2], 0);
+    ctx.fillStyle = "rgba(0,0,0,0.5)";
+    ctx.fillRect(item[0], item[1], item[2], Math.round(item[5] * item[2]));
+    this.drawText(item[4], item[0], item[1], "white", layout.font_size, item[2]);
+  }
+  for (i = 0; i < menus.discards.length; i++) {
+    item = menus.discards[i];
+    this.drawArt(item[3], item[0], item[1], item[2], item[4]);
+    ctx.strokeStyle = "white";
+    ctx.strokeRect(item[0], item[1], item[2], item[2]);
+  }
+  //The left menu's Cards, stacked so that only the title of those underneath shows
+  for (i = 0; i < state.cards.length; i++) {
+    item = state.cards[i];
+    ctx.fillStyle = "white";
+    ctx.fillRect(item[0], item[1], item[2], item[3]);
+    ctx.strokeStyle = "black";
+    ctx.strokeRect(item[0], item[1], item[2], item[3]);
+    ctx.save();
+    ctx.beginPath();
+    ctx.rect(item[0], item[1], item[2], item[3]);
+    ctx.clip();
+    var cardBottom = this.drawText(item[4], item[0], item[1], "black", layout.font_size, item[2]);
+    this.drawText(item[5], item[0], cardBottom, "black", layout.token_font_size, item[2]);
+    ctx.restore();
+  }
+  for (i = 0; i < state.titles.length; i++) {
+    item = state.titles[i];
+    this.drawText(item[2], item[0], item[1], "white", layout.font_size);
+  }
+  //The prompt beneath the play area
+  var prompt = state.prompt;
+  this.drawText(prompt[0], layout.play_area_start, state.size[1] - 2 * layout.font_size, prompt[1], layout.font_size, layout.prompt_width);
+  //Any offers of tiles or cards go over the top of everything else
+  for (i = 0; i < state.offers.length; i++) {
+    item = state.offers[i];
+    if (item[4] !== null) {
+      this.drawArt(item[4], item[0], item[1], item[2], item[5]);
+    } else {
+      ctx.fillStyle = "white";
+      ctx.fillRect(item[0], item[1], item[2], item[3]);
+      var textBottom = this.drawText(item[6], item[0], item[1], "black", layout.font_size, item[2]);
+      this.drawText(item[7], item[0], textBottom, "black", layout.token_font_size, item[2]);
+    }
+  }
+};
@@ -7,11 +7,13 @@ from beginner import AdventurerBeginner, AgentBeginner, CityTileBeginner, Wonder
 from regular import AdventurerRegular, AgentRegular, CityTileRegular, DisasterTile, CapitalTileRegular, MythicalTileRegular
 from advanced import AdventurerAdvanced, AgentAdvanced, CityTileAdvanced, CardAdvanced
 from base import Tile, WindDirection, TileEdges
-import random
 import csv
+import logging
 #bring in all the constants from the config file
 from game_config import BeginnerConfig, RegularConfig, AdvancedConfig
 
+logger = logging.getLogger(__name__)
+
 class GameBeginner(Game):
     '''Executes the sequence of play for the Beginner mode of the board game Cartolan - Trade Winds
     
@@ -21,11 +23,12 @@ class GameBeginner(Game):
     Agent tokens can be placed as tiles are visited to confer wealth and movement bonuses to Adventurers.
     
     Methods:
-    __init__ takes a List of Cartolan.Players and two Strings
+    __init__ takes a List of Cartolan.Players and two Strings, and optionally an int seed
     start_game
     refresh_pile takes two Cartolan.TilePile objects
     play_round
     check_win_conditions
+    record_chest_wealth
     '''
     #Set non-configurable class level constants
     TILE_PREFIX = "tile_distribution_"
@@ -43,9 +46,9 @@ class GameBeginner(Game):
     MAX_AGENTS = BeginnerConfig.MAX_AGENTS
     
     
-    def __init__(self, players, movement_rules = 'initial', exploration_rules = 'continuous'):
+    def __init__(self, players, movement_rules = 'initial', exploration_rules = 'continuous', seed=None):
         
-        super().__init__(players)
+        super().__init__(players, seed)
         
         if movement_rules in ["initial", "budgetted"]:
             self.movement_rules = movement_rules
@@ -126,12 +129,12 @@ class GameBeginner(Game):
     #     num_tiles = len(players)*game.WATER_TILES_PER_PLAYER
         num_tiles = self.NUM_TILES[tile_back]
         tile_pile = self.tile_piles[tile_back]
-        for tile in random.sample(tiles, num_tiles):
+        for tile in self.rng.sample(tiles, num_tiles):
             tile_pile.add_tile(tile)
         
-        tile_pile.shuffle_tiles()
+        tile_pile.shuffle_tiles(self.rng)
         
-        print("Built a " +tile_back+ " tile pile with " +str(len(self.tile_piles[tile_back].tiles))+ " tiles, and shuffled it")
+        logger.info("Built a %s tile pile with %s tiles, and shuffled it", tile_back, len(self.tile_piles[tile_back].tiles))
     
     def start_game(self):
         '''Begins the sequence of play, under the assumption that the play area has been set up'''
@@ -140,13 +143,15 @@ class GameBeginner(Game):
         while not self.game_over:
             self.turn += 1
             self.game_over = self.play_round()
+        for player in self.players:
+            player.end_game(self)
         
         #report game conclusion to caller
         return True
     
     
     def refresh_pile(self, tile_pile, discard_pile):
-        '''Swaps the discard pile of tiles for the active pile, shuffling it
+        '''Swaps the discard pile of tiles for the active pile, which needn't be shuffled as tiles are drawn at random
         
         Arguments:
         Cartolan.TilePile the pile to replace
@@ -157,16 +162,14 @@ class GameBeginner(Game):
             self.tile_piles.pop(tile_pile.tile_back)
             self.tile_piles[tile_pile.tile_back] = discard_pile
             tile_pile = self.tile_piles[tile_pile.tile_back]
-            discard_pile.shuffle_tiles()
-            print("Have replaced the main tile pile with the discard pile, and shuffled it,"
-                  +" so that now there are " +str(len(self.tile_piles))+ " tile piles.")
+            logger.info("Have replaced the main tile pile with the discard pile,"
+                  " so that now there are %s tile piles.", len(self.tile_piles))
             #Start a new discard pile
             self.discard_piles.pop(discard_pile.tile_back)
             self.discard_piles[discard_pile.tile_back] = TilePile(discard_pile.tile_back, [])
 #             self.discard_piles["water"] = TilePile("water",[])
             discard_pile = self.discard_piles[discard_pile.tile_back]
-            print("Have started a new discard pile, so that now there are "
-                 + str(len(self.discard_piles))+ " discard piles.")
+            logger.info("Have started a new discard pile, so that now there are %s discard piles.", len(self.discard_piles))
             return True
         else:
             self.game_over = self.check_win_conditions() #try and exit here if so
@@ -174,12 +177,12 @@ class GameBeginner(Game):
     
     def play_round(self):
         '''Carries out the sequence of play for one round of the game'''
-        print("playing round "+str(self.turn)+" with a wealth difference of " +str(self.wealth_difference) 
-             +" and a max wealth of " +str(self.max_wealth))
+        logger.info("playing round %s with a wealth difference of %s and a max wealth of %s"
+             , self.turn, self.wealth_difference, self.max_wealth)
         for player in self.players:
             #some logging
-            print(str(player.name)+ " player's turn, with " +str(len(self.adventurers[player])) 
-                  +" Adventurers, and " +str(self.player_wealths[player])+ " wealth in the Vault")
+            logger.debug("%s player's turn, with %s Adventurers, and %s wealth in the Vault"
+                  , player.name, len(self.adventurers[player]), self.player_wealths[player])
 #             if not player.adventurers[0] is None:
 #                 adventurer = player.adventurers[0]
 #                 adventurer_tile = adventurer.current_tile
@@ -192,7 +195,6 @@ class GameBeginner(Game):
                 if adventurer.turns_moved < self.turn:
                     adventurer.turn_route = [adventurer.current_tile]
                     player.continue_turn(adventurer)
-                    print() #to help log readability
                     
                     #check whether this adventurer's turn has won them the game
                     if self.check_win_conditions():
@@ -202,39 +204,23 @@ class GameBeginner(Game):
         for tile_back in self.tile_piles.keys():
             tile_pile = self.tile_piles[tile_back]
             discard_pile = self.discard_piles[tile_back]
-            print(str(len(tile_pile.tiles))+" "+tile_back+" tiles left in the main pile and " +str(len(discard_pile.tiles))+" left in the discard pile")
-            print() #to help log readability
+            logger.debug("%s %s tiles left in the main pile and %s left in the discard pile", len(tile_pile.tiles), tile_back, len(discard_pile.tiles))
             
     
     def check_win_conditions(self):
         '''Checks whether the win conditions have been satisfied so that the game should end'''
         #the end conditions for a game are one player having a certain margin more wealth in their Vault, or one of the tile piles being emptied
-        self.max_wealth = 0
-        self.total_vault_wealth = 0
-        self.total_chest_wealth = 0
-        self.wealth_difference = 0
-        for player in self.players:
-            self.total_vault_wealth += self.player_wealths[player]
-            for adventurer in self.adventurers[player]:
-                self.total_chest_wealth += adventurer.wealth
-            # is this player wealthier than the wealthiest player checked so far?
-            if self.player_wealths[player] > self.max_wealth:
-                self.wealth_difference = self.player_wealths[player] - self.max_wealth
-                self.max_wealth = self.player_wealths[player]
-                self.winning_player = player
-            # if this player is behind in wealth, are they still closer than anyone else?
-            elif self.max_wealth - self.player_wealths[player] < self.wealth_difference:
-                    self.wealth_difference = self.max_wealth - self.player_wealths[player]
-        
+        #the standings are kept up to date as Vaults change, so only need comparing here
         if self.wealth_difference > self.game_winning_difference:
-            print("won by wealth difference")
+            logger.info("won by wealth difference")
             self.win_type = "wealth difference"
+            self.record_chest_wealth()
             self.game_over = True
             return True
 
         for tile_pile in self.tile_piles.values():
             if not tile_pile.tiles and not self.discard_piles[tile_pile.tile_back].tiles:
-                print("won by running out of tiles")
+                logger.info("won by running out of tiles")
                 if self.winning_player:
                     self.win_type = "exhausted " +tile_pile.tile_back+ " tiles"
                 else:
@@ -245,10 +231,18 @@ class GameBeginner(Game):
                             if adventurer.wealth > max_chest_wealth:
                                 self.winning_player = player
                                 max_chest_wealth = adventurer.wealth
+                self.record_chest_wealth()
                 self.game_over = True
                 return True
         
         return False
+    
+    def record_chest_wealth(self):
+        '''Totals the wealth left in Adventurers' Chests as the game ends, as it changes too often to be worth keeping track of in play'''
+        self.total_chest_wealth = 0
+        for player in self.players:
+            for adventurer in self.adventurers[player]:
+                self.total_chest_wealth += adventurer.wealth
 
 
 class GameRegular(GameBeginner):
@@ -270,8 +264,8 @@ class GameRegular(GameBeginner):
     #Inherit configurable class constants from config file
     NUM_TILES = RegularConfig.NUM_TILES
 
-    def __init__(self, players, movement_rules = 'initial', exploration_rules = 'continuous'):
-        super().__init__(players, movement_rules, exploration_rules)
+    def __init__(self, players, movement_rules = 'initial', exploration_rules = 'continuous', seed=None):
+        super().__init__(players, movement_rules, exploration_rules, seed)
         #Inherit some instance constants from the config file
         self.value_discover_wonder = RegularConfig.VALUE_DISCOVER_WONDER
         self.value_discover_city = RegularConfig.VALUE_DISCOVER_CITY
@@ -320,7 +314,7 @@ class GameAdvanced(GameRegular):
     CARD_TYPE = CardAdvanced
 
 #    COST_BUY_TECH = 5
-    def __init__(self, players, movement_rules='initial', exploration_rules='continuous'):
+    def __init__(self, players, movement_rules='initial', exploration_rules='continuous', seed=None):
         #Get game level config variables
         self.num_cadre_choices = AdvancedConfig.NUM_CADRE_CHOICES
         #Get player level config variables
@@ -361,21 +355,20 @@ class GameAdvanced(GameRegular):
         self.transfers_to_agents = AdvancedConfig.TRANSFERS_TO_AGENTS
         self.num_free_rests = AdvancedConfig.NUM_FREE_RESTS
         
-        #Set up the decks of cards
+        super().__init__(players, movement_rules, exploration_rules, seed)
+        
+        #Set up the decks of cards, once the game's random number generator is available to identify them
         self.cadre_cards = [self.CARD_TYPE(self, card_type) for card_type in AdvancedConfig.CADRE_CARDS] #a copy that can be modified independent of the config file
         self.character_cards = [self.CARD_TYPE(self, card_type) for card_type in AdvancedConfig.CHARACTER_CARDS] #a copy that can be modified independent of the config file
         self.discovery_cards = [self.CARD_TYPE(self, card_type) for card_type in AdvancedConfig.MANUSCRIPT_CARDS] #a copy that can be modified independent of the config file
         
-        super().__init__(players, movement_rules='initial', exploration_rules='continuous')
-        
     def choose_cadre(self, player):
         '''Lets the player choose a character card from a random subset
         '''
         cadre_cards = self.cadre_cards
-        card_options = random.sample(cadre_cards, k=self.num_cadre_choices)
-        print("Offering a selection of Cadre cards:")
-        for card in card_options:
-            print(card.card_type)
+        card_options = self.rng.sample(cadre_cards, k=self.num_cadre_choices)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Offering a selection of Cadre cards: %s", ", ".join(card.card_type for card in card_options))
         self.assigned_cadres[player] = player.choose_card(self.adventurers[player][0], card_options)
         cadre_cards.remove(self.assigned_cadres[player])
         #Take on the changes to rules based on the Character card
@@ -59,6 +59,13 @@ class RegularConfig:
     ATTACK_SUCCESS_PROB = 1.0/3.0
     DEFENCE_ROUNDS = 1
     
+    #AI behaviour config
+    MCTS_THINK_TIME = 1.0 #The seconds that tree search players may spend choosing each move
+    MCTS_NUM_WORKERS = 1 #The processes that tree search players spread their rollouts across, with 1 searching in the player's own process
+    MCTS_EXPLORATION_CONSTANT = 1.4 #How strongly tree search players favour trying out moves with few rollouts, over those that have scored well
+    MCTS_ROLLOUT_ROUNDS = 3 #The rounds of play that tree search players simulate after each move, before judging the position
+    MCTS_WORKER_TIMEOUT = 10.0 #The seconds beyond the think time that tree search players wait for their worker processes, before searching without them
+    
 class AdvancedConfig:
     COST_TECH = 3
     
@@ -7,14 +7,14 @@ import pygame
 #import pygame_menu
 import sys
 import os
-import time
 import base64
-import random
-import string
+import io
+import json
 from collections import deque
+from threading import Event
 #from PodSixNet.Connection import ConnectionListener, connection
 #from time import sleep
-from base import Player, CityTile #, TileEdges, WindDirection
+from base import Player, Tile, CityTile #, TileEdges, WindDirection
 from regular import DisasterTile, AdventurerRegular, AgentRegular #, MythicalTileRegular
 from advanced import AdventurerAdvanced
 from game import GameBeginner, GameRegular, GameAdvanced
@@ -151,6 +151,11 @@ class GameVisualisation():
         self.highlight_rects = []
         self.drawn_routes = []
         self.offer_rects = []
+        self.offers = [] #the Tiles or Cards offered in the latest drawing
+        self.menu_cards = [] #the Cards drawn in the left menu, as the rect left visible and the Card
+        self.menu_piles = [] #the tile piles drawn in the right menu, as their position, tile back, count and share drawn
+        self.menu_discards = [] #the discarded Tiles drawn in the right menu, as their position and the Tile
+        self.menu_titles = {} #the titles over each menu besides the scores, by the menu, as their position and text
         #Placeholders for the various GUI elements
         self.scores_rect = (0, 0, 0, 0)
         self.stack_rect = (0, 0, 0, 0)
@@ -160,6 +165,7 @@ class GameVisualisation():
         self.chest_rect = (self.MOVE_COUNT_POSITION[0], self.MOVE_COUNT_POSITION[1], 0, 0)
         self.toggles_rect = (self.MOVE_COUNT_POSITION[0], self.MOVE_COUNT_POSITION[1], 0, 0)
         self.action_rects = []
+        self.fixed_responses = {}
         self.piles_rect = (self.MOVE_COUNT_POSITION[0], self.MOVE_COUNT_POSITION[1], 0, 0)
         self.discard_pile = []
         self.discarding_adventurer = None
@@ -286,6 +292,8 @@ class GameVisualisation():
         print("Importing tile and highlight images and establishing a mapping")
         self.tile_images = {} #a dict of lists of tile images with a particular combination of land, sea and wind
         self.tile_image_library = {} #a dict pairing particular tiles with particular art for the play area itself
+        self.tile_art = {} #a dict pairing particular tiles with the unscaled art assigned to them
+        self.tile_art_names = {} #a dict naming each piece of tile art after its file
         self.menu_tile_library = {} #a dict pairing particular tiles with their art at a scale for the chest and discard piles
         if isinstance(self.game, GameRegular):
             #duplicate tile art for use in selection menu after piracy
@@ -299,6 +307,7 @@ class GameVisualisation():
                 #Resize the tile image to the smallest that will still fit in each of its roles
                 min_size = max(self.tile_size, self.menu_tile_size, self.offer_tile_size)
                 scaled_image = pygame.transform.scale(tile_image.copy(), [min_size, min_size])
+                self.tile_art_names[scaled_image] = tile_image_name.split(".")[0]
                 tile_type_set = self.tile_images.get(tile_type)
                 if tile_type_set is None:
                     self.tile_images[tile_type] = [scaled_image]
@@ -616,6 +625,7 @@ class GameVisualisation():
         tile_name = self.establish_tilename(tile)
         available_tiles = self.tile_images[tile_name]
         tile_image = available_tiles.pop()
+        self.tile_art[tile] = tile_image
         bordered_tile_size = round(self.tile_size * (1 - self.TILE_BORDER))
         self.tile_image_library[tile] = pygame.transform.scale(tile_image.copy(), [bordered_tile_size, bordered_tile_size])
         self.menu_tile_library[tile] = pygame.transform.scale(tile_image.copy(), [self.menu_tile_size, self.menu_tile_size])
@@ -646,6 +656,11 @@ class GameVisualisation():
         self.rescale_as_needed()
         #Clear what's already been drawn
         self.window.fill(self.BACKGROUND_COLOUR)
+        self.offers = []
+        self.menu_cards = []
+        self.menu_piles = []
+        self.menu_discards = []
+        self.menu_titles = {}
 #        self.window.fill(0)
 #        self.window.blit(self.backing_image, [0,0])
         #For each location in the play area draw the tile
@@ -776,6 +791,8 @@ class GameVisualisation():
         vertical = self.piles_rect[1] + self.piles_rect[3]
         discard_title = self.scores_font.render("Failed map draws:", 1, self.PLAIN_TEXT_COLOUR)
         self.window.blit(discard_title, [horizontal, vertical])
+        self.menu_titles["discards"] = [[horizontal, vertical, "Failed map draws:"]]
+        self.menu_discards = []
         horizontal = self.right_menu_start
         vertical += self.SCORES_FONT_SCALE * self.height
         tile_count = 0
@@ -790,6 +807,7 @@ class GameVisualisation():
             rotated_image = self.rotate_tile_image(tile, tile_image)
 #                print("Placing a tile at pixel coordinates " +str(horizontal*self.tile_size)+ ", " +str(vertical*self.tile_size))
             self.window.blit(rotated_image, [horizontal, vertical])
+            self.menu_discards.append(([horizontal, vertical], tile))
             #Draw a frame to keep distinct from play area
             pygame.draw.rect(self.window, self.PLAIN_TEXT_COLOUR
                              , (horizontal, vertical, self.menu_tile_size, self.menu_tile_size)
@@ -1128,6 +1146,8 @@ class GameVisualisation():
         self.piles_rect = (horizontal, vertical, 0, 0)
         piles_title = self.scores_font.render("Maps to draw:", 1, self.PLAIN_TEXT_COLOUR)
         self.window.blit(piles_title, (horizontal, vertical))
+        self.menu_titles["piles"] = [[horizontal, vertical, "Maps to draw:"]]
+        self.menu_piles = []
         vertical += piles_title.get_height()
         for tile_back in self.game.tile_piles:
             tiles = self.game.tile_piles[tile_back].tiles
@@ -1143,6 +1163,7 @@ class GameVisualisation():
             self.window.blit(tile_back_image, tile_count_position)
             self.window.blit(tile_meter, tile_count_position)
             self.window.blit(pile_text, tile_count_position)
+            self.menu_piles.append((tile_count_position, tile_back, count, pile_share))
             horizontal += tile_meter.get_width()
         #Finish recording the surrounding rect for click detection, but will need to count max adventurers below to finalise this
         self.piles_rect = (self.piles_rect[0]
@@ -1168,6 +1189,7 @@ class GameVisualisation():
         if not self.current_adventurer.player == self.viewed_adventurer.player:
             return #This menu isn't relevant if the adventurer doesn't belong to the player viewing
         self.action_rects = [] #Reset the record of where the toggle menu buttons have been drawn
+        self.fixed_responses = fixed_responses
         #Establish the top left coordinate below the table of Silk scores
 #        horizontal = self.MOVE_COUNT_POSITION[0] * self.width
 #        vertical = self.SCORES_FONT_SCALE * self.height * (len(self.game.tile_piles) + 1)
@@ -1223,23 +1245,27 @@ class GameVisualisation():
     def draw_undo_button(self):
         '''Adds an undo button and a click hit-box that will allow the game to be reset to a preceding state, providing all players agree.
         '''
-        #Check whether the other clients to the game have proposed/agreed to an undo
+        undo_button = self.scores_font.render(*self.get_undo_label())
+        horizontal = self.width - undo_button.get_width()
+        vertical = self.height - undo_button.get_height()
+        self.window.blit(undo_button, (horizontal, vertical))
+        self.undo_rect = (horizontal, vertical, undo_button.get_width(), undo_button.get_height())
+            
+    def get_undo_label(self):
+        '''Works out the text and colour of the undo button, depending on whether this or other clients to the game have proposed/agreed to an undo
+        '''
         undo_asked = False
         for peer in self.peer_visuals:
             if not peer == self and peer.undo_agreed:
                 undo_asked = True
                 break
         if self.undo_agreed:
-            undo_button = self.scores_font.render("Reject undo", 1, self.ACCEPT_UNDO_COLOUR)
+            return "Reject undo", 1, self.ACCEPT_UNDO_COLOUR
         elif undo_asked:
-            undo_button = self.scores_font.render("Accept undo?", 1, self.ACCEPT_UNDO_COLOUR)
+            return "Accept undo?", 1, self.ACCEPT_UNDO_COLOUR
         else:
-            undo_button = self.scores_font.render("Undo turn?", 1, self.PLAIN_TEXT_COLOUR)
-        horizontal = self.width - undo_button.get_width()
-        vertical = self.height - undo_button.get_height()
-        self.window.blit(undo_button, (horizontal, vertical))
-        self.undo_rect = (horizontal, vertical, undo_button.get_width(), undo_button.get_height())
-            
+            return "Undo turn?", 1, self.PLAIN_TEXT_COLOUR
+    
     def draw_chest_tiles(self):
         '''Visualises a set of tiles in the Adventurer's Chest, and highlights one if it is selected for use
         '''
@@ -1311,10 +1337,13 @@ class GameVisualisation():
 #        vertical = self.SCORES_FONT_SCALE * self.height * (len(self.game.players) + 1) 
         vertical = self.scores_rect[1] + self.scores_rect[3]
 #        vertical = self.chest_rect[1] + self.chest_rect[3]
+        self.menu_titles["cards"] = []
+        self.menu_cards = []
         #draw the Adventurer's Player's Cadre Card        
         if self.game.assigned_cadres.get(adventurer.player) is not None:
             card_title = self.scores_font.render(adventurer.player.name+"'s Culture card:", 1, self.PLAIN_TEXT_COLOUR)
             self.window.blit(card_title, [horizontal, vertical])
+            self.menu_titles["cards"].append([horizontal, vertical, adventurer.player.name+"'s Culture card:"])
             #Now draw the card itself
             card = self.game.assigned_cadres.get(adventurer.player)
             card_image = self.card_image_library.get(card)
@@ -1323,6 +1352,7 @@ class GameVisualisation():
             vertical += self.SCORES_FONT_SCALE * self.height
             self.window.blit(card_image, [horizontal, vertical], [0, 0, card_image.get_width(), card_image.get_height() * self.CARD_HEADER_SHARE ])
             self.cadre_card_rect = (horizontal, vertical, self.play_area_start, card_image.get_height() * self.CARD_HEADER_SHARE)
+            self.menu_cards.append((self.cadre_card_rect, card))
             vertical += card_image.get_height() * self.CARD_HEADER_SHARE
             if self.selected_cadre_card:
                 self.draw_card_offers([card])
@@ -1330,6 +1360,7 @@ class GameVisualisation():
         if adventurer.character_card is not None:
             card_title = self.scores_font.render("Adventurer #"+str(self.game.adventurers[adventurer.player].index(adventurer)+1)+" cards:", 1, self.PLAIN_TEXT_COLOUR)
             self.window.blit(card_title, [horizontal, vertical])
+            self.menu_titles["cards"].append([horizontal, vertical, "Adventurer #"+str(self.game.adventurers[adventurer.player].index(adventurer)+1)+" cards:"])
         vertical += self.SCORES_FONT_SCALE * self.height
 #        stack_size = self.card_height * (1 + self.CARD_HEADER_SHARE * len(adventurer.character_cards))
         stack_size = self.card_height + self.card_height * self.CARD_HEADER_SHARE * len(adventurer.discovery_cards)  #one character card plus all the manuscripts
@@ -1347,6 +1378,8 @@ class GameVisualisation():
             if card_image is None:
                 card_image = self.assign_card_image(card)
             self.window.blit(card_image, [horizontal, vertical])
+            #only the header is left visible, once the next card is drawn over it
+            self.menu_cards.append(((horizontal, vertical, self.play_area_start, self.CARD_HEADER_SHARE * card_image.get_height()), card))
             vertical += self.CARD_HEADER_SHARE * card_image.get_height()
         
         #Draw the Adventurer's Character Card over the top
@@ -1359,6 +1392,7 @@ class GameVisualisation():
                 #        card_horizontal = 0
             vertical = self.stack_rect[1] + card_image.get_height() * self.CARD_HEADER_SHARE * len(adventurer.discovery_cards)
             self.window.blit(card_image, [horizontal, vertical])
+            self.menu_cards.append(((horizontal, vertical, self.play_area_start, card_image.get_height()), card))
             # If one of the cards has been selected then draw it mid screen
             if self.selected_character_card:
                 self.draw_card_offers([adventurer.character_card])
@@ -1384,6 +1418,7 @@ class GameVisualisation():
         '''
         # self.offer_images = [] #reset the record of card images in use
         self.offer_rects = [] #reset the record of card positions for selection
+        self.offers = cards
         #Cycle through the offered Cards, drawing them
         horizontal_increment = self.width // (len(cards) + 1)
         card_horizontal = horizontal_increment
@@ -1415,6 +1450,7 @@ class GameVisualisation():
         '''
         # self.offer_images = [] #reset the record of card images in use
         self.offer_rects = [] #reset the record of card positions for selection
+        self.offers = tiles
         #Cycle through the offered Cards, drawing them
         horizontal_increment = self.width // (len(tiles) + 1)
         tile_horizontal = horizontal_increment
@@ -1591,14 +1627,34 @@ class WebServerVisualisation(GameVisualisation):
     There will be a separate visual for each client.
     Because the clients all need to see every move, each visual will send for every player.
     But, only the moving player's visual will receive input. 
+    
+    Clients can either be sent images of the play area, or the state of play for the browser to render itself.
+    Either way, each client's visual is drawn with pygame on the server, to find where its clicks land.
     '''
-    TEMP_FILENAME_LEN = 6
-    TEMP_FILE_EXTENSION = ".png"
-    INPUT_DELAY = 0.1 #delay time between checking for input, in seconds
+    PROTOCOLS = ["image", "state"]
+    FRAME_FORMAT = "png" #the image format that frames are sent to clients in: png, jpeg or webp
+    FRAME_QUALITY = 80 #the quality of the lossy formats, from 1 to 100
+    FRAME_MATTE_COLOUR = (255,255,255) #the colour that transparent areas are flattened onto, for formats without transparency
+    FRAME_BLOCK_SIZE = 32 #the width and height in pixels of the blocks that frames are compared in, to find what has changed
+    MAX_DELTA_SHARE = 0.5 #the share of the window that can change before the whole frame is sent instead of its parts
     
-    def __init__(self, game, peer_visuals, player_colours, client, width, height):
+    def __init__(self, game, peer_visuals, player_colours, client, width, height, frame_format=FRAME_FORMAT, frame_quality=FRAME_QUALITY, protocol="image"):
         self.peer_visuals = peer_visuals
         self.client = client
+        if protocol not in self.PROTOCOLS:
+            raise Exception("Clients can't be sent updates with the protocol: "+protocol)
+        self.protocol = protocol
+        self.frame_format = frame_format.lower()
+        self.frame_quality = frame_quality
+        #the pixels of the last frame sent, which later frames only send their changes from
+        self.last_frame = None
+        self.last_frame_size = None
+        #likewise the last state of play sent, and the tile art that the client has already been sent
+        self.last_state = None
+        self.atlas_art = {}
+        self.atlas_sent = set()
+        self.keyframe_requested = False #set when the client asks for the whole frame again
+        self.input_event = Event() #set by the clients when they receive input, while this visual is waiting on it
         self.width, self.height = width, height
         self.client_players = []
         super().__init__(game, peer_visuals, player_colours)
@@ -1650,18 +1706,307 @@ class WebServerVisualisation(GameVisualisation):
         #Import images
         self.init_graphics()
     
+    def encode_frame(self, surface=None):
+        '''Encodes the window, or a part of it, as an image in memory in this visual's frame format, returning a data URL of it
+        '''
+        if surface is None:
+            surface = self.window
+        frame_buffer = io.BytesIO()
+        if self.frame_format == "png":
+            #pygame can write PNGs itself, taking the format from the name hint
+            pygame.image.save(surface, frame_buffer, "frame.png")
+        elif self.frame_format in ["jpeg", "webp"]:
+            #Pillow is only needed for the lossy formats, which pygame can't set a quality for
+            from PIL import Image
+            frame = Image.frombytes("RGBA", surface.get_size(), pygame.image.tostring(surface, "RGBA"))
+            if self.frame_format == "jpeg":
+                flattened_frame = Image.new("RGB", frame.size, self.FRAME_MATTE_COLOUR)
+                flattened_frame.paste(frame, mask=frame.getchannel("A"))
+                flattened_frame.save(frame_buffer, "JPEG", quality=self.frame_quality)
+            else:
+                frame.save(frame_buffer, "WEBP", quality=self.frame_quality)
+        else:
+            raise Exception("Frames can't be encoded in the format: "+self.frame_format)
+        return "data:image/"+self.frame_format+";base64,"+base64.b64encode(frame_buffer.getvalue()).decode("ascii")
+    
+    def find_changed_rects(self, frame):
+        '''Compares a frame's pixels with the last one sent, returning rects that cover the blocks that have changed
+        
+        Changed blocks are joined into runs along each band of rows, and then runs spanning the same columns are joined down the bands.
+        
+        Arguments
+        frame takes the bytes of an RGBA frame, the same size as the last one
+        '''
+        width, height = self.last_frame_size
+        row_length = 4 * width
+        changed_rects = []
+        open_rects = {} #the rects that could still be extended down into the next band, keyed by their columns
+        for top in range(0, height, self.FRAME_BLOCK_SIZE):
+            band_height = min(self.FRAME_BLOCK_SIZE, height - top)
+            band_start, band_end = top * row_length, (top + band_height) * row_length
+            runs = []
+            #most bands won't have changed at all, so they are compared whole first
+            if frame[band_start:band_end] != self.last_frame[band_start:band_end]:
+                run_start = None
+                for left in range(0, width, self.FRAME_BLOCK_SIZE):
+                    block_end = 4 * min(left + self.FRAME_BLOCK_SIZE, width)
+                    block_changed = False
+                    for row_start in range(band_start, band_end, row_length):
+                        if frame[row_start + 4*left:row_start + block_end] != self.last_frame[row_start + 4*left:row_start + block_end]:
+                            block_changed = True
+                            break
+                    if block_changed and run_start is None:
+                        run_start = left
+                    elif not block_changed and run_start is not None:
+                        runs.append((run_start, left))
+                        run_start = None
+                if run_start is not None:
+                    runs.append((run_start, width))
+            extended_rects = {}
+            for run in runs:
+                rect = open_rects.pop(run, None)
+                if rect is None:
+                    rect = [run[0], top, run[1] - run[0], 0]
+                rect[3] += band_height
+                extended_rects[run] = rect
+            #rects that weren't extended into this band are finished
+            changed_rects.extend(open_rects.values())
+            open_rects = extended_rects
+        changed_rects.extend(open_rects.values())
+        return changed_rects
+    
+    def close(self):
+        '''Lets go of this visual once its game is over, leaving pygame running for the server's other games
+        '''
+        self.peer_visuals = []
+        self.last_frame = None
+        self.last_state = None
+    
+    def request_keyframe(self):
+        '''Makes sure that the next update sends the whole frame, rather than only what has changed
+        
+        This is called from the server's event loop when a client has lost track of the frames, so only sets a flag for the game's thread to act on.
+        '''
+        self.keyframe_requested = True
+    
     def update_web_display(self):
         '''For this client visualisation in particular, send out an image of the play area.
+        
+        The whole frame is sent when the client first joins, the window is resized or the client asks for it, and otherwise only the rects that have changed.
         '''
 #        pygame.display.flip()
-        #generate a random filename, to avoid thread conflicts
-        randname = ( ''.join(random.choice(string.ascii_lowercase) for i in range(self.TEMP_FILENAME_LEN)) )
-        #@TODO could reduce file size and latency by compressing into a lossy jpg
-        pygame.image.save(self.window, randname + self.TEMP_FILE_EXTENSION)
-        out = open(randname + self.TEMP_FILE_EXTENSION,"rb").read()
-        self.client.sendMessage("IMAGE[00100]"+str(base64.b64encode(out)))
+        if self.keyframe_requested:
+            self.keyframe_requested = False
+            self.last_frame = None
+            self.last_state = None
+            self.atlas_sent = set() #in case it was the tile art that the client couldn't load
+        if self.protocol == "state":
+            return self.send_game_state()
+        frame = pygame.image.tostring(self.window, "RGBA")
+        frame_size = self.window.get_size()
+        if self.last_frame is not None and frame_size == self.last_frame_size:
+            changed_rects = self.find_changed_rects(frame)
+            if not changed_rects:
+                return
+            changed_area = sum(rect[2] * rect[3] for rect in changed_rects)
+            if changed_area <= self.MAX_DELTA_SHARE * frame_size[0] * frame_size[1]:
+                patches = [{"x":rect[0], "y":rect[1], "src":self.encode_frame(self.window.subsurface(rect))}
+                           for rect in changed_rects]
+                self.client.sendMessage("DELTA[00100]"+json.dumps(patches))
+                print(str(len(patches))+" changed areas sent to client at "+str(self.client.address))
+                self.last_frame = frame
+                return
+        self.client.sendMessage("IMAGE[00100]"+self.encode_frame())
         print("data sent to client at "+str(self.client.address))
-        os.remove(randname + self.TEMP_FILE_EXTENSION)
+        self.last_frame, self.last_frame_size = frame, frame_size
+    
+    def get_css_colour(self, colour):
+        '''Gives a colour name or RGB tuple in a form that the browser can draw with
+        '''
+        if isinstance(colour, str):
+            return colour
+        return "rgb("+",".join(str(value) for value in colour[:3])+")"
+    
+    def get_tile_art(self, tile):
+        '''Names the art assigned to a tile, so that the client can draw it from the atlas of art it has been sent
+        '''
+        tile_image = self.tile_art.get(tile)
+        if tile_image is None:
+            self.assign_tile_image(tile)
+            tile_image = self.tile_art[tile]
+        return self.get_art_name(tile_image)
+    
+    def get_art_name(self, tile_image):
+        '''Names a piece of tile art, adding it to those that the client will need sending
+        '''
+        art_name = self.tile_art_names[tile_image]
+        self.atlas_art[art_name] = tile_image
+        return art_name
+    
+    def get_tile_rotation(self, tile):
+        '''Translates a tile's wind direction into the degrees clockwise that its art is turned, as in rotate_tile_image
+        '''
+        wind_direction = tile.wind_direction
+        if wind_direction.north:
+            return 0 if wind_direction.east else 270
+        return 90 if wind_direction.east else 180
+    
+    def get_token_location(self, tile, offset):
+        '''Finds the pixel coordinates of a point offset within a tile of the play area, as tokens and routes are drawn
+        '''
+        position = tile.tile_position
+        return [int(self.play_area_start + self.tile_size * (self.get_horizontal(position.longitude) + offset[0]))
+                , int(self.tile_size * (self.get_vertical(position.latitude) + offset[1]))]
+    
+    def get_game_state(self):
+        '''Describes what this visual shows as a dict of lists for the browser to render, in the window's pixel coordinates
+        
+        The pygame drawing still works out where everything goes and which areas can be clicked, so the state shares its positions.
+        That drawing still happens on the server for each client, so this protocol saves bandwidth rather than the server's CPU.
+        '''
+        game = self.game
+        players = game.players
+        plain_colour = self.get_css_colour(self.PLAIN_TEXT_COLOUR)
+        state = {"size":[self.width, self.height]
+                 , "layout":{"play_area_start":self.play_area_start
+                             , "prompt_width":self.width - self.play_area_start - self.right_menu_width
+                             , "font_size":round(self.height * self.SCORES_FONT_SCALE)
+                             , "token_font_size":round(self.tile_size * self.TOKEN_FONT_SCALE)
+                             , "route_thickness":self.route_thickness}
+                 }
+        #Tiles are keyed by their position, so that only those that change need sending
+        tiles = {}
+        bordered_tile_size = round(self.tile_size * (1 - self.TILE_BORDER))
+        for tile in game.play_area.all_tiles():
+            position = tile.tile_position
+            if tile.dropped_wealth > 0:
+                label = str(tile.dropped_wealth)
+            else:
+                label = ""
+            if tile.is_wonder:
+                label_colour = self.get_css_colour(self.WONDER_TEXT_COLOUR)
+            else:
+                label_colour = plain_colour
+            tiles[str(position.longitude)+","+str(position.latitude)] = [
+                self.play_area_start + self.get_horizontal(position.longitude) * self.tile_size
+                , self.get_vertical(position.latitude) * self.tile_size
+                , bordered_tile_size, self.get_tile_art(tile), self.get_tile_rotation(tile), label, label_colour]
+        state["tiles"] = tiles
+        highlight_rects = self.highlight_rects or {}
+        state["highlights"] = [list(highlight_rect) + [highlight_type] 
+                               for highlight_type in highlight_rects for highlight_rect in highlight_rects[highlight_type]]
+        #Adventurers are circles and Agents squares, in each player's colour
+        tokens = []
+        routes = []
+        for player in players:
+            colour = self.player_colours[player]
+            player_offset = self.PLAYER_OFFSETS[players.index(player)]
+            label_colour = self.get_css_colour(self.TOKEN_FONT_COLOURS.get(colour, self.PLAIN_TEXT_COLOUR))
+            adventurers = game.adventurers[player]
+            show_routes = (self.draw_all_routes 
+                           or player in [self.current_adventurer.player, self.viewed_adventurer.player])
+            for adventurer_num, adventurer in enumerate(adventurers):
+                adventurer_offset = [self.ADVENTURER_OFFSETS[adventurer_num][i] + player_offset[i] for i in [0, 1]]
+                location = self.get_token_location(adventurer.current_tile, adventurer_offset)
+                is_pirate = isinstance(adventurer, AdventurerRegular) and adventurer.pirate_token
+                tokens.append(["adventurer", location[0], location[1], self.token_size, colour, str(adventurer_num+1), label_colour
+                               , is_pirate, adventurer == self.viewed_adventurer])
+                if show_routes:
+                    #the expedition's route is dashed, and the latest turn's solid
+                    for route, dashed in [(adventurer.route, True), (adventurer.turn_route, False)]:
+                        if route:
+                            routes.append([colour, dashed, [self.get_token_location(tile, adventurer_offset) for tile in route]])
+            for agent in game.agents[player]:
+                if not agent.current_tile:
+                    continue
+                location = self.get_token_location(agent.current_tile, self.AGENT_OFFSET)
+                is_dispossessed = isinstance(agent, AgentRegular) and agent.is_dispossessed
+                tokens.append(["agent", location[0], location[1], self.AGENT_SCALE*self.token_size, colour, str(agent.wealth), label_colour
+                               , is_dispossessed, False])
+        state["tokens"] = tokens
+        state["routes"] = routes
+        #The table of Silk is laid out by the client, with a row for each player
+        state["scores"] = {"title":"At turn "+str(game.turn)+", players have this much Silk in their..."
+                           , "rows":[[player.name, self.player_colours[player], game.player_wealths[player]
+                                      , [adventurer.wealth for adventurer in game.adventurers[player]]] for player in players]
+                           , "active":[self.current_adventurer.player.name+"'s Adventurer #"+str(self.current_adventurer_number+1)+"'s turn"
+                                       , self.current_player_colour]
+                           }
+        #The right menu's moves, auto-actions and chest maps
+        if self.current_adventurer == self.viewed_adventurer:
+            adventurer = self.current_adventurer
+            moves_since_rest = adventurer.downwind_moves + adventurer.upwind_moves + adventurer.land_moves
+            only_downwind_moves = adventurer.max_downwind_moves - adventurer.max_upwind_moves
+            moves_report = ("Moves until rest: "+str(max(adventurer.max_upwind_moves - moves_since_rest, 0))+" / "+str(adventurer.max_upwind_moves)
+                            +" any way, "+str(only_downwind_moves - max(moves_since_rest - adventurer.max_upwind_moves, 0))+" / "+str(only_downwind_moves)+" downwind")
+        else:
+            moves_report = "Not #" +str(self.viewed_adventurer_number+1)+ "'s turn"
+        menus = {"moves":[self.right_menu_start, 0, moves_report, self.viewed_player_colour]
+                 , "toggles":[list(action_rect) + [highlight_type, self.fixed_responses.get(highlight_type)] 
+                              for action_rect, highlight_type in self.action_rects]
+                 , "chest":[]
+                 }
+        if isinstance(self.viewed_adventurer, AdventurerRegular):
+            chest_tiles = self.viewed_adventurer.chest_tiles
+            for tile_num, tile in enumerate(chest_tiles):
+                menus["chest"].append([self.chest_rect[0] + (tile_num % self.MENU_TILE_COLS) * self.menu_tile_size
+                                       , self.chest_rect[1] + (tile_num // self.MENU_TILE_COLS) * self.menu_tile_size
+                                       , self.menu_tile_size, self.get_tile_art(tile), self.get_tile_rotation(tile)
+                                       , tile_num == self.viewed_adventurer.preferred_tile_num])
+        undo_text, _, undo_colour = self.get_undo_label()
+        menus["undo"] = list(self.undo_rect) + [undo_text, self.get_css_colour(undo_colour)]
+        #The piles show the art of their tile backs and the share drawn, with the discarded tiles beneath
+        menus["piles"] = [list(position) + [self.menu_tile_size, self.get_art_name(self.tile_images[tile_back][0]), count, pile_share]
+                          for position, tile_back, count, pile_share in self.menu_piles]
+        menus["discards"] = [list(position) + [self.menu_tile_size, self.get_tile_art(tile), self.get_tile_rotation(tile)]
+                             for position, tile in self.menu_discards]
+        state["menus"] = menus
+        #The left menu's stack of Cards, summarised in text like the Cards offered, with the part of each left visible
+        state["cards"] = [list(card_rect) + [self.CARD_TITLES.get(card.card_type, ""), self.CARD_TEXTS.get(card.card_type, "")]
+                          for card_rect, card in self.menu_cards]
+        state["titles"] = [title for menu in self.menu_titles for title in self.menu_titles[menu]]
+        #Offers of Tiles show their art, while Cards are summarised in text
+        offers = []
+        for offer, offer_rect in zip(self.offers, self.offer_rects):
+            if isinstance(offer, Tile):
+                offers.append(list(offer_rect) + [self.get_tile_art(offer), self.get_tile_rotation(offer), "", ""])
+            else:
+                offers.append(list(offer_rect) + [None, 0, self.CARD_TITLES.get(offer.card_type, ""), self.CARD_TEXTS.get(offer.card_type, "")])
+        state["offers"] = offers
+        state["prompt"] = [self.prompt_text, self.current_player_colour]
+        return state
+    
+    def send_game_state(self):
+        '''For this client visualisation in particular, send out the parts of the state of play that have changed
+        
+        The whole state is sent when the client first joins or the window is resized, along with any tile art it hasn't been sent yet.
+        '''
+        state = self.get_game_state()
+        if self.last_state is None or state["size"] != self.last_state["size"]:
+            update = dict(state)
+            update["keyframe"] = True
+        else:
+            update = {key:value for key, value in state.items() if key != "tiles" and value != self.last_state[key]}
+            #Tiles that have changed are sent individually, and those removed as null
+            tiles = {position:tile for position, tile in state["tiles"].items() if self.last_state["tiles"].get(position) != tile}
+            for position in self.last_state["tiles"]:
+                if position not in state["tiles"]:
+                    tiles[position] = None
+            if tiles:
+                update["tiles"] = tiles
+            if not update:
+                return
+            update["keyframe"] = False
+        atlas = {}
+        for art_name in self.atlas_art:
+            if art_name not in self.atlas_sent:
+                atlas[art_name] = self.encode_frame(self.atlas_art[art_name])
+                self.atlas_sent.add(art_name)
+        if atlas:
+            update["atlas"] = atlas
+        self.client.sendMessage("STATE[00100]"+json.dumps(update))
+        print("state sent to client at "+str(self.client.address))
+        self.last_state = state
     
     def get_input_value(self, adventurer, prompt_text, maximum, minimum = 0):
         '''Sends a prompt to the player, and waits for numerical input.
@@ -1677,7 +2022,8 @@ class WebServerVisualisation(GameVisualisation):
         self.client.sendMessage("PROMPT[00100]"+prompt_text)
         input_value = None
         while not input_value:
-            input_value = self.client.get_text()
+            input_value = self.client.get_text(block=True)
+            self.check_client_open()
             if input_value:
 #                print("Trying to interpret "+input_value+" as a number")
                 try:
@@ -1691,8 +2037,6 @@ class WebServerVisualisation(GameVisualisation):
                     return None
             input_value = None
             #@TODO check for input from the other clients to their visuals and update their view
-            #Wait before checking again
-            time.sleep(self.INPUT_DELAY)
         return None
         
     def refresh_peers(self, adventurer, choices=None, input_type="move"):
@@ -1788,6 +2132,32 @@ class WebServerVisualisation(GameVisualisation):
                         game_vis.refresh_visual()
                         game_vis.update_web_display()
     
+    def check_client_open(self):
+        '''Stops the game if this visual's client has disconnected, as its input will never arrive
+        '''
+        if self.client.closed:
+            raise Exception("The client at "+str(self.client.address)+" disconnected while its input was awaited")
+    
+    def wait_for_coords(self):
+        '''Blocks until this visual's client or one of its peers' has sent click coordinates that haven't been taken yet
+        
+        Clients set the same events when they disconnect, so that a game waiting on them can end rather than wait forever.
+        '''
+        self.check_client_open()
+        clients = {game_vis.client for game_vis in self.peer_visuals}
+        clients.add(self.client)
+        #The event is cleared before checking the clients, so that input arriving in between will still wake this visual
+        self.input_event.clear()
+        for client in clients:
+            client.input_events.add(self.input_event)
+        try:
+            if not any(client.has_coords() for client in clients):
+                self.input_event.wait()
+        finally:
+            for client in clients:
+                client.input_events.discard(self.input_event)
+        self.check_client_open()
+    
     def check_peers_undo(self):
         '''Cycles through all clients of the game to see whether they all agree to undo this turn
         '''
@@ -1920,18 +2290,17 @@ class WebServerVisualisation(GameVisualisation):
                 longitude = int(math.ceil((horizontal - self.play_area_start) / self.tile_size)) - self.origin[
                     0] - 1
                 latitude = self.dimensions[1] - int(math.ceil((vertical) / self.tile_size)) - self.origin[1]
-                if self.game.play_area.get(longitude) is not None:
-                    if self.game.play_area.get(longitude).get(latitude) is not None:
-                        #
-                        # Remember to showcase the tile at this position
-                        self.viewed_longitude = longitude
-                        self.viewed_latitude = latitude
-                        # Don't showcase anything else
-                        self.selected_cadre_card = False
-                        self.selected_character_card = False
-                        self.selected_card_num = None
-                        self.viewed_tile_num = None
-                        return True
+                if self.game.play_area.get_tile(longitude, latitude) is not None:
+                    #
+                    # Remember to showcase the tile at this position
+                    self.viewed_longitude = longitude
+                    self.viewed_latitude = latitude
+                    # Don't showcase anything else
+                    self.selected_cadre_card = False
+                    self.selected_character_card = False
+                    self.selected_card_num = None
+                    self.viewed_tile_num = None
+                    return True
         return False
     
     def get_input_coords(self, adventurer):
@@ -2014,8 +2383,9 @@ class WebServerVisualisation(GameVisualisation):
             if self.check_peers_undo():
                 print("Confirmed with all clients that turn can be undone.")
                 return {"undo":"undo"}
-            #Wait before checking again            
-            time.sleep(self.INPUT_DELAY)
+            #Wait for the next input from any of the clients
+            if coords is None:
+                self.wait_for_coords()
         
         return {"Nothing":"Nothing"}
 
@@ -2060,6 +2430,6 @@ class WebServerVisualisation(GameVisualisation):
                 coords = None #Let them try again
             #Check for input from the other clients to their visuals and update their view
             self.check_peer_input()
-            time.sleep(self.INPUT_DELAY)
+            self.wait_for_coords()
         
         return False
\ No newline at end of file
@@ -52,7 +52,7 @@ def setup_tiles(players, game_mode, movement_rules, exploration_rules, mythical_
             game.tile_piles["land"].tiles.append(game.CITY_TYPE(game, WindDirection(True,True), TileEdges(False,False,False,False), False, True))
     
     for pile in game.tile_piles.values():
-        random.shuffle(pile.tiles)
+        pile.shuffle_tiles(game.rng)
     
     print("Placed the Capital tile, and surrounding water tiles")
     return game
@@ -207,6 +207,8 @@ class InteractiveGame:
 #             for player in self.players:
 #                 for adventurer in player.adventurers:
 #                     adventurer.route = []
+        for player in self.game.players:
+            player.end_game(self.game)
                 
         self.game_vis.give_prompt(self.game.winning_player.name+" won the game (click to close)")
 #         pyplot.waitforbuttonpress() #Delay until the player has read the message
@@ -3,15 +3,22 @@ Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
 '''
 
 import sys
+import os
+import logging
+from multiprocessing import Pool
 from matplotlib import pyplot
 import pandas
+import numpy
 import random
+import json
 from game import GameBeginner, GameRegular, GameAdvanced
 from players_heuristical import PlayerBeginnerExplorer, PlayerBeginnerTrader, PlayerBeginnerRouter
 from players_heuristical import PlayerRegularExplorer, PlayerRegularTrader, PlayerRegularRouter, PlayerRegularPirate
 from base import Tile, WindDirection, TileEdges
 from static_visuals import PlayAreaVisualisation, PlayStatsVisualisation
 
+logger = logging.getLogger(__name__)
+
 #Default parameters
 GAME_MODE = "Regular"
 MOVEMENT_RULE = "initial" #"budgetted"
@@ -19,6 +26,30 @@ EXPLORATION_RULE = "clockwise" #,"continuous"
 MYTHICAL_CITY = True
 NUM_PLAYERS = 2
 NUM_GAMES = 10
+NUM_WORKERS = os.cpu_count() or 1 #processes to spread simulations across, with 1 running them all in this process
+CHUNKS_PER_WORKER = 4 #how many batches of games each worker should expect, to balance load against dispatch overhead
+LOG_PATH = "./logs/cartolan_log.txt"
+LOG_LEVEL = logging.WARNING #logging.DEBUG reports every move, but formatting all those messages will slow simulations down considerably
+SEED = None #seeds the per-game seeds, so that a whole run can be repeated
+RESULTS_PATH = None #e.g. "./logs/cartolan_stats.csv", to stream stats to disk as games finish and resume interrupted runs
+BATCH_SIZE = 1000 #how many simulations to complete before writing their stats to disk
+#The stats collected from each simulation, and their types, with per-player stats as floats so that absent players can be NaN
+STATS_COLUMNS = {"simulation_id":"int64", "num_players":"int64", "win_type":"object", "turns":"int64"
+                 , "remaining_water_tiles":"int64"
+                 , "remaining_land_tiles":"int64"
+                 , "total_wealth_final":"int64", "max_wealth_final":"int64", "wealth_difference_final":"int64"
+                 , "winning_player_type":"object", "winning_player_order":"int64", "winning_player_route":"float64"
+                 , "winning_player_agents":"int64"
+                 , "winning_player_adventurers":"int64"
+                 , "exploration_attempts":"int64", "failed_explorations":"int64"
+                 , "wealth_p1":"float64", "wealth_p2":"float64", "wealth_p3":"float64", "wealth_p4":"float64"
+                 , "num_adventurers_p1":"float64", "num_adventurers_p2":"float64"
+                 , "num_adventurers_p3":"float64", "num_adventurers_p4":"float64"
+                 , "num_agents_p1":"float64", "num_agents_p2":"float64", "num_agents_p3":"float64", "num_agents_p4":"float64"
+                 , "avg_route_p1":"float64", "avg_route_p2":"float64", "avg_route_p3":"float64", "avg_route_p4":"float64"
+                 , "agent_route_value_p1":"float64", "agent_route_value_p2":"float64"
+                 , "agent_route_value_p3":"float64", "agent_route_value_p4":"float64"
+                 }
 # Option sets and corresponding information
 GAME_MODES = { 'Beginner':{'game_type':GameBeginner, 'player_set':{"blue":PlayerBeginnerExplorer
                                                                         , "red":PlayerBeginnerTrader
@@ -34,7 +65,7 @@ EXPLORATION_RULES = ['clockwise', 'continuous']
 NUM_PLAYERS_OPTIONS = [2, 3, 4]
 
 #First some global functions to set up the game area
-def setup_tiles(players, game_mode, movement_rules, exploration_rules, mythical_city):
+def setup_tiles(players, game_mode, movement_rules, exploration_rules, mythical_city, seed=None):
     '''Part of game setup for Cartolan, this places the intital tiles ready for play
     
     Arguments:
@@ -42,9 +73,10 @@ def setup_tiles(players, game_mode, movement_rules, exploration_rules, mythical_
     Cartolan.Game for the game that these tiles are being laid for
     String giving the movement rules variant that will apply for this game
     String giving the exploration rules variant that will apply for this game
+    int seed for the game's random number generator
     '''
     
-    game = game_mode(players, movement_rules, exploration_rules)
+    game = game_mode(players, movement_rules, exploration_rules, seed)
 #     exec("CityTile" +game_mode+ "(game, True, True).place_tile(0,0)")
     game.CITY_TYPE(game, WindDirection(True,True), TileEdges(True,True,True,True), True, True).place_tile(0,0)
 #     capital_tile = CityTileBeginner(game, True, True)
@@ -68,10 +100,10 @@ def setup_tiles(players, game_mode, movement_rules, exploration_rules, mythical_
         Tile(game, "water", WindDirection(True,True), TileEdges(True,True,True,True), False).place_tile(0, -1) #south
         Tile(game, "water", WindDirection(False,False), TileEdges(True,True,True,True), False).place_tile(-1, 0) #west
          
-    print("Placed the Capital tile, and surrounding water tiles")
+    logger.debug("Placed the Capital tile, and surrounding water tiles")
     return game
 
-def setup_adventurers(players, game_mode, movement_rules, exploration_rules, mythical_city):
+def setup_adventurers(players, game_mode, movement_rules, exploration_rules, mythical_city, seed=None):
     '''Part of game setup for Cartolan, this places the intital Adventurer tokens for each player
     
     Arguments:
@@ -80,19 +112,19 @@ def setup_adventurers(players, game_mode, movement_rules, exploration_rules, myt
     String giving the movement rules variant that will apply for this game
     String giving the exploration rules variant that will apply for this game
     '''
-    game = setup_tiles(players, game_mode, movement_rules, exploration_rules, mythical_city)
+    game = setup_tiles(players, game_mode, movement_rules, exploration_rules, mythical_city, seed)
     
     for player in players:
 #         exec("Adventurer" +game_mode+ "(game, player, game.cities[0])") #this should probably work, because it doesn't need to create a local
-        print("adding an adventurer for " +str(player.colour)+ " player, who already has " +str(len(game.adventurers[player]))+ " adventurers")
+        logger.debug("adding an adventurer for %s player, who already has %s adventurers", player.name, len(game.adventurers[player]))
 #         AdventurerBeginner(game, player, game.cities[0])
         game.ADVENTURER_TYPE(game, player, game.cities[0])
     
-    print("Placed starting adventurer for each player")
+    logger.debug("Placed starting adventurer for each player")
     
     return game
 
-def setup_simulation(players, game_mode, movement_rules, exploration_rules, mythical_city = True):
+def setup_simulation(players, game_mode, movement_rules, exploration_rules, mythical_city = True, seed=None):
     '''The final part of game setup for Cartolan, this chooses a random play order for the players involved
     
     Arguments:
@@ -101,7 +133,7 @@ def setup_simulation(players, game_mode, movement_rules, exploration_rules, myth
     String giving the movement rules variant that will apply for this game
     String giving the exploration rules variant that will apply for this game
     '''
-    game = setup_adventurers(players, game_mode, movement_rules, exploration_rules, mythical_city)
+    game = setup_adventurers(players, game_mode, movement_rules, exploration_rules, mythical_city, seed)
     
     game.setup_tile_pile("water")
     if game_mode in [GameRegular, GameAdvanced]:
@@ -111,10 +143,284 @@ def setup_simulation(players, game_mode, movement_rules, exploration_rules, myth
         
     #turn order has been handled by the parent setup
 #     game.players = random.shuffle(game.players)
-    print("Randomly chose " +str(players[0].colour)+ " player to start")
+    logger.debug("Randomly chose %s player to start", players[0].name)
     return game
 
 
+def setup_players(game_modes, game_mode, num_players, rng=random):
+    '''Instantiates a random selection of the computer players available for a game mode
+    
+    Arguments:
+    dict of game mode names to their game type and player set, like GAME_MODES
+    String giving the game mode for which players are needed
+    int giving the number of players to instantiate
+    random.Random to make the selection with
+    '''
+    players = []
+#             num_players = random.choice(num_players_options)
+    player_colours = rng.sample(list(game_modes[game_mode]["player_set"]), num_players)
+    for player_colour in player_colours:
+        #player_colour = random.choice(player_set)
+        players.append(game_modes[game_mode]["player_set"][player_colour](player_colour))
+    return players
+
+def play_simulation(sim_id, seed, game_mode, movement_rule, exploration_rule, mythical_city, num_players, game_modes=GAME_MODES):
+    '''Sets up and plays through a single simulated game, returning the finished Cartolan.Game
+    
+    The players and the game's own random number generator are both seeded from the seed given, so that the same 
+    arguments will always replay the same game, in whichever process.
+    '''
+    sim_rng = random.Random(seed)
+    #Instantiate players
+    players = setup_players(game_modes, game_mode, num_players, sim_rng)
+
+    #Instantiate a game
+    if mythical_city:
+        logger.debug("Setting up a %s-mode game, with %s movement rules, and %s exploration rules, and a mythical city", game_mode, movement_rule, exploration_rule)
+    else:
+        logger.debug("Setting up a %s-mode game, with %s movement rules, and %s exploration rules, and no mythical city", game_mode, movement_rule, exploration_rule)
+    game = setup_simulation(players, game_modes[game_mode]["game_type"]
+                            , movement_rule, exploration_rule, mythical_city, sim_rng.getrandbits(32))
+
+    #run the game
+    logger.info("Starting simulation #%s of %s-mode Cartolan, with %s players", sim_id, game_mode, num_players)
+    game.start_game()
+    return game
+
+def player_strip(player_type):
+    '''Reduces the name of a player type down '''
+    name = player_type.__name__
+    if "Beginner" in name:
+        return name[name.find("Beginner")+len("Beginner"):]
+    elif "Regular" in name:
+        return name[name.find("Regular")+len("Regular"):]
+    else:
+        return name[name.find("Player")+len("Player"):]
+
+def avg_route_length(player, game):
+    '''Collects the average route length across a player's adventurers'''
+    avg_route_length = 0
+    for adventurer in game.adventurers[player]:
+        avg_route_length += len(adventurer.route)
+    return avg_route_length/len(game.adventurers[player])
+
+def simulation_stats(sim_id, game, num_players):
+    '''Collects the stats recorded for a finished simulation, returning None if there was no winner'''
+    if not game.wealth_difference > 0:
+        return None
+    sim_row = {"simulation_id":sim_id, "num_players":num_players
+                , "win_type":game.win_type, "turns":game.turn
+                , "remaining_water_tiles":len(game.tile_piles["water"].tiles)+len(game.discard_piles["water"].tiles)
+                , "remaining_land_tiles":len(game.tile_piles["land"].tiles)+len(game.discard_piles["land"].tiles)
+                , "total_wealth_final":game.total_vault_wealth
+                , "max_wealth_final":game.max_wealth
+                , "wealth_difference_final":game.wealth_difference
+                , "winning_player_type":player_strip(type(game.winning_player))
+                , "winning_player_order":game.players.index(game.winning_player)+1
+                , "winning_player_route":avg_route_length(game.winning_player, game)
+                , "winning_player_agents":len(game.agents[game.winning_player])
+                , "winning_player_adventurers":len(game.adventurers[game.winning_player])
+                , "exploration_attempts":game.exploration_attempts
+                , "failed_explorations":game.num_failed_explorations 
+                }
+    #Per-player columns are suffixed by play order, and left missing for absent players
+    for player_num, player in enumerate(game.players, start=1):
+        sim_row["wealth_p"+str(player_num)] = game.player_wealths[player]
+        sim_row["num_adventurers_p"+str(player_num)] = len(game.adventurers[player])
+        sim_row["num_agents_p"+str(player_num)] = len(game.agents[player])
+        sim_row["avg_route_p"+str(player_num)] = avg_route_length(player, game)
+        sim_row["agent_route_value_p"+str(player_num)] = game.estimated_route_values[player]
+    return sim_row
+
+class StatsRecorder:
+    '''Accumulates the stats from many simulations in one typed array per column, building a pandas.DataFrame only once at the end
+    
+    Methods:
+    __init__ taking a dict of column names to numpy dtype strings, and an int for the number of rows to preallocate
+    add_row taking a dict of column names to values, with any missing columns left as NaN/None
+    clear taking no arguments
+    to_frame taking no arguments
+    '''
+    def __init__(self, columns, capacity):
+        self.dtypes = columns
+        self.capacity = max(1, capacity)
+        self.num_rows = 0
+        self.columns = {}
+        for column in columns:
+            self.columns[column] = self.empty_column(column, self.capacity)
+    
+    def empty_column(self, column, length):
+        '''Creates an array for a column, filled with whichever missing value suits its dtype'''
+        dtype = self.dtypes[column]
+        if dtype == "object":
+            return numpy.full(length, None, dtype=object)
+        elif dtype.startswith("float"):
+            return numpy.full(length, numpy.nan, dtype=dtype)
+        else:
+            return numpy.zeros(length, dtype=dtype)
+    
+    def add_row(self, row):
+        '''Writes the values for one simulation into the next free position of every column'''
+        if self.num_rows == self.capacity:
+            #Double the arrays if the preallocation turned out too small, so that growth stays amortised
+            for column in self.columns:
+                self.columns[column] = numpy.concatenate([self.columns[column], self.empty_column(column, self.capacity)])
+            self.capacity *= 2
+        for column in row:
+            self.columns[column][self.num_rows] = row[column]
+        self.num_rows += 1
+    
+    def clear(self):
+        '''Empties the recorder for reuse, keeping its current capacity'''
+        self.num_rows = 0
+        for column in self.columns:
+            self.columns[column] = self.empty_column(column, self.capacity)
+    
+    def to_frame(self):
+        '''Builds a pandas.DataFrame from the rows recorded so far'''
+        return pandas.DataFrame({column: self.columns[column][:self.num_rows] for column in self.columns})
+
+class StatsSink:
+    '''Streams batches of simulation stats to an append-only file on disk, checkpointing which simulations are complete so that an interrupted run can resume
+    
+    Results go to a CSV file, or to a directory of Parquet part files if the path ends in ".parquet" (which needs pyarrow).
+    The checkpoint sits alongside, with the run's seed on its first line, its configuration as JSON on the second, and 
+    then one completed simulation id per line. A run can only resume from a checkpoint with the same configuration.
+    
+    Methods:
+    __init__ taking a path string for the results, a dict of column names to dtypes like STATS_COLUMNS, and an int number of simulations per batch
+    resume_seed taking an int seed and a dict of configuration for a fresh run, and returning the seed of any run being resumed
+    add_row taking a dict of column names to values
+    mark_complete taking an int simulation id
+    flush taking no arguments
+    to_frame taking no arguments
+    '''
+    def __init__(self, path, columns, batch_size):
+        self.path = path
+        self.checkpoint_path = path + ".done"
+        self.is_parquet = path.endswith(".parquet")
+        self.batch_size = max(1, batch_size)
+        self.batch = StatsRecorder(columns, self.batch_size)
+        self.batch_ids = []
+        #Find which simulations were finished by earlier runs
+        self.seed = None
+        self.config = None
+        self.completed_ids = set()
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as checkpoint:
+                lines = checkpoint.read().splitlines()
+            if len(lines) > 1:
+                self.seed = int(lines[0])
+                self.config = json.loads(lines[1])
+                self.completed_ids = set(int(sim_id) for sim_id in lines[2:])
+            elif lines:
+                raise Exception("The checkpoint at "+self.checkpoint_path+" doesn't record the configuration of its run, so can't be resumed")
+        self.num_parts = 0
+        if self.is_parquet and os.path.isdir(path):
+            self.num_parts = len(os.listdir(path))
+    
+    def resume_seed(self, seed, config):
+        '''Returns the seed of the run being resumed, or records the given seed and configuration if this is a new run
+        
+        Resuming with a different configuration would mix the results of different games together, so is refused.
+        '''
+        #Compare the configuration as it would be read back from the checkpoint
+        config = json.loads(json.dumps(config, sort_keys=True))
+        if self.seed is None:
+            self.seed = seed
+            self.config = config
+            with open(self.checkpoint_path, 'w') as checkpoint:
+                checkpoint.write(str(seed)+"\n"+json.dumps(config, sort_keys=True)+"\n")
+        elif self.config != config:
+            raise Exception("The results at "+self.path+" are from a run configured as "+str(self.config)
+                            +", so can't be resumed as "+str(config)+". Choose a different results path.")
+        return self.seed
+    
+    def add_row(self, row):
+        self.batch.add_row(row)
+    
+    def mark_complete(self, sim_id):
+        '''Notes that a simulation has finished, writing out the batch once it is full'''
+        self.batch_ids.append(sim_id)
+        if len(self.batch_ids) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        '''Appends the current batch of rows to disk, and only then checkpoints their simulations as complete'''
+        if not self.batch_ids:
+            return
+        if self.batch.num_rows:
+            batch_frame = self.batch.to_frame()
+            if self.is_parquet:
+                os.makedirs(self.path, exist_ok=True)
+                batch_frame.to_parquet(os.path.join(self.path, "part_"+str(self.num_parts)+".parquet"), index=False)
+                self.num_parts += 1
+            else:
+                batch_frame.to_csv(self.path, mode='a', index=False, header=not os.path.exists(self.path))
+        with open(self.checkpoint_path, 'a') as checkpoint:
+            checkpoint.write("".join(str(sim_id)+"\n" for sim_id in self.batch_ids))
+        self.completed_ids.update(self.batch_ids)
+        self.batch_ids = []
+        self.batch.clear()
+    
+    def to_frame(self):
+        '''Reads back all the results written so far, as a pandas.DataFrame'''
+        if self.is_parquet:
+            if not os.path.isdir(self.path):
+                return self.batch.to_frame()
+            stats = pandas.read_parquet(self.path)
+        else:
+            if not os.path.exists(self.path):
+                return self.batch.to_frame()
+            stats = pandas.read_csv(self.path)
+        #A run interrupted between writing rows and checkpointing them will have replayed those simulations
+        return stats.drop_duplicates("simulation_id", keep="last")
+
+def describe_remaining_tiles(game):
+    '''Describes the edges of each tile left in the piles at the end of a game, as strings like "WaterLandWaterWater"'''
+    tile_edges_strings = []
+    for tile_pile in game.tile_piles.values():
+        for tile in tile_pile.tiles:
+            tile_edges = tile.tile_edges
+            tile_edges_string = ""
+            if tile_edges.upwind_clock_water:
+                tile_edges_string += "Water"
+            else:
+                tile_edges_string += "Land"
+            if tile_edges.upwind_anti_water:
+                tile_edges_string += "Water"
+            else:
+                tile_edges_string += "Land"
+            if tile_edges.downwind_clock_water:
+                tile_edges_string += "Water"
+            else:
+                tile_edges_string += "Land"
+            if tile_edges.downwind_anti_water:
+                tile_edges_string += "Water"
+            else:
+                tile_edges_string += "Land"
+            tile_edges_strings.append(tile_edges_string)
+    return tile_edges_strings
+
+def setup_logging(log_path, log_level):
+    '''Sends the log records from all the Cartolan modules to a file, at the given level'''
+    logging.basicConfig(filename=log_path, filemode='w', level=log_level
+                        , format="%(asctime)s %(levelname)s %(name)s: %(message)s", force=True)
+
+def init_worker(log_path, log_level):
+    '''Points the logging of a simulation worker process at its own log file'''
+    setup_logging(log_path.replace(".txt", "_"+str(os.getpid())+".txt"), log_level)
+
+def run_simulation(sim_args):
+    '''Plays a single simulation and returns its stats, so that it can be farmed out to a process pool
+    
+    Arguments:
+    tuple of the arguments for play_simulation, starting with the simulation id and random seed
+    '''
+    game = play_simulation(*sim_args)
+    return sim_args[0], simulation_stats(sim_args[0], game, sim_args[6]), describe_remaining_tiles(game)
+
+
 #Now the various classes for differnt player combinations
 class Simulations():
     """Run simulations of the game Cartolan."""
@@ -127,6 +433,12 @@ class Simulations():
         self.num_players = NUM_PLAYERS
         self.num_games = NUM_GAMES
         self.game_modes = GAME_MODES
+        self.num_workers = NUM_WORKERS
+        self.seed = SEED
+        self.log_path = LOG_PATH
+        self.log_level = LOG_LEVEL
+        self.results_path = RESULTS_PATH
+        self.batch_size = BATCH_SIZE
 
     def click_run_sims(self, event):
         self.run_sims()
@@ -146,191 +458,74 @@ class Simulations():
     def set_num_sims(self, value):
         self.num_games = int(value)
     
+    def set_num_workers(self, value):
+        self.num_workers = int(value)
+    
     def setup_players(self):
-        players = []
-#             num_players = random.choice(num_players_options)
-        player_colours = random.sample(list(self.game_modes[self.game_mode]["player_set"]),self.num_players)
-        for player_colour in player_colours:
-            #player_colour = random.choice(player_set)
-            players.append(self.game_modes[self.game_mode]["player_set"][player_colour](player_colour))
-        return players
+        return setup_players(self.game_modes, self.game_mode, self.num_players)
 
         
     def run_sims(self):
-        '''Method to run through a series of simulations, triggered by a UI button press'''
+        '''Method to run through a series of simulations, triggered by a UI button press
+        
+        With more than one worker, the games are spread across a pool of processes, each game 
+        with its own seed so that any game can be replayed exactly for visualisation afterwards.
+        '''
         #determine logging
-        # stdout_backup = sys.stdout
-#         sys.stdout = open(os.devnull, 'w')
-        sys.stdout = open("./logs/cartolan_log.txt", 'w')
-        # sys.stdout = sys.__stdout__
+        setup_logging(self.log_path, self.log_level)
 
-        #data to collect from each simulation
-        self.sim_stats = pandas.DataFrame(columns = ["simulation_id", "num_players", "win_type", "turns"
-                                                , "remaining_water_tiles"
-                                                , "remaining_land_tiles"
-                                                , "total_wealth_final", "max_wealth_final", "wealth_difference_final"
-                                                , "winning_player_type", "winning_player_order", "winning_player_route"
-                                                , "winning_player_agents"
-                                                , "winning_player_adventurers"
-                                                , "exploration_attempts", "failed_explorations"
-                                                , "wealth_p1", "wealth_p2", "wealth_p3", "wealth_p4"
-                                                , "num_adventurers_p1", "num_adventurers_p2"
-                                                , "num_adventurers_p3", "num_adventurers_p4"
-                                                , "num_agents_p1", "num_agents_p2", "num_agents_p3", "num_agents_p4"
-                                                , "avg_route_p1", "avg_route_p2", "avg_route_p3", "avg_route_p4" 
-                                                , "play_area", "players"])
-        play_areas = {}
-        player_sets = {}
+        #data to collect from each simulation, either held in memory or streamed to disk
+        run_seed = self.seed
+        if run_seed is None:
+            run_seed = random.getrandbits(32)
+        if self.results_path:
+            sim_stats = StatsSink(self.results_path, STATS_COLUMNS, self.batch_size)
+            run_config = {"game_mode":self.game_mode, "movement_rule":self.movement_rule
+                          , "exploration_rule":self.exploration_rule, "mythical_city":self.mythical_city
+                          , "num_players":self.num_players
+                          , "player_set":{colour:player_type.__name__ for colour, player_type 
+                                          in self.game_modes[self.game_mode]["player_set"].items()}}
+            run_seed = sim_stats.resume_seed(run_seed, run_config)
+            completed_ids = sim_stats.completed_ids
+        else:
+            sim_stats = StatsRecorder(STATS_COLUMNS, self.num_games)
+            completed_ids = set()
         
-        #retain the leftover tile distributions
+        #retain the leftover tile distributions, for the games played in this session
         remaining_tile_edges = []
 
-        #Function to collect average route lengths across a player's adventurers
-        def avg_route_length(player, game):
-            avg_route_length = 0
-            for adventurer in game.adventurers[player]:
-                avg_route_length += len(adventurer.route)
-            return avg_route_length/len(game.adventurers[player])
-
-        # We have arrived! Time for the actual outcomes
-        #@TODO multithread this: https://realpython.com/intro-to-python-threading/#starting-a-thread
+        #Draw a separate seed for every game up front, so that results don't depend on which worker played which game
+        seed_generator = random.Random(run_seed)
+        sim_args = {}
         for sim_id in range(0, self.num_games):
-            print("")
-            #Instantiate players
-            players = self.setup_players()
-
-            #Instantiate a game
-            if self.mythical_city:
-                print("Setting up a "+self.game_mode+"-mode game, with "+self.movement_rule+" movement rules, and "
-                  +self.exploration_rule+" exploration rules, and a mythical city")
-            else:
-                print("Setting up a "+self.game_mode+"-mode game, with "+self.movement_rule+" movement rules, and "
-                  +self.exploration_rule+" exploration rules, and no mythical city")
-            game = setup_simulation(players, self.game_modes[self.game_mode]["game_type"]
-                                    , self.movement_rule, self.exploration_rule, self.mythical_city)
-
-            #run the game
-            print("Starting simulation #"+str(sim_id)+" of "+self.game_mode+"-mode Cartolan, with " +str(self.num_players)+ " players")
-            game.start_game()
-
-            #record stats
-            def player_strip(player_type):
-                '''Reduces the name of a player type down '''
-                name = player_type.__name__
-                if "Beginner" in name:
-                    return name[name.find("Beginner")+len("Beginner"):]
-                elif "Regular" in name:
-                    return name[name.find("Regular")+len("Regular"):]
-                else:
-                    return name[name.find("Player")+len("Player"):]
-            
-            if game.wealth_difference > 0 and self.num_players ==2:
-                self.sim_stats = self.sim_stats.append( {"simulation_id":sim_id, "num_players":self.num_players
-                                    , "win_type":game.win_type, "turns":game.turn
-                                    , "remaining_water_tiles":len(game.tile_piles["water"].tiles)+len(game.discard_piles["water"].tiles)
-                                    , "remaining_land_tiles":len(game.tile_piles["land"].tiles)+len(game.discard_piles["land"].tiles)
-                                    , "total_wealth_final":game.total_vault_wealth
-                                    , "max_wealth_final":game.max_wealth
-                                    , "wealth_difference_final":game.wealth_difference
-                                    , "winning_player_type":player_strip(type(game.winning_player))
-                                    , "winning_player_order":game.players.index(game.winning_player)+1
-                                    , "winning_player_route":avg_route_length(game.winning_player, game)
-                                    , "winning_player_agents":len(game.agents[game.winning_player])
-                                    , "winning_player_adventurers":len(game.adventurers[game.winning_player])
-                                    , "exploration_attempts":game.exploration_attempts
-                                    , "failed_explorations":game.num_failed_explorations 
-                                    , "wealth_p1":game.players[0].vault_wealth
-                                    , "wealth_p2":game.players[1].vault_wealth
-                                    , "num_adventurers_p1":len(game.adventurers[players[0]])
-                                    , "num_adventurers_p2":len(game.adventurers[players[1]])
-                                    , "num_agents_p1":len(game.agents[players[0]])
-                                    , "num_agents_p2":len(game.agents[players[1]])
-                                    , "avg_route_p1":avg_route_length(players[0], game)
-                                    , "avg_route_p2":avg_route_length(players[1], game)
-                                              }, ignore_index=True)
-            elif game.wealth_difference > 0 and self.num_players ==3:
-                self.sim_stats = self.sim_stats.append( {"simulation_id":sim_id, "num_players":self.num_players
-                                    , "win_type":game.win_type, "turns":game.turn
-                                    , "remaining_water_tiles":len(game.tile_piles["water"].tiles)+len(game.discard_piles["water"].tiles)
-                                    , "remaining_land_tiles":len(game.tile_piles["land"].tiles)+len(game.discard_piles["land"].tiles)
-                                    , "total_wealth_final":game.total_vault_wealth
-                                    , "max_wealth_final":game.max_wealth
-                                    , "wealth_difference_final":game.wealth_difference
-                                    , "winning_player_type":player_strip(type(game.winning_player))
-                                    , "winning_player_order":game.players.index(game.winning_player)+1
-                                    , "winning_player_route":avg_route_length(game.winning_player, game)
-                                    , "winning_player_agents":len(game.agents[game.winning_player])
-                                    , "winning_player_adventurers":len(game.adventurers[game.winning_player])
-                                    , "exploration_attempts":game.exploration_attempts
-                                    , "failed_explorations":game.num_failed_explorations 
-                                    , "wealth_p1":game.players[0].vault_wealth
-                                    , "wealth_p2":game.players[1].vault_wealth
-                                    , "wealth_p3":game.players[2].vault_wealth
-                                    , "num_adventurers_p1":len(game.adventurers[game.players[0]])
-                                    , "num_adventurers_p2":len(game.adventurers[game.players[1]])
-                                    , "num_adventurers_p3":len(game.adventurers[game.players[2]])
-                                    , "num_agents_p1":len(game.agents[game.players[0]])
-                                    , "num_agents_p2":len(game.agents[game.players[1]])
-                                    , "num_agents_p3":len(game.agents[game.players[2]])
-                                    , "avg_route_p1":avg_route_length(players[0], game)
-                                    , "avg_route_p2":avg_route_length(players[1], game)
-                                    , "avg_route_p3":avg_route_length(players[2], game)
-                                              }, ignore_index=True)
-            elif game.wealth_difference > 0 and self.num_players ==4:
-                self.sim_stats = self.sim_stats.append( {"simulation_id":sim_id, "num_players":self.num_players
-                                    , "win_type":game.win_type, "turns":game.turn
-                                    , "remaining_water_tiles":len(game.tile_piles["water"].tiles)+len(game.discard_piles["water"].tiles)
-                                    , "remaining_land_tiles":len(game.tile_piles["land"].tiles)+len(game.discard_piles["land"].tiles)
-                                    , "total_wealth_final":game.total_vault_wealth
-                                    , "max_wealth_final":game.max_wealth
-                                    , "wealth_difference_final":game.wealth_difference
-                                    , "winning_player_type":player_strip(type(game.winning_player))
-                                    , "winning_player_order":game.players.index(game.winning_player)+1
-                                    , "winning_player_route":avg_route_length(game.winning_player, game)
-                                    , "winning_player_agents":len(game.agents[game.winning_player])
-                                    , "winning_player_adventurers":len(game.adventurers[game.winning_player])
-                                    , "exploration_attempts":game.exploration_attempts
-                                    , "failed_explorations":game.num_failed_explorations 
-                                    , "wealth_p1":game.players[0].vault_wealth, "wealth_p2":game.players[1].vault_wealth
-                                    , "wealth_p3":game.players[2].vault_wealth, "wealth_p4":game.players[3].vault_wealth
-                                    , "num_adventurers_p1":len(game.adventurers[game.players[0]])
-                                    , "num_adventurers_p2":len(game.adventurers[game.players[1]])
-                                    , "num_adventurers_p3":len(game.adventurers[game.players[2]])
-                                    , "num_adventurers_p4":len(game.adventurers[game.players[3]])
-                                    , "num_agents_p1":len(game.agents[game.players[0]])
-                                    , "num_agents_p2":len(game.agents[game.players[1]])
-                                    , "num_agents_p3":len(game.agents[game.players[2]])
-                                    , "num_agents_p4":len(game.agents[game.players[3]])
-                                    , "avg_route_p1":avg_route_length(players[0], game)
-                                    , "avg_route_p2":avg_route_length(players[1], game)
-                                    , "avg_route_p3":avg_route_length(players[2], game)
-                                    , "avg_route_p4":avg_route_length(players[3], game)
-                                              }, ignore_index=True)
-            play_areas[sim_id] = game.play_area
-            player_sets[sim_id] = game.players
-            
-            for tile_pile in game.tile_piles.values():
-                for tile in tile_pile.tiles:
-                    tile_edges = tile.tile_edges
-                    tile_edges_string = ""
-                    if tile_edges.upwind_clock_water:
-                        tile_edges_string += "Water"
-                    else:
-                        tile_edges_string += "Land"
-                    if tile_edges.upwind_anti_water:
-                        tile_edges_string += "Water"
-                    else:
-                        tile_edges_string += "Land"
-                    if tile_edges.downwind_clock_water:
-                        tile_edges_string += "Water"
-                    else:
-                        tile_edges_string += "Land"
-                    if tile_edges.downwind_anti_water:
-                        tile_edges_string += "Water"
-                    else:
-                        tile_edges_string += "Land"
-                    remaining_tile_edges.append(tile_edges_string)
-
+            sim_args[sim_id] = (sim_id, seed_generator.getrandbits(32), self.game_mode
+                                , self.movement_rule, self.exploration_rule, self.mythical_city
+                                , self.num_players, self.game_modes)
+        #Skip any games already completed by an interrupted run
+        pending_args = [sim_args[sim_id] for sim_id in sim_args if not sim_id in completed_ids]
+        
+        # We have arrived! Time for the actual outcomes
+        if self.num_workers > 1:
+            pool = Pool(self.num_workers, initializer=init_worker, initargs=(self.log_path, self.log_level))
+            chunksize = max(1, len(pending_args) // (self.num_workers * CHUNKS_PER_WORKER))
+            sim_results = pool.imap_unordered(run_simulation, pending_args, chunksize)
+        else:
+            pool = None
+            sim_results = map(run_simulation, pending_args)
+        #Merge the stats from each game as it finishes
+        for sim_id, sim_row, tile_edges_strings in sim_results:
+            if sim_row is not None:
+                sim_stats.add_row(sim_row)
+            if self.results_path:
+                sim_stats.mark_complete(sim_id)
+            remaining_tile_edges += tile_edges_strings
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if self.results_path:
+            sim_stats.flush()
+        #Results can arrive out of order from the pool
+        self.sim_stats = sim_stats.to_frame().sort_values("simulation_id", ignore_index=True)
 
         # Make sure that graphical outputs go here
 #         sys.stdout = stdout_backup
@@ -351,7 +546,9 @@ class Simulations():
         
 
         def prep_visuals(sim_id_to_vis, title):
-            play_area_to_vis = play_areas[sim_id_to_vis]
+            #replay the game from its seed, rather than holding every finished game in memory or passing it between processes
+            game_to_vis = play_simulation(*sim_args[sim_id_to_vis])
+            play_area_to_vis = game_to_vis.play_area
             #work out the ideal dimensions for the visualisation
             h_dimension = max(play_area_to_vis.keys())-min(play_area_to_vis.keys())
             h_origin = abs(min(play_area_to_vis.keys()))
@@ -372,10 +569,10 @@ class Simulations():
 #             game_vis_med_wealth_difference.draw_play_area(play_area_to_vis, play_area_to_vis)
             game_vis.draw_play_area(play_area_to_vis)
             #@TODO earlier agent positions seem to be ignored
-            game_vis.draw_tokens(player_sets[sim_id_to_vis])
-            game_vis.draw_routes(player_sets[sim_id_to_vis])
-            print("Determined that the dimensions for the "+title+" are "+ str(h_dimension)+", "+str(v_dimension))
-            print("Determined that the origin positions for the "+title+" are "+ str(h_origin)+", "+str(v_origin))
+            game_vis.draw_tokens(game_to_vis.players)
+            game_vis.draw_routes(game_to_vis.players)
+            logger.debug("Determined that the dimensions for the %s are %s, %s", title, h_dimension, v_dimension)
+            logger.debug("Determined that the origin positions for the %s are %s, %s", title, h_origin, v_origin)
             
         
         # Let's look at the final layout and paths of the game with the median wealth difference, if one exists:
@@ -6,7 +6,9 @@ from base import Player, CityTile
 from advanced import AdventurerAdvanced
 from game import GameAdvanced
 from game_config import BeginnerConfig, RegularConfig, AdvancedConfig
-import random
+import logging
+
+logger = logging.getLogger(__name__)
 
 class PlayerBeginnerExplorer(Player):    
     '''A virtual player for Cartolan that makes decisions favouring exploration
@@ -15,6 +17,8 @@ class PlayerBeginnerExplorer(Player):
     
     Methods:
     explore_best_space takes a Cartolan.Adventurer
+    head_for_gap takes a Cartolan.Adventurer
+    get_hazards takes a Cartolan.Adventurer
     move_away_from_tile takes a Cartolan.Adventurer and a Cartolan.Tile
     move_towards_tile takes a Cartolan.Adventurer and a Cartolan.Tile
     continue_move takes a Cartolan.Adventurer
@@ -35,20 +39,13 @@ class PlayerBeginnerExplorer(Player):
         self.return_city_attr = BeginnerConfig.RETURN_CITY_ATTR #Set a criterion for returning to bank wealth
     
     def check_location_to_avoid(self, longitude, latitude):
-        '''Compares coordinates to a list to avoid'''
-        #Check each of the coordinate pairs to avoid in turn
-        for location in self.locations_to_avoid:
-            if location[0] == longitude and location[1] == latitude:
-                print("Identified these coordinates as a location to avoid: " +str(longitude)+ ", " +str(latitude))
-                return True
-        #If the given coordinates didn't match any of the locations to avoid
-        print("Identified these coordinates as NOT a location to avoid: " +str(longitude)+ ", " +str(latitude))
-        return False
+        '''Checks coordinates against the set of those to avoid this turn'''
+        return (longitude, latitude) in self.locations_to_avoid
     
     def explore_best_space(self, adventurer):
         '''A heuristic for Adventurer movement that selects the adjacent gap in the map with the highest prospective score from adjoining edges, preferring downwind and right when this is tied'''
         #check downwind clockwise first, then downwind anti, then upwind clock, then upwind anti
-        print(str(adventurer.player.name) +": trying heuristic that prefers the adjacent gap in the map with the highest prospective score from adjoining edges, preferring downwind and right when this is tied")
+        logger.debug("%s: trying heuristic that prefers the adjacent gap in the map with the highest prospective score from adjoining edges, preferring downwind and right when this is tied", adventurer.player.name)
         if adventurer.current_tile.wind_direction.east:
             if adventurer.current_tile.wind_direction.north:
                 potential_moves = ['e', 'n', 'w', 's']
@@ -64,23 +61,22 @@ class PlayerBeginnerExplorer(Player):
         preferred_move = None
         preferred_score = 0
         exploration_moves = 0
+        explorable = {}
+        for action_type, compass_point, coordinates in adventurer.get_legal_actions():
+            if action_type == "explore":
+                explorable[compass_point] = coordinates
         for compass_point in potential_moves:
-            if adventurer.can_move(compass_point):
-                #translate the compass point into coordinates
-                longitude_increment = int(compass_point.lower() in ["east","e"]) - int(compass_point.lower() in ["west","w"])
-                new_longitude = adventurer.current_tile.tile_position.longitude + longitude_increment
-                latitude_increment = int(compass_point.lower() in ["north","n"]) - int(compass_point.lower() in ["south","s"])
-                new_latitude = adventurer.current_tile.tile_position.latitude + latitude_increment
-                #check whether empty or otherwise designated to avoid
-                if (adventurer.exploration_needed(new_longitude, new_latitude) 
-                    and not self.check_location_to_avoid(new_longitude, new_latitude)):
+            if compass_point in explorable:
+                new_longitude, new_latitude = explorable[compass_point]
+                #check whether otherwise designated to avoid
+                if not self.check_location_to_avoid(new_longitude, new_latitude):
                     #Check whether the score from exploring here beats any checked so far
                     exploration_moves += 1
                     potential_score = adventurer.get_exploration_value(adventurer.get_adjoining_edges(new_longitude, new_latitude), compass_point)
                     if potential_score > preferred_score:
                         preferred_move = compass_point
                         preferred_score = potential_score
-        print(self.name +"'s Adventurer has "+str(exploration_moves)+" exploration options.")
+        logger.debug("%s's Adventurer has %s exploration options.", self.name, exploration_moves)
         if preferred_move is not None:
             if adventurer.move(preferred_move):
                 return True
@@ -88,18 +84,33 @@ class PlayerBeginnerExplorer(Player):
                 #If movement failed because the turn is over then leave here
                 if adventurer.turns_moved >= adventurer.game.turn:
                     return True
-                self.locations_to_avoid.append([new_longitude, new_latitude])
+                self.locations_to_avoid.add(explorable[preferred_move])
                 return False
         elif exploration_moves == 3:
             #The absence of any scoring opportunities despite exploration on all sides implies isolation and that it's worth abandoning the expedition
             city_tile = adventurer.latest_city
             adventurer.abandon_expedition(city_tile)
-        print("With no valid exploration moves were found, then simply move away slowly from the Adventurer's city of choice")
+        elif exploration_moves == 0 and self.head_for_gap(adventurer):
+            return True
+        logger.debug("With no valid exploration moves were found, then simply move away slowly from the Adventurer's city of choice")
         return self.move_away_from_tile(adventurer, adventurer.latest_city)
+    
+    def head_for_gap(self, adventurer):
+        '''A heuristic that moves the Adventurer towards the most valuable gap in the map it could still reach and explore this turn'''
+        best_gaps = adventurer.get_best_gaps(self.locations_to_avoid.union(self.get_hazards(adventurer)))
+        if not best_gaps or best_gaps[0][0] <= 0:
+            return False
+        exploration_value, moves, gap, step = best_gaps[0]
+        logger.debug("%s: heading %s for the gap at %s, %s, which is %s moves away and worth %s", adventurer.player.name, step, gap[0], gap[1], moves, exploration_value)
+        return adventurer.move(step)
+    
+    def get_hazards(self, adventurer):
+        '''Lists the coordinates of tiles that routes over the map should go around'''
+        return []
                     
     def move_away_from_tile(self, adventurer, tile):
         '''A heuristic that moves the Adventurer in the direction that increases the distance from a given tile, but by the minimum'''
-        print(str(adventurer.player.name) +": trying heuristic that prefers moves away from the tile at " +str(tile.tile_position.longitude)+ ", " +str(tile.tile_position.longitude))
+        logger.debug("%s: trying heuristic that prefers moves away from the tile at %s, %s", adventurer.player.name, tile.tile_position.longitude, tile.tile_position.longitude)
         #establish directions to the tile, as preferring to increase the distance in the lesser dimension first, between latitude and longitude
         if (abs(adventurer.current_tile.tile_position.longitude - tile.tile_position.longitude) 
             > abs(adventurer.current_tile.tile_position.latitude - tile.tile_position.latitude)):
@@ -138,20 +149,29 @@ class PlayerBeginnerExplorer(Player):
                 if adventurer.move(compass_point):
                     return True
                 else:
-                    self.locations_to_avoid.append([new_longitude, new_latitude])
+                    self.locations_to_avoid.add((new_longitude, new_latitude))
                     #If movement failed because the turn is over then leave here
                     if adventurer.turns_moved >= adventurer.game.turn:
                         return True
         
-        print("With no suitable moves available, try a random one, to avoid getting stuck in place")
-        if adventurer.move(random.choice(['n','e','s','w'])):
+        #head for the furthest tile that can still be reached this turn, rather than bouncing off land or the wind
+        step = adventurer.route_away_from(tile.tile_position.longitude, tile.tile_position.latitude, self.get_hazards(adventurer))
+        if step is not None:
+            logger.debug("%s is following a route away from the tile at %s, %s", adventurer.player.name, tile.tile_position.longitude, tile.tile_position.latitude)
+            if adventurer.move(step):
+                return True
+            if adventurer.turns_moved >= adventurer.game.turn:
+                return True
+        
+        logger.debug("With no suitable moves available, try a random one, to avoid getting stuck in place")
+        if adventurer.move(adventurer.game.rng.choice(['n','e','s','w'])):
             return True
-        print("With even the random move failing, just wait in place")
+        logger.debug("With even the random move failing, just wait in place")
         return adventurer.wait()
             
     def move_towards_tile(self, adventurer, tile):
         '''A heuristic that moves the Adventurer in the direction that decreases the distance from a given tile, by the maximum, but if unable waits in place'''
-        print(str(adventurer.player.name) +": trying heuristic that prefers moves towards the tile at " +str(tile.tile_position.longitude)+ ", " +str(tile.tile_position.longitude))
+        logger.debug("%s: trying heuristic that prefers moves towards the tile at %s, %s", adventurer.player.name, tile.tile_position.longitude, tile.tile_position.longitude)
         #establish directions to the tile, as preferring to decrease the distance in the greater dimension first, between latitude and longitude
         if (abs(adventurer.current_tile.tile_position.longitude - tile.tile_position.longitude) 
             < abs(adventurer.current_tile.tile_position.latitude - tile.tile_position.latitude)):
@@ -181,7 +201,7 @@ class PlayerBeginnerExplorer(Player):
         #Try the moves in sequence
         for compass_point in preferred_moves:
             if compass_point == preferred_moves[-1]:
-                print("Can't move in desired direction so risking a move away to get a favourable wind direction")
+                logger.debug("Can't move in desired direction so risking a move away to get a favourable wind direction")
             #translate the compass point into coordinates
             longitude_increment = int(compass_point.lower() in ["east","e"]) - int(compass_point.lower() in ["west","w"])
             new_longitude = adventurer.current_tile.tile_position.longitude + longitude_increment
@@ -192,20 +212,24 @@ class PlayerBeginnerExplorer(Player):
                 if adventurer.move(compass_point):
                     return True
                 else:
-                    self.locations_to_avoid.append([new_longitude, new_latitude])
+                    self.locations_to_avoid.add((new_longitude, new_latitude))
                     #If movement failed because the turn is over then leave here
                     if adventurer.turns_moved >= adventurer.game.turn:
                         return True
         
+        step = adventurer.route_towards(tile.tile_position.longitude, tile.tile_position.latitude, self.get_hazards(adventurer))
+        if step is not None and step != "wait":
+            if adventurer.move(step):
+                return True
         #If nothing else has worked then just wait for the next turn
         return adventurer.wait()
     
     
     def continue_move(self, adventurer):
         #with some probability, move in a random direction, to break out of degenerate situations
-        if random.random() < self.p_deviate:
-            print(str(adventurer.player.name)+ " is making a random movement, rather than following a heuristic")
-            adventurer.move(random.choice(['n','e','s','w']))
+        if adventurer.game.rng.random() < self.p_deviate:
+            logger.debug("%s is making a random movement, rather than following a heuristic", adventurer.player.name)
+            adventurer.move(adventurer.game.rng.choice(['n','e','s','w']))
 #        #move towards a city while banking will put the player ahead, and explore otherwise
 #        elif(adventurer.wealth > adventurer.game.wealth_difference):
         #move towards a city while banking will increase earning potential
@@ -217,11 +241,7 @@ class PlayerBeginnerExplorer(Player):
         return True
     
     def continue_turn(self, adventurer):
-        print(str(adventurer.player.name)+ " is moving an Adventurer, which has " 
-              +str(adventurer.wealth)+ " wealth, and is on the "
-              +adventurer.current_tile.tile_back+ " tile at position " 
-              +str(adventurer.current_tile.tile_position.longitude)+ "," 
-              +str(adventurer.current_tile.tile_position.latitude))
+        logger.debug("%s is moving an Adventurer, which has %s wealth, and is on the %s tile at position %s,%s", adventurer.player.name, adventurer.wealth, adventurer.current_tile.tile_back, adventurer.current_tile.tile_position.longitude, adventurer.current_tile.tile_position.latitude)
         
         game = adventurer.game
         if isinstance(game, GameAdvanced):
@@ -229,11 +249,11 @@ class PlayerBeginnerExplorer(Player):
                 game.choose_cadre(self)
         
         #reset the record of tiles already visited this turn
-        self.locations_to_avoid = []
+        self.locations_to_avoid = set()
         
         while adventurer.turns_moved < adventurer.game.turn:
             #record the current tile so that it can be avoided in subsequent moves to prevent degenerate yo-yoing
-            self.locations_to_avoid.append([adventurer.current_tile.tile_position.longitude, adventurer.current_tile.tile_position.latitude])
+            self.locations_to_avoid.add((adventurer.current_tile.tile_position.longitude, adventurer.current_tile.tile_position.latitude))
             self.continue_move(adventurer)
                 
         return True
@@ -254,15 +274,15 @@ class PlayerBeginnerExplorer(Player):
     
     #if offered by a city then always bank everything
     def check_deposit(self, adventurer, maximum, minimum, report="Player is being asked whether to bank wealth"):
-        print(report)
+        logger.debug("%s", report)
         return maximum
     
     #if offered by a city, then check whether oponents will win on their next visit to a city, and buy an Adventurer if not
     def check_buy_adventurer(self, adventurer, report="Player is being asked whether to buy an adventurer"):
-        print(report)
+        logger.debug("%s", report)
         
         #randomly choose not to hire, regardless of other conditions
-        if random.random() > self.p_buy_adventurer:
+        if adventurer.game.rng.random() > self.p_buy_adventurer:
             return False
         
         if adventurer.game.player_wealths[adventurer.player] > adventurer.game.cost_adventurer:
@@ -294,7 +314,7 @@ class PlayerBeginnerExplorer(Player):
     
     # never buy an agent when offered
     def check_buy_agent(self, adventurer, report="Player has been offered to buy an agent by a city"):
-        print(report)
+        logger.debug("%s", report)
         return None
     
     # never move an agent when offered
@@ -319,6 +339,8 @@ class PlayerBeginnerTrader(PlayerBeginnerExplorer):
 
 
     Methods:
+    get_inns takes a Cartolan.Adventurer
+    get_next_inn takes a Cartolan.Adventurer
     continue_move takes a Cartolan.Adventurer
     check_rest takes a Cartolan.Adventurer and a Cartolan.Agent
     check_bank_wealth takes a Cartolan.Adventurer and a String
@@ -327,55 +349,70 @@ class PlayerBeginnerTrader(PlayerBeginnerExplorer):
     '''
     def __init__(self, name):
         super().__init__(name)
-        self.next_agent_num = {} #An integer for each Adventurer, tracking by index which Inn/Agent is next to visit
+        self.visited_inns = {} #A set for each Adventurer, of the Inns/Agents visited since it was last at a city
+    
+    def get_inns(self, adventurer):
+        '''Lists the player's Agents in the order that their Adventurers should visit them'''
+        return adventurer.game.agents[self]
+    
+    def get_next_inn(self, adventurer):
+        '''Finds the first Inn/Agent that the Adventurer hasn't visited since it was last at a city, or None if there are none left
+        
+        The Inns are tracked by identity rather than their place in the order, as that order can change while travelling
+        '''
+        visited_inns = self.visited_inns.get(adventurer)
+        if visited_inns is None:
+            return None
+        for agent in self.get_inns(adventurer):
+            if not agent in visited_inns:
+                return agent
+        return None
     
     def continue_move(self, adventurer):
-        agents = adventurer.game.agents[self]
+        next_inn = self.get_next_inn(adventurer)
                                 
         #with some probability, move in a random direction, to break out of degenerate situations
-        if random.random() < self.p_deviate:
-            adventurer.move(random.choice(['n','e','s','w']))
+        if adventurer.game.rng.random() < self.p_deviate:
+            adventurer.move(adventurer.game.rng.choice(['n','e','s','w']))
         #locate the next unvisited agent and move towards them, or if all agents have been visited either explore or return home
-        elif self.next_agent_num.get(adventurer) is not None and self.next_agent_num.get(adventurer) < len(agents):
+        elif next_inn is not None:
             if (adventurer.wealth < getattr(adventurer.game, self.return_city_attr)):
-                print("As a Trader, "+self.name+" is moving towards their next Inn, #"+str(self.next_agent_num.get(adventurer)))
-                self.move_towards_tile(adventurer, agents[self.next_agent_num.get(adventurer)].current_tile)
+                logger.debug("As a Trader, %s is moving towards their next Inn, #%s", self.name, len(self.visited_inns[adventurer]))
+                self.move_towards_tile(adventurer, next_inn.current_tile)
             else:
                 self.move_towards_tile(adventurer, adventurer.latest_city)
         else:
-            if self.next_agent_num.get(adventurer) is not None:
-                print("As a Trader, "+self.name+" has visited all their "+str(self.next_agent_num.get(adventurer)+1)+" Inns")
-            if (adventurer.wealth < getattr(adventurer.game, self.return_city_attr) and len(agents) < adventurer.game.MAX_AGENTS):
+            if self.visited_inns.get(adventurer) is not None:
+                logger.debug("As a Trader, %s has visited all their %s Inns", self.name, len(self.visited_inns[adventurer]))
+            if (adventurer.wealth < getattr(adventurer.game, self.return_city_attr) and len(adventurer.game.agents[self]) < adventurer.game.MAX_AGENTS):
                 self.explore_best_space(adventurer)
 #                   self.explore_above_distance(adventurer, adventurer.latest_city, adventurer.game.CITY_DOMAIN_RADIUS)
             else:
                 self.move_towards_tile(adventurer, adventurer.latest_city)
         
         if isinstance(adventurer.current_tile, CityTile):
-            print(self.name+" has visited a city and will start heading to their first Inn again")
-            self.next_agent_num[adventurer] = 0
+            logger.debug("%s has visited a city and will start heading to their first Inn again", self.name)
+            self.visited_inns[adventurer] = set()
         return True
 
     def check_rest(self, adventurer, agent):
-        agents = adventurer.game.agents[self]
         #if this was the target agent for movement then start looking for the next one
-        if self.next_agent_num.get(adventurer) is not None and self.next_agent_num.get(adventurer) < len(agents):
-            if agent == agents[self.next_agent_num.get(adventurer)]:
-                print(self.name+"has reached their intended Inn, and will now head for Inn #"+str(self.next_agent_num[adventurer]+1))
-                self.next_agent_num[adventurer] += 1
+        if agent is not None and agent is self.get_next_inn(adventurer):
+            self.visited_inns[adventurer].add(agent)
+            logger.debug("%shas reached their intended Inn, and will now head for Inn #%s", self.name, len(self.visited_inns[adventurer]))
         #if there is an agent then always rest
         return True        
 
     def check_bank_wealth(self, adventurer, report="Player is being asked whether to bank"):
-        print(self.name+"has visited a city and will start heading to their first Inn again")
-        self.next_agent_num[adventurer] = 0
+        logger.debug("%shas visited a city and will start heading to their first Inn again", self.name)
+        self.visited_inns[adventurer] = set()
         return super().check_bank_wealth(adventurer, report)
     
     # if this is a wonder then always place an agent when offered
     def check_place_agent(self, adventurer):
         agents = adventurer.game.agents[self]
         if len(agents) < adventurer.current_tile.game.MAX_AGENTS and adventurer.current_tile.is_wonder:
-            print(self.name+" is placing an Inn where they can trade.")
+            logger.debug("%s is placing an Inn where they can trade.", self.name)
             return True
         else:
             return False
@@ -388,7 +425,7 @@ class PlayerBeginnerTrader(PlayerBeginnerExplorer):
     def check_buy_adventurer(self, adventurer, report=""):
         adventurers = adventurer.game.adventurers[self]
         if super().check_buy_adventurer(adventurer):
-            self.next_agent_num[adventurers[-1]] = 0
+            self.visited_inns[adventurers[-1]] = set()
             return True
         else:
             return False
@@ -405,22 +442,27 @@ class PlayerBeginnerRouter(PlayerBeginnerTrader):
     
     
     Methods:
+    get_inns takes a Cartolan.Adventurer
     continue_move takes a Cartolan.Adventurer
     check_place_agent takes a Cartolan.Adventurer
     check_move_agent takes a Cartolan.Adventurer
     '''    
+    def get_inns(self, adventurer):
+        '''Follows the game's route through the player's Agents, from the nearest to the first city onwards, rather than the order they were placed'''
+        return adventurer.game.agent_routes[self]
+    
     def continue_move(self, adventurer):
-        agents = adventurer.game.agents[self]
+        next_inn = self.get_next_inn(adventurer)
         #with some probability, move in a random direction, to break out of degenerate situations
-        if random.random() < self.p_deviate:
-            adventurer.move(random.choice(['n','e','s','w']))
+        if adventurer.game.rng.random() < self.p_deviate:
+            adventurer.move(adventurer.game.rng.choice(['n','e','s','w']))
         #locate the next unvisited agent and move towards them, or if all agents have been visited either explore or return home
-        elif self.next_agent_num.get(adventurer) is not None and  self.next_agent_num.get(adventurer) < len(agents):
-            print("As a Router, "+self.name+" is moving towards their next Inn, #"+str(self.next_agent_num.get(adventurer)))
-            self.move_towards_tile(adventurer, agents[self.next_agent_num.get(adventurer)].current_tile)
+        elif next_inn is not None:
+            logger.debug("As a Router, %s is moving towards their next Inn, #%s", self.name, len(self.visited_inns[adventurer]))
+            self.move_towards_tile(adventurer, next_inn.current_tile)
         else:
-            if self.next_agent_num.get(adventurer):
-                print("As a Router, "+self.name+" has visited all their "+str(self.next_agent_num.get(adventurer) + 1)+" Inns")
+            if self.visited_inns.get(adventurer):
+                logger.debug("As a Router, %s has visited all their %s Inns", self.name, len(self.visited_inns[adventurer]))
 #            if (adventurer.wealth <= adventurer.game.wealth_difference):
             if (adventurer.wealth < getattr(adventurer.game, self.return_city_attr)):
                 self.explore_best_space(adventurer)
@@ -433,8 +475,8 @@ class PlayerBeginnerRouter(PlayerBeginnerTrader):
         if adventurer.current_tile.is_wonder:
             adventurer.trade(adventurer.current_tile)
         if isinstance(adventurer.current_tile, CityTile):
-            print(self.name+" has visited a city and will start heading to their first Inn again")
-            self.next_agent_num[adventurer] = 0
+            logger.debug("%s has visited a city and will start heading to their first Inn again", self.name)
+            self.visited_inns[adventurer] = set()
         return True
     
     # if this is the last movement of a turn then always place an agent when offered
@@ -442,7 +484,7 @@ class PlayerBeginnerRouter(PlayerBeginnerTrader):
         agents = adventurer.game.agents[self]
         #if this would otherwise be the last move this turn, then place an agent
         if len(agents) < adventurer.game.MAX_AGENTS and not adventurer.can_move(None):
-            print(self.name+" is placing an Inn where they have struggled to move.")
+            logger.debug("%s is placing an Inn where they have struggled to move.", self.name)
             return True
         else:
             return False
@@ -460,6 +502,7 @@ class PlayerRegularExplorer(PlayerBeginnerExplorer):
     
     Methods:
     continue_turn takes a Cartolan.Adventurer
+    get_hazards takes a Cartolan.Adventurer
     check_attack_adventurer takes two Cartolan.Adventurers
     check_attack_agent takes a Cartolan.Adventurer and a Carolan.Agent
     check_restore_agent takes a Cartolan.Adventurer and a Carolan.Agent
@@ -472,7 +515,7 @@ class PlayerRegularExplorer(PlayerBeginnerExplorer):
     def explore_best_space(self, adventurer):
         '''Extends basic behaviour by trying to use Chest maps first'''
         #check downwind clockwise first, then downwind anti, then upwind clock, then upwind anti
-        print(str(adventurer.player.name) +": trying heuristic that prefers the adjacent gap in the map with the highest prospective score from adjoining edges, preferring downwind and right when this is tied")
+        logger.debug("%s: trying heuristic that prefers the adjacent gap in the map with the highest prospective score from adjoining edges, preferring downwind and right when this is tied", adventurer.player.name)
         if adventurer.current_tile.wind_direction.east:
             if adventurer.current_tile.wind_direction.north:
                 potential_moves = ['e', 'n', 'w', 's']
@@ -489,16 +532,15 @@ class PlayerRegularExplorer(PlayerBeginnerExplorer):
         preferred_guaranteed = False #Keep track of whether there is a Chest tile that will guarantee this exploration succeeds
         preferred_score = 0
         exploration_moves = 0
+        explorable = {}
+        for action_type, compass_point, coordinates in adventurer.get_legal_actions():
+            if action_type == "explore":
+                explorable[compass_point] = coordinates
         for compass_point in potential_moves:
-            if adventurer.can_move(compass_point):
-                #translate the compass point into coordinates
-                longitude_increment = int(compass_point.lower() in ["east","e"]) - int(compass_point.lower() in ["west","w"])
-                new_longitude = adventurer.current_tile.tile_position.longitude + longitude_increment
-                latitude_increment = int(compass_point.lower() in ["north","n"]) - int(compass_point.lower() in ["south","s"])
-                new_latitude = adventurer.current_tile.tile_position.latitude + latitude_increment
-                #check whether empty or otherwise designated to avoid
-                if (adventurer.exploration_needed(new_longitude, new_latitude) 
-                    and not self.check_location_to_avoid(new_longitude, new_latitude)):
+            if compass_point in explorable:
+                new_longitude, new_latitude = explorable[compass_point]
+                #check whether otherwise designated to avoid
+                if not self.check_location_to_avoid(new_longitude, new_latitude):
                     #Check whether the score from exploring here beats any checked so far
                     exploration_moves += 1
                     potential_score = adventurer.get_exploration_value(adventurer.get_adjoining_edges(new_longitude, new_latitude), compass_point)
@@ -519,7 +561,7 @@ class PlayerRegularExplorer(PlayerBeginnerExplorer):
                             preferred_move = compass_point
                             preferred_score = potential_score
                             adventurer.preferred_tile_num = score_guaranteed #Select this chest tile to be used
-        print(self.name +"'s Adventurer has "+str(exploration_moves)+" exploration options.")
+        logger.debug("%s's Adventurer has %s exploration options.", self.name, exploration_moves)
         if preferred_move is not None:
             if adventurer.move(preferred_move):
                 return True
@@ -527,40 +569,41 @@ class PlayerRegularExplorer(PlayerBeginnerExplorer):
                 #If movement failed because the turn is over then leave here
                 if adventurer.turns_moved >= adventurer.game.turn:
                     return True
-                self.locations_to_avoid.append([new_longitude, new_latitude])
+                self.locations_to_avoid.add(explorable[preferred_move])
                 return False
         elif exploration_moves == 3:
             #The absence of any scoring opportunities despite exploration on all sides implies isolation and that it's worth abandoning the expedition
             city_tile = adventurer.latest_city
             adventurer.abandon_expedition(city_tile)
-        print("With no valid Chest map placements found, then looking for random exploration")
+        elif exploration_moves == 0 and self.head_for_gap(adventurer):
+            return True
+        logger.debug("With no valid Chest map placements found, then looking for random exploration")
         return self.move_away_from_tile(adventurer, adventurer.latest_city)
     
     def continue_turn(self, adventurer):
-        print(str(adventurer.player.name)+ " is moving an Adventurer, which has " 
-              +str(adventurer.wealth)+ " wealth, and is on the "
-              +adventurer.current_tile.tile_back+ " tile at position " 
-              +str(adventurer.current_tile.tile_position.longitude)+ "," 
-              +str(adventurer.current_tile.tile_position.latitude))
+        logger.debug("%s is moving an Adventurer, which has %s wealth, and is on the %s tile at position %s,%s", adventurer.player.name, adventurer.wealth, adventurer.current_tile.tile_back, adventurer.current_tile.tile_position.longitude, adventurer.current_tile.tile_position.latitude)
         
         #update awareness of disaster tiles, to avoid them, and reset the record of tiles already visited this turn
-        self.locations_to_avoid = []
+        self.locations_to_avoid = set()
         for disaster_tile in adventurer.game.disaster_tiles:
-            self.locations_to_avoid.append([disaster_tile.tile_position.longitude, disaster_tile.tile_position.latitude])
+            self.locations_to_avoid.add((disaster_tile.tile_position.longitude, disaster_tile.tile_position.latitude))
         
         #check whether already on a tile with an adventurer, and wait here in order to attack/arrest
         for other_adventurer in adventurer.current_tile.adventurers:
             if self.check_attack_adventurer(adventurer, other_adventurer):
-                print(self.name+ "'s adventurer is waiting on their current tile to attack an adventurer belonging to " 
-                      +other_adventurer.player.name)
+                logger.debug("%s's adventurer is waiting on their current tile to attack an adventurer belonging to %s", self.name, other_adventurer.player.name)
                 adventurer.wait()   
         
         while adventurer.turns_moved < adventurer.game.turn:
             #record the current tile so that it can be avoided in subsequent moves to prevent degenerate yo-yoing
-            self.locations_to_avoid.append([adventurer.current_tile.tile_position.longitude, adventurer.current_tile.tile_position.latitude])
+            self.locations_to_avoid.add((adventurer.current_tile.tile_position.longitude, adventurer.current_tile.tile_position.latitude))
             self.continue_move(adventurer)
         return True    
         
+    def get_hazards(self, adventurer):
+        '''Extends the Beginner behaviour to route around Disaster tiles'''
+        return [(disaster_tile.tile_position.longitude, disaster_tile.tile_position.latitude) for disaster_tile in adventurer.game.disaster_tiles]
+    
     def check_attack_adventurer(self, adventurer, other_adventurer):
         # if the adventurer has a pirate token and the wealth from an arrest exceeds the loss from piracy then stick around and fight
         if (other_adventurer.pirate_token and other_adventurer.player != self
@@ -590,7 +633,7 @@ class PlayerRegularExplorer(PlayerBeginnerExplorer):
     
     def choose_tile(self, adventurer, tiles):
         #randomly choose one
-        return random.choice(tiles) 
+        return adventurer.game.rng.choice(tiles) 
 
         
 class PlayerRegularTrader(PlayerBeginnerTrader, PlayerRegularExplorer):    
@@ -629,13 +672,12 @@ class PlayerRegularPirate(PlayerRegularExplorer):
         #check whether already on a tile with an adventurer, and wait here in order to attack/arrest
         for other_adventurer in adventurer.current_tile.adventurers:
             if self.check_attack_adventurer(adventurer, other_adventurer):
-                print(self.name+ "'s adventurer is waiting on their current tile to attack an adventurer belonging to " 
-                      +other_adventurer.player.name)
+                logger.debug("%s's adventurer is waiting on their current tile to attack an adventurer belonging to %s", self.name, other_adventurer.player.name)
                 adventurer.wait()
         
         #with some probability, move in a random direction, to break out of degenerate situations
-        if random.random() < self.p_deviate:
-            adventurer.move(random.choice(['n','e','s','w']))
+        if adventurer.game.rng.random() < self.p_deviate:
+            adventurer.move(adventurer.game.rng.choice(['n','e','s','w']))
         #move towards the capital while banking will put the player ahead, and chase the next big score otherwise
 #        elif(adventurer.wealth > adventurer.game.wealth_difference):
         elif(adventurer.wealth >= getattr(adventurer.game, self.return_city_attr)):
@@ -645,8 +687,7 @@ class PlayerRegularPirate(PlayerRegularExplorer):
             #update awareness of disaster tiles, to avoid them
             for other_adventurer in adventurer.current_tile.adventurers:
                 if self.check_attack_adventurer(adventurer, other_adventurer):
-                    print(self.name+ "'s adventurer is waiting on their current tile to attack an adventurer belonging to " 
-                          +other_adventurer.player.name)
+                    logger.debug("%s's adventurer is waiting on their current tile to attack an adventurer belonging to %s", self.name, other_adventurer.player.name)
                     adventurer.wait()
             
             # check all other players' adventurers and agents and tiles for the most lucrative
@@ -672,7 +713,7 @@ class PlayerRegularPirate(PlayerRegularExplorer):
 #                 self.explore_away_from_tile(adventurer, adventurer.latest_city)
                 self.explore_best_space(adventurer)
             else:
-                print("Pirate is moving towards the tile at location "+str(score_location.tile_position.longitude)+", "+str(score_location.tile_position.latitude))
+                logger.debug("Pirate is moving towards the tile at location %s, %s", score_location.tile_position.longitude, score_location.tile_position.latitude)
                 self.move_towards_tile(adventurer, score_location)
         return True
     
@@ -713,10 +754,10 @@ class PlayerAdvancedExplorer(PlayerRegularExplorer):
     
     def check_buy_tech(self, adventurer):
         #randomly choose not to buy, regardless of other conditions
-        if random.random() > self.p_buy_tech:
+        if adventurer.game.rng.random() > self.p_buy_tech:
             return False
         
-        print(self.name+" is deciding whether to buy a Manuscript card")
+        logger.debug("%s is deciding whether to buy a Manuscript card", self.name)
         if adventurer.game.player_wealths[adventurer.player] >= adventurer.game.cost_tech:
             #Check whether player has won compared to wealthiest opponent 
             wealthiest_opponent_wealth = 0
@@ -744,7 +785,7 @@ class PlayerAdvancedExplorer(PlayerRegularExplorer):
         '''Gives an automated response to games giving the choice to buy
         '''
         #randomly choose one
-        return random.choice(cards)
+        return adventurer.game.rng.choice(cards)
 
 class PlayerAdvancedTrader(PlayerRegularTrader, PlayerAdvancedExplorer):    
     '''A virtual player for Regular Cartolan that favours maximising trade value
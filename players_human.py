@@ -48,14 +48,13 @@ class PlayerHuman(Player):
             moves["invalid"] = [] 
             
             #highlight the adjacent tiles that can be reached this move
+            legal_moves = [action[1] for action in adventurer.get_legal_actions() if action[0] in ["move", "explore"]]
             for compass_point in ['n', 'e', 's', 'w']:
                 #locate the space in the play area that the Adventurer is moving into
-                longitude_increment = int(compass_point.lower() in ["east","e"]) - int(compass_point.lower() in ["west","w"])
+                longitude_increment, latitude_increment = adventurer.game.play_area.NEIGHBOUR_INCREMENTS[compass_point]
                 potential_longitude = adventurer.current_tile.tile_position.longitude + longitude_increment
-                latitude_increment = int(compass_point.lower() in ["north","n"]) - int(compass_point.lower() in ["south","s"])
                 potential_latitude = adventurer.current_tile.tile_position.latitude + latitude_increment
-                can_move = adventurer.can_move(compass_point)
-                if can_move:
+                if compass_point in legal_moves:
                     moves["move"].append([potential_longitude, potential_latitude])
                 else:
                     moves["invalid"].append([potential_longitude, potential_latitude])
@@ -239,9 +238,7 @@ class PlayerHuman(Player):
                     self.follow_route = player_input["route"][:] #Copy the other player's route rather than referncing the list (which would then mean modifying it and disrupting the visuals)
                     destination_coords = player_input["destination"]
                     play_area = adventurer.game.play_area
-                    self.destination = None
-                    if play_area.get(destination_coords[0]):
-                        self.destination = play_area[destination_coords[0]].get(destination_coords[1])
+                    self.destination = play_area.get_tile(destination_coords[0], destination_coords[1])
 #                    print("Setting out on route of length "+str(len(self.follow_route)))
 #                    if self.auto_actions["rest"] is None:
 #                        self.auto_actions["rest"] = True #
@@ -0,0 +1,288 @@
+'''
+    Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
+'''
+
+from game import GameAdvanced
+from game_config import RegularConfig
+from players_heuristical import PlayerBeginnerExplorer, PlayerRegularExplorer, PlayerAdvancedExplorer
+from multiprocessing import Pool, TimeoutError
+import math
+import random
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SearchNode:
+    '''A node in the tree of an Adventurer's possible moves, keeping track of how well the rollouts through it went
+
+    Moves are keyed by their compass point, or None for waiting in place. As exploration is random, the same
+    moves needn't lead to the same game state, so nodes only record the statistics for each sequence of moves.
+
+    Methods:
+    __init__
+    select_child takes a list of moves, a float exploration constant, and a random.Random
+    merge_children takes a dict of visits and total values for each move
+    '''
+    __slots__ = ("children", "visits", "total_value")
+
+    def __init__(self):
+        self.children = {}
+        self.visits = 0
+        self.total_value = 0.0
+
+    def select_child(self, moves, exploration_constant, rng):
+        '''Chooses a move to follow from this node, trying each at least once and then trading off their scores against how little they've been tried
+
+        Returns the move, its child node, and whether that node was just added to the tree
+        '''
+        untried_moves = [move for move in moves if move not in self.children]
+        if untried_moves:
+            move = rng.choice(untried_moves)
+            child = self.children[move] = SearchNode()
+            return move, child, True
+        #only the moves available this time count, as different explorations may have made others possible before
+        log_visits = math.log(sum(self.children[move].visits for move in moves))
+        best_move, best_score = None, None
+        for move in moves:
+            child = self.children[move]
+            score = child.total_value / child.visits + exploration_constant * math.sqrt(log_visits / child.visits)
+            if best_score is None or score > best_score:
+                best_move, best_score = move, score
+        return best_move, self.children[best_move], False
+
+    def merge_children(self, child_statistics):
+        '''Adds the statistics from another search of the same position into this node's children
+        '''
+        for move, (visits, total_value) in child_statistics.items():
+            child = self.children.get(move)
+            if child is None:
+                child = self.children[move] = SearchNode()
+            child.visits += visits
+            child.total_value += total_value
+            self.visits += visits
+            self.total_value += total_value
+
+class PlayerMCTS(PlayerAdvancedExplorer):
+    '''A virtual player for Regular and Advanced mode Cartolan that chooses each move by Monte Carlo tree search
+
+    Each search plays on from forks of the game, in which heuristic players stand in for everyone, so that the
+    time spent thinking stays within a budget. Other decisions, like whether to rest or attack, are left to the
+    inherited heuristics.
+
+    Methods:
+    __init__ takes a String name, and optionally a float think time in seconds, an int number of worker processes, and a heuristic Player class for rollouts
+    continue_move takes a Cartolan.Adventurer
+    get_moves takes a Cartolan.Adventurer
+    make_move takes a Cartolan.Adventurer and a compass point String or None
+    get_stand_ins takes a Cartolan.Game
+    search takes a Cartolan.Game, two int indices for the Player and Adventurer, a SearchNode, a float deadline, and an int seed
+    simulate takes a Cartolan.Game, two int indices for the Player and Adventurer, a SearchNode, and a random.Random
+    rollout takes a Cartolan.Game, and a Cartolan.Adventurer
+    evaluate takes a Cartolan.Game and a Cartolan.Player
+    end_game takes a Cartolan.Game
+    close_pool
+    '''
+    def __init__(self, name, think_time=RegularConfig.MCTS_THINK_TIME, num_workers=RegularConfig.MCTS_NUM_WORKERS, rollout_policy=None):
+        super().__init__(name)
+        self.think_time = think_time
+        self.num_workers = num_workers
+        self.rollout_policy = rollout_policy #the heuristic Player class to stand in for this player and others without their own heuristics
+        self.exploration_constant = RegularConfig.MCTS_EXPLORATION_CONSTANT
+        self.rollout_rounds = RegularConfig.MCTS_ROLLOUT_ROUNDS
+        self.worker_timeout = RegularConfig.MCTS_WORKER_TIMEOUT
+        self.rng = random.Random()
+        self.pool = None
+        #the subtree for the move just made, to carry on searching from if the same Adventurer moves again this turn
+        self.search_root = None
+        self.search_adventurer = None
+        self.search_turn = None
+
+    def __getstate__(self):
+        '''Leaves out the search tree, process pool and games when sending the player to worker processes
+        '''
+        state = self.__dict__.copy()
+        state["games"] = {}
+        state["pool"] = None
+        state["search_root"] = None
+        state["search_adventurer"] = None
+        return state
+
+    def continue_move(self, adventurer):
+        '''Searches ahead through the possible moves for up to the think time, and makes the one that was explored most
+        '''
+        game = adventurer.game
+        moves = self.get_moves(adventurer)
+        if len(moves) == 1:
+            self.search_root = None
+            return self.make_move(adventurer, moves[0])
+
+        #carry on with the tree from the last move, if this Adventurer is still moving
+        if (self.search_root is not None and self.search_adventurer is adventurer
+            and self.search_turn == game.turn):
+            root = self.search_root
+        else:
+            root = SearchNode()
+        player_index = game.players.index(self)
+        adventurer_index = game.adventurers[self].index(adventurer)
+        deadline = time.perf_counter() + self.think_time
+
+        if self.num_workers > 1:
+            #each worker grows its own tree for the same position, and their statistics for the first moves are pooled
+            if self.pool is None:
+                self.pool = Pool(self.num_workers - 1)
+            fork = game.fork(self.get_stand_ins(game))
+            #copy the tiles that are still shared with this game, so that only the fork is sent to the workers
+            for tile_piles in [fork.tile_piles, fork.discard_piles]:
+                for tile_pile in tile_piles.values():
+                    tile_pile.tiles = [tile if tile.game is fork else tile.copy_into(fork) for tile in tile_pile.tiles]
+            search_args = [(self, fork, player_index, adventurer_index, self.think_time, self.rng.getrandbits(32))
+                           for worker_num in range(self.num_workers - 1)]
+            worker_results = self.pool.map_async(search_in_worker, search_args)
+            iterations = self.search(game, player_index, adventurer_index, root, deadline, self.rng.getrandbits(32))
+            #a worker that dies never returns its results, so rather than waiting forever, carry on with this process's search
+            try:
+                for child_statistics in worker_results.get(timeout=self.think_time + self.worker_timeout):
+                    root.merge_children(child_statistics)
+            except TimeoutError:
+                logger.warning("%s gave up waiting for its search workers, and will choose from its own search alone", self.name)
+                self.pool.terminate()
+                self.pool = None
+        else:
+            iterations = self.search(game, player_index, adventurer_index, root, deadline, self.rng.getrandbits(32))
+
+        move = max(moves, key=lambda move: root.children[move].visits if move in root.children else -1)
+        logger.debug("%s chose to move %s after %s rollouts, with %s in total through this position", self.name, move, iterations, root.visits)
+        self.search_root = root.children.get(move)
+        self.search_adventurer = adventurer
+        self.search_turn = game.turn
+        return self.make_move(adventurer, move)
+
+    def get_moves(self, adventurer):
+        '''Lists the compass points that the Adventurer could move in, and None for waiting in place
+        '''
+        moves = [action[1] for action in adventurer.get_legal_actions() if action[0] in ["move", "explore"]]
+        moves.append(None)
+        return moves
+
+    def make_move(self, adventurer, move):
+        '''Moves the Adventurer towards a compass point, or waits in place for None
+        '''
+        if move is None:
+            return adventurer.wait()
+        return adventurer.move(move)
+
+    def get_stand_ins(self, game):
+        '''Sets up a heuristic Player to act for each of the game's Players in a fork, so that their own memory isn't disturbed
+
+        Heuristic players are modelled by their own type, while the rest follow the rollout policy.
+        '''
+        rollout_policy = self.rollout_policy
+        if rollout_policy is None:
+            if isinstance(game, GameAdvanced):
+                rollout_policy = PlayerAdvancedExplorer
+            else:
+                rollout_policy = PlayerRegularExplorer
+        stand_ins = {}
+        for player in game.players:
+            if isinstance(player, PlayerBeginnerExplorer) and not isinstance(player, PlayerMCTS):
+                stand_in = type(player)(player.name)
+            else:
+                stand_in = rollout_policy(player.name)
+            #stand-ins match the players they replace, as the game's records are keyed by player
+            stand_in.player_id = player.player_id
+            stand_in.locations_to_avoid = set(getattr(player, "locations_to_avoid", ()))
+            stand_ins[player] = stand_in
+        return stand_ins
+
+    def search(self, game, player_index, adventurer_index, root, deadline, seed):
+        '''Keeps running simulations from the game until the deadline, returning how many were run
+        '''
+        rng = random.Random(seed)
+        iterations = 0
+        while True:
+            self.simulate(game, player_index, adventurer_index, root, rng)
+            iterations += 1
+            if time.perf_counter() >= deadline:
+                return iterations
+
+    def simulate(self, game, player_index, adventurer_index, root, rng):
+        '''Follows the tree through a fork of the game until reaching a new move, then plays on and records how well it went
+        '''
+        fork = game.fork(self.get_stand_ins(game))
+        #the fork would otherwise draw the same tiles every time
+        fork.rng.seed(rng.getrandbits(32))
+        player = fork.players[player_index]
+        adventurer = fork.adventurers[player][adventurer_index]
+
+        path = [root]
+        node = root
+        while adventurer.turns_moved < fork.turn and not fork.game_over:
+            move, node, added = node.select_child(self.get_moves(adventurer), self.exploration_constant, rng)
+            path.append(node)
+            self.make_move(adventurer, move)
+            if added:
+                break
+
+        value = self.rollout(fork, adventurer)
+        for node in path:
+            node.visits += 1
+            node.total_value += value
+
+    def rollout(self, fork, adventurer):
+        '''Plays on in a fork with the stand-in players, for the rest of the round and a few rounds more, returning the value to the Adventurer's player
+        '''
+        player = adventurer.player
+        while adventurer.turns_moved < fork.turn and not fork.game_over:
+            player.continue_move(adventurer)
+        if not fork.game_over:
+            #the round is finished off from where the search left it, as those that have moved this turn are skipped
+            fork.game_over = fork.check_win_conditions() or fork.play_round()
+        final_turn = fork.turn + self.rollout_rounds
+        while not fork.game_over and fork.turn < final_turn:
+            fork.turn += 1
+            fork.game_over = fork.play_round()
+        return self.evaluate(fork, player)
+
+    def evaluate(self, game, player):
+        '''Scores a game from 0 to 1 for the player, by whether they won or else their lead over the wealthiest rival
+        
+        Wealth still in Adventurers' Chests is discounted by how many turns away the nearest city is, as a few rounds 
+        of rollout often aren't long enough to bring it home.
+        '''
+        if game.game_over:
+            return float(game.winning_player == player)
+        #a mythical city still waiting in the land pile has no position yet
+        placed_cities = [city for city in game.cities if city.tile_position.longitude is not None]
+        wealths = {}
+        for other_player in game.players:
+            wealths[other_player] = game.player_wealths[other_player]
+            for adventurer in game.adventurers[other_player]:
+                if adventurer.wealth > 0:
+                    position = adventurer.current_tile.tile_position
+                    distance = min(abs(city.tile_position.longitude - position.longitude) 
+                                   + abs(city.tile_position.latitude - position.latitude) for city in placed_cities)
+                    wealths[other_player] += adventurer.wealth * adventurer.max_downwind_moves / (adventurer.max_downwind_moves + distance)
+        lead = wealths[player] - max(wealths[other_player] for other_player in game.players if other_player != player)
+        return 0.5 + 0.5 * max(-1.0, min(1.0, lead / game.game_winning_difference))
+
+    def end_game(self, game):
+        '''Shuts down any worker processes once the game is over
+        '''
+        self.close_pool()
+
+    def close_pool(self):
+        '''Shuts down the worker processes, once the player has finished with them
+        '''
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+def search_in_worker(search_args):
+    '''Runs a tree search in a worker process, returning the visits and total value for each first move, so that they can be merged
+    '''
+    player, game, player_index, adventurer_index, think_time, seed = search_args
+    root = SearchNode()
+    player.search(game, player_index, adventurer_index, root, time.perf_counter() + think_time, seed)
+    return {move:(child.visits, child.total_value) for move, child in root.children.items()}
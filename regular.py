@@ -2,10 +2,12 @@
 Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
 '''
 
-import random
+import logging
 from base import Token, Adventurer, Agent, Tile, WindDirection, TileEdges, CityTile
 from beginner import AdventurerBeginner, AgentBeginner, CityTileBeginner
 
+logger = logging.getLogger(__name__)
+
 
 class AdventurerRegular(AdventurerBeginner):
     '''An extension to the AdventurerBeginner class that introduces extra behaviours available in Regular mode Cartolan
@@ -15,12 +17,18 @@ class AdventurerRegular(AdventurerBeginner):
     choose_pile takes a String giving the latter or word for a cardinal compass direction
     choose_discard_pile takes a String giving the latter or word for a cardinal compass direction
     can_move takes takes a String giving the latter or word for a cardinal compass direction
+    within_move_budget takes a String move type and three Ints counting moves since resting
+    move_budgets
+    get_token_actions
     move takes a String giving the latter or word for a cardinal compass direction
     wait
     trade takes a Cartolan.Tile
     attack takes a Cartolan.Token object
     restore_agent takes a Cartolan.Agent object
     '''
+    __slots__ = ("attack_success_prob", "attacked", "chest_tiles", "cost_agent_restore", "max_land_moves_unburdened", "max_upwind_moves_unburdened"
+                 , "num_chest_tiles", "pirate_token", "restored", "value_arrest", "value_dispossess_agent")
+
     def __init__(self, game, player, starting_city):
         super().__init__(game, player, starting_city)
         self.pirate_token = False
@@ -51,11 +59,11 @@ class AdventurerRegular(AdventurerBeginner):
         '''
         if self.current_tile.compass_edge_water(compass_point):
             tile_pile = self.game.tile_piles["water"]
-            print("Identified the " +tile_pile.tile_back+ " tile pile, which still has " +str(len(tile_pile.tiles)) +" tiles")
+            logger.debug("Identified the %s tile pile, which still has %s tiles", tile_pile.tile_back, len(tile_pile.tiles))
             return tile_pile
         else:
             tile_pile = self.game.tile_piles["land"]
-            print("Identified the " +tile_pile.tile_back+ " tile pile, which still has " +str(len(tile_pile.tiles)) +" tiles")
+            logger.debug("Identified the %s tile pile, which still has %s tiles", tile_pile.tile_back, len(tile_pile.tiles))
             return tile_pile
     
     def choose_discard_pile(self, compass_point):
@@ -63,11 +71,11 @@ class AdventurerRegular(AdventurerBeginner):
         '''
         if self.current_tile.compass_edge_water(compass_point):
             discard_pile = self.game.discard_piles["water"]
-            print("Identified the " +discard_pile.tile_back+ " discard pile, which still has " +str(len(discard_pile.tiles)) +" tiles")
+            logger.debug("Identified the %s discard pile, which still has %s tiles", discard_pile.tile_back, len(discard_pile.tiles))
             return discard_pile
         else:
             discard_pile = self.game.discard_piles["land"]
-            print("Identified the " +discard_pile.tile_back+ " discard pile, which still has " +str(len(discard_pile.tiles)) +" tiles")
+            logger.debug("Identified the %s discard pile, which still has %s tiles", discard_pile.tile_back, len(discard_pile.tiles))
             return discard_pile
     
     def choose_tiles(self, num_tiles):
@@ -79,12 +87,16 @@ class AdventurerRegular(AdventurerBeginner):
             pile_num = tile_num % len(self.game.tile_piles)
             #Select the tile pile to draw from
             tile_pile = self.game.tile_piles[list(self.game.tile_piles.keys())[pile_num]] #WARNING - this isn't deterministic, so an undo that somehow changes the dict may get different results
+            #tiles are chosen when buying Adventurers and resting, not just when moving, so log the pile before it changes
+            undo_log = self.game.undo_log
+            if undo_log.recording:
+                undo_log.capture(tile_pile)
             #Choose the next tile from the bag / pile and add it to their Chest
             tile_chosen = False
             num_bad_tiles = 0 #keep track of the number of unsuitable tiles, in case there are no suitable ones
             while not tile_chosen:
                 if len(tile_pile.tiles) > num_bad_tiles: #check that there are at least some suitable tiles  
-                    chosen_tile = tile_pile.tiles.pop()
+                    chosen_tile = tile_pile.draw_tile(self.game.rng)
                     if False:
                     # if (isinstance(chosen_tile, CityTile) 
                     #     or isinstance(chosen_tile, DisasterTile)):
@@ -125,67 +137,37 @@ class AdventurerRegular(AdventurerBeginner):
                     if self.current_tile.agent not in self.agents_rested:
                         return True
         
-        # check that instruction is valid: a direction provided or an explicit general check through a None
-        if compass_point is None:
-            print("Adventurer is checking whether any movement at all is possible")
-            if ((self.game.movement_rules == "initial" or self.game.movement_rules == "budgetted")
-                and self.max_downwind_moves <= self.land_moves + self.downwind_moves + self.upwind_moves):
-                return False
-            for compass_point in ["n","e","s","w"]:
-                if self.can_move(compass_point):
-                    return True
+        #otherwise, movement is checked like in Beginner mode
+        return super().can_move(compass_point)
+    
+    def within_move_budget(self, move_type, land_moves, downwind_moves, upwind_moves):
+        '''Expands on AdventurerBeginner, so that carrying no wealth can allow more land and upwind moves
+        '''
+        if self.game.movement_rules == "budgetted" and move_type == "land" and land_moves < self.max_land_moves:
+            #unlike Beginner mode, only the extra land moves while unburdened are stopped by having moved upwind
+            return True
+        if super().within_move_budget(move_type, land_moves, downwind_moves, upwind_moves):
+            return True
+        if self.wealth > 0 or move_type == "downwind":
             return False
-        elif not (compass_point.lower() in ["north","n","east","e","south","s","west","w"]): 
-            raise Exception("invalid direction given for movement")
-        
-        # check whether move is possible over the edge
-#        print("Adventurer is checking whether movement is possible over the " +compass_point
-#              + " edge from their tile at " +str(self.current_tile.tile_position.longitude)+ "," 
-#              + str(self.current_tile.tile_position.latitude))
-        if self.game.movement_rules == "initial": #this version 1 of movement allows land and upwind movement only initially after resting
-            moves_since_rest = self.land_moves + self.downwind_moves + self.upwind_moves
-#            print("Adventurer has determined that they have moved " +str(moves_since_rest)+ " times since resting")
-            if not self.current_tile.compass_edge_water(compass_point): #land movement needed
-                if(moves_since_rest < self.max_land_moves 
-                   or (self.wealth == 0 and moves_since_rest < self.max_land_moves_unburdened)):
-                    return True
-                else: return False
-            elif (self.current_tile.compass_edge_water(compass_point) 
-                  and self.current_tile.compass_edge_downwind(compass_point)): #downwind movement possible
-                if (moves_since_rest < self.max_downwind_moves):
-                    return True
-                else: return False
-            else: #if not land or downwind, then movement must be upwind
-                if(moves_since_rest < self.max_upwind_moves
-                   or (self.wealth == 0 and moves_since_rest < self.max_upwind_moves_unburdened)):
-                    return True
-                elif self.downwind_moves < self.max_downwind_moves:
-#                     return None
-                        return False
-                else: return False
-        elif self.game.movement_rules == "budgetted": #this version 2 of movement allows land and upwind movement any time, but a limited number before resting
-            print("Adventurer has moved " +str(self.upwind_moves)+ " times upwind, " +str(self.land_moves)+ " times overland, and " +str(self.downwind_moves)+ " times downwind, since resting")
-            if not self.current_tile.compass_edge_water(compass_point): #land movement needed
-                if(self.land_moves < self.max_land_moves
-                   or (self.wealth == 0 and self.land_moves < self.max_land_moves_unburdened)
-                   and self.upwind_moves == 0):
-                    return True
-                else: return False
-            elif (self.current_tile.compass_edge_water(compass_point) 
-                  and self.current_tile.compass_edge_downwind(compass_point)): #downwind movement possible
-                if (self.downwind_moves + self.land_moves + self.upwind_moves < self.max_downwind_moves):
-                    return True
-                else: return False
-            else: #if not land or downwind, then movement must be upwind
-                if ((self.upwind_moves < self.max_upwind_moves 
-                   or (self.wealth == 0 and self.upwind_moves < self.max_upwind_moves_unburdened))
-                   and self.land_moves == 0):
-                    return True
-                elif self.downwind_moves < self.max_downwind_moves:
-#                     return None
-                    return False
-                else: return False
-        else: raise Exception("Invalid movement rules specified")
+        if self.game.movement_rules == "initial":
+            moves_since_rest = land_moves + downwind_moves + upwind_moves
+            if move_type == "land":
+                return moves_since_rest < self.max_land_moves_unburdened
+            else:
+                return moves_since_rest < self.max_upwind_moves_unburdened
+        else:
+            if move_type == "land":
+                return land_moves < self.max_land_moves_unburdened and upwind_moves == 0
+            else:
+                return upwind_moves < self.max_upwind_moves_unburdened and land_moves == 0
+    
+    def move_budgets(self):
+        '''Expands on AdventurerBeginner with the extra moves allowed while carrying no wealth
+        '''
+        if self.wealth == 0:
+            return super().move_budgets() + (self.max_land_moves_unburdened, self.max_upwind_moves_unburdened)
+        return super().move_budgets()
     
 #    def move(self, compass_point):
 #        '''Extends Beginnner movement to rotate Chest tiles after movement (for more comfortable visualisation)
@@ -199,9 +181,7 @@ class AdventurerRegular(AdventurerBeginner):
         '''Rotates all chest tiles to match the current tile's wind direction, for visualisation only.
         '''
         for chest_tile in self.chest_tiles:
-            while not (chest_tile.wind_direction.north == self.current_tile.wind_direction.north and 
-                       chest_tile.wind_direction.east == self.current_tile.wind_direction.east):
-                chest_tile.rotate_tile_clock()
+            chest_tile.orientation = self.current_tile.orientation
     
     def explore(self, tile_pile, discard_pile, longitude, latitude, compass_point_moving):
         '''Extends exploration to allow tiles to be used from the Adventurer's Chest
@@ -250,7 +230,7 @@ class AdventurerRegular(AdventurerBeginner):
         '''Identifies the pile associated with a particular tile and returns it there
         '''
         relevant_pile = self.game.tile_piles[tile.tile_back]
-        relevant_pile.tiles.insert(0, tile)
+        relevant_pile.add_tile(tile)
         
     def discover(self, tile):
         #check whether this is a discovered city and don't offer the usual
@@ -300,6 +280,25 @@ class AdventurerRegular(AdventurerBeginner):
                     if self.player.check_restore_agent(self, agent):
                         self.restore_agent(agent)
     
+    def get_token_actions(self):
+        '''Expands on AdventurerBeginner with the attacks that interact_tokens would offer
+        '''
+        actions = []
+        for adventurer in self.current_tile.adventurers:
+            if (adventurer.player != self.player 
+                and ((adventurer.wealth > 0 and not adventurer.pirate_token)
+                     or (adventurer.pirate_token #cannot arrest pirates on Disaster Tiles
+                         and not isinstance(self.current_tile, DisasterTile)))):
+                actions.append(("attack", None, adventurer))
+        agent = self.current_tile.agent
+        if agent is not None and not agent.is_dispossessed:
+            if (agent.player != self.player 
+                and agent.wealth + self.value_dispossess_agent > 0):
+                actions.append(("attack", None, agent))
+            if self.can_rest(agent):
+                actions.append(("rest", None, agent))
+        return actions
+    
     def trade(self, tile):
         '''Expands on the AdventurerBeginner, by preventing pirates from trading
         
@@ -328,7 +327,7 @@ class AdventurerRegular(AdventurerBeginner):
         
         success = False
         # have opponent roll for defence, roll for attack, compare rolls
-        if random.random() < self.attack_success_prob:
+        if self.game.rng.random() < self.attack_success_prob:
             success = True
         
         # resolve conflict
@@ -343,7 +342,7 @@ class AdventurerRegular(AdventurerBeginner):
             else: # rob them
                 self.pirate_token = True #just trying will make them a pirate
                 if success:
-                    print(self.player.name+" successfully attacked "+token.player.name+"'s Adventurer.")
+                    logger.info("%s successfully attacked %s's Adventurer.", self.player.name, token.player.name)
                     default_steal = adventurer.wealth//2 + adventurer.wealth%2
                     chosen_steal = None
                     while not chosen_steal in range(0, adventurer.wealth + 1):
@@ -363,11 +362,12 @@ class AdventurerRegular(AdventurerBeginner):
             if not token.is_dispossessed:
                 self.pirate_token = True #just trying will make them a pirate
                 if success:
-                    print(self.player.name+" successfully attacked "+token.player.name+"'s Agent.")
+                    logger.info("%s successfully attacked %s's Agent.", self.player.name, token.player.name)
                     agent = token
                     self.wealth += agent.wealth + self.value_dispossess_agent
                     agent.is_dispossessed = True
                     agent.wealth = 0;
+                    self.game.update_agent_network(agent.player)
         else: raise Exception("Not able to deal with this kind of token.")
         
         #Keep track of attacks for static visualisation
@@ -380,7 +380,7 @@ class AdventurerRegular(AdventurerBeginner):
     def arrest(self, pirate):
         '''Sends pirates back to their last city and claims a reward.
         '''
-        print(self.player.name+" successfully arrested "+pirate.player.name+"'s Adventurer.")
+        logger.info("%s successfully arrested %s's Adventurer.", self.player.name, pirate.player.name)
         self.wealth += self.value_arrest # get a reward
         pirate.end_expedition()
     
@@ -414,26 +414,25 @@ class AdventurerRegular(AdventurerBeginner):
         
         if agent.is_dispossessed:
             if self.cost_agent_restore <= self.wealth:
-                print("Paying " +str(self.cost_agent_restore)+ " to restore " 
-                      +agent.player.name+"'s Agent at position " 
-                      +str(agent.current_tile.tile_position.longitude)
-                     +","+ str(agent.current_tile.tile_position.latitude))
+                logger.info("Paying %s to restore %s's Agent at position %s,%s", self.cost_agent_restore, agent.player.name, agent.current_tile.tile_position.longitude, agent.current_tile.tile_position.latitude)
                 self.wealth -= self.cost_agent_restore
                 agent.is_dispossessed = False
+                self.game.update_agent_network(agent.player)
                 #Make sure that the Adventurer can't use this Agent this turn
-                self.agents_rested.append(agent)
+                self.agents_rested.add(agent)
                 return True
             else:
-                print("Cannot afford to restore an agent")
+                logger.debug("Cannot afford to restore an agent")
                 return False
         else:
-            print("Didn't need to restore this Agent")
+            logger.debug("Didn't need to restore this Agent")
             return False
 
         
 class CityTileRegular(CityTileBeginner):
     '''Extends the CityTileBeginner class to redeem Adventurers from piracy and to replenish Chest Tiles, and offer purchase of refreshed chest tiles
     '''
+    __slots__ = ()
     
     # def move_onto_tile(self, adventurer):
     #     '''Extends CityTileBeginer to replenish chest tiles whenever an Adventurer returns to a city.
@@ -467,7 +466,7 @@ class CityTileRegular(CityTileBeginner):
         # Offer the chance to pay and completely swap out chest tiles
         while (adventurer.game.player_wealths[adventurer.player] >= self.game.cost_refresh_maps
                and adventurer.player.check_buy_maps(adventurer)):
-            adventurer.game.player_wealths[adventurer.player] -= self.game.cost_refresh_maps
+            adventurer.game.change_vault_wealth(adventurer.player, -self.game.cost_refresh_maps)
             adventurer.rechoose_chest_tiles()
 
     def offer_purchases(self, adventurer):
@@ -482,6 +481,8 @@ class CityTileRegular(CityTileBeginner):
 
 class AgentRegular(AgentBeginner):
     '''Extends the AgentBeginner class to keep track of information relevant in the Regular mode of Cartolan'''
+    __slots__ = ()
+
     def __init__(self, game, player, tile):
         super().__init__(game, player, tile)
         # Need to keep track of whether this Agent has been dispossessed
@@ -510,6 +511,8 @@ class AgentRegular(AgentBeginner):
 
 class DisasterTile(Tile):
     '''***DEPRECATED*** Represents a Disaster Tile in the game Cartolan, which removes Adventurers' wealth and send them back to a city '''
+    __slots__ = ()
+
     def move_onto_tile(self, token):
         '''Takes the wealth of non-Pirate Adventurers as they land on the tile, but allows pirates to move as if from land
 
@@ -527,16 +530,16 @@ class DisasterTile(Tile):
                     token.pirate_token = True
                 # check if the Adventurer has a Pirate token
                 if token.pirate_token:
-                    print("Pirate moves onto disaster tile")
+                    logger.debug("Pirate moves onto disaster tile")
                     super().move_onto_tile(token)
 #                    if token.player.check_court_disaster(token, self): # get player input on whether to attack the disaster
 #                        self.attack_adventurer(token)
                 else: # otherwise send the Adventurer to the capital and keep their wealth and end their turn
-                    print("Adventurer moved onto disaster tile. Dropping wealth and returning to last city visited.")
+                    logger.debug("Adventurer moved onto disaster tile. Dropping wealth and returning to last city visited.")
                     self.dropped_wealth += token.wealth
                     token.end_expedition()
             elif isinstance(token, Agent):
-                print("Tried to add Agent to a disaster tile")
+                logger.debug("Tried to add Agent to a disaster tile")
                 return False
         else: raise Exception("Tried to move something other than a token onto a tile")
 
@@ -562,12 +565,16 @@ class DisasterTile(Tile):
             return super().compare(tile)
 
 class CapitalTileRegular(CityTileRegular):
+    __slots__ = ()
+
     def __init__(self, game, tile_back = "water"
                  , wind_direction = WindDirection(True,True)
                  , tile_edges = TileEdges(True,True,True,True)):
         super().__init__(game, wind_direction, tile_edges, True, True)
 
 class MythicalTileRegular(CityTileRegular):
+    __slots__ = ()
+
     def __init__(self, game, tile_back = "land"
                  , wind_direction = WindDirection(True,True)
                  , tile_edges = TileEdges(False,False,False,False)):
@@ -0,0 +1,9 @@
+'''
+Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
+'''
+
+import os
+import sys
+
+#The game's modules sit in the root folder, rather than being installed as a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
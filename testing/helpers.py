@@ -0,0 +1,119 @@
+'''
+Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
+'''
+
+import random
+from base import Tile, Token, Player, TilePile, Card, WindDirection, TileEdges
+from utils import attribute_names
+from game import GameBeginner, GameRegular, GameAdvanced
+import players_heuristical
+
+def setup_game(game_mode="Regular", num_players=2, mythical_city=False, seed=0, players=None
+               , movement_rules="initial", exploration_rules="clockwise"):
+    '''Sets up a game ready to start, laid out as for simulations but without needing their stats and visuals packages
+    
+    Arguments:
+    String giving the game mode, "Beginner", "Regular" or "Advanced"
+    int number of heuristic players, if no players are given
+    Bool whether to put a mythical city in the land pile
+    int seed for the game's random number generator
+    List of Cartolan.Player to play instead of heuristic ones
+    '''
+    game_type = {"Beginner":GameBeginner, "Regular":GameRegular, "Advanced":GameAdvanced}[game_mode]
+    if players is None:
+        player_types = heuristic_players(game_mode, [player_type for player_type in ["Explorer", "Trader", "Router", "Pirate"] 
+                                                     if hasattr(players_heuristical, "Player"+game_mode+player_type)])
+        colours = ["blue", "red", "yellow", "orange"]
+        players = [player_types[player_num % len(player_types)](colours[player_num]) for player_num in range(num_players)]
+    game = game_type(players, movement_rules, exploration_rules, seed)
+    game.CITY_TYPE(game, WindDirection(True,True), TileEdges(True,True,True,True), True, True).place_tile(0,0)
+    for longitude, latitude in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+        Tile(game, "water", WindDirection(True,True), TileEdges(True,True,True,True), False).place_tile(longitude, latitude)
+    for player in players:
+        game.ADVENTURER_TYPE(game, player, game.cities[0])
+    game.setup_tile_pile("water")
+    if game_mode in ["Regular", "Advanced"]:
+        game.setup_tile_pile("land")
+        if mythical_city:
+            game.tile_piles["land"].tiles.append(game.CITY_TYPE(game, WindDirection(True,True), TileEdges(False,False,False,False), False, True))
+    return game
+
+def heuristic_players(game_mode, types):
+    '''Lists the heuristic Player classes of each type for a game mode
+    
+    Arguments:
+    String giving the game mode, "Beginner", "Regular" or "Advanced"
+    List of Strings giving the types of player, like "Explorer" or "Trader"
+    '''
+    return [getattr(players_heuristical, "Player"+game_mode+player_type) for player_type in types]
+
+def checking_player(player_type, check, hook="continue_move"):
+    '''Makes a player that runs a check each time it is asked to play, before carrying on as it would have
+    
+    The check is given the Adventurer and a function that plays on as the player would have, 
+    and returns the number of checks made, which are totalled in the player's checks.
+    
+    Arguments:
+    Cartolan.Player class to play as
+    function to check the game with
+    String naming the method that the check runs in, like "continue_move" or "continue_turn"
+    '''
+    class CheckingPlayer(player_type):
+        pass
+    def checked_hook(self, adventurer):
+        play_on = lambda: getattr(player_type, hook)(self, adventurer)
+        self.checks += check(adventurer, play_on)
+        return play_on()
+    setattr(CheckingPlayer, hook, checked_hook)
+    player = CheckingPlayer(player_type.__name__)
+    player.checks = 0
+    return player
+
+def play_rounds(game, num_rounds):
+    '''Plays the game on for a number of rounds, or until it ends, returning whether it ended'''
+    game.game_started = True
+    while not game.game_over and num_rounds > 0:
+        game.turn += 1
+        game.game_over = game.play_round()
+        num_rounds -= 1
+    return game.game_over
+
+def summarise(value, depth=3):
+    '''Reduces a part of the game state to comparable values, identifying game objects by id'''
+    if isinstance(value, Tile):
+        return ("tile", value.tile_id)
+    elif isinstance(value, (Token, Card, TilePile)):
+        return (type(value).__name__, id(value))
+    elif isinstance(value, Player):
+        return ("player", value.player_id)
+    elif isinstance(value, random.Random):
+        return value.getstate()
+    elif depth == 0:
+        return type(value).__name__
+    elif isinstance(value, (list, tuple)):
+        return [summarise(element, depth - 1) for element in value]
+    elif isinstance(value, dict):
+        return sorted((repr(summarise(key, 1)), summarise(value[key], depth - 1)) for key in value)
+    elif isinstance(value, set):
+        return sorted(repr(summarise(element, depth - 1)) for element in value)
+    elif value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return type(value).__name__
+
+def fingerprint(game):
+    '''Summarises everything about a game that undoing should put back'''
+    state = {}
+    for attribute_name, value in game.__dict__.items():
+        if not attribute_name in ["undo_log", "play_area"]:
+            state[attribute_name] = summarise(value)
+    state["play_area"] = sorted((tile.tile_position.longitude, tile.tile_position.latitude, tile.tile_id, tile.orientation
+                                 , tile.dropped_wealth, summarise(tile.adventurers), summarise(tile.agent))
+                                for tile in game.play_area.all_tiles())
+    for player in game.players:
+        for token in game.adventurers[player] + game.agents[player]:
+            state[id(token)] = {attribute_name:summarise(getattr(token, attribute_name)) 
+                                for attribute_name in attribute_names(token) if attribute_name != "game"}
+    for tile_piles in [game.tile_piles, game.discard_piles]:
+        for tile_back in tile_piles:
+            state[tile_back+str(id(tile_piles))] = [tile.tile_id for tile in tile_piles[tile_back].tiles]
+    return state
@@ -0,0 +1,63 @@
+'''
+Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
+'''
+
+from base import Tile, WindDirection, TileEdges
+import players_heuristical
+from helpers import setup_game, play_rounds, heuristic_players
+
+def place_agents(game, player, positions):
+    '''Lays water tiles at each position and places one of the player's Agents on each'''
+    agents = []
+    for longitude, latitude in positions:
+        tile = game.play_area.get_tile(longitude, latitude)
+        if tile is None:
+            tile = Tile(game, "water", WindDirection(True,True), TileEdges(True,True,True,True), False)
+            tile.place_tile(longitude, latitude)
+        agents.append(game.AGENT_TYPE(game, player, tile))
+    return agents
+
+def test_estimated_network_follows_distances_as_the_crow_flies():
+    game = setup_game("Regular")
+    player = game.players[0]
+    near, also_near, far = place_agents(game, player, [(1, 0), (0, 1), (0, 9)])
+    distances = game.estimated_agent_distances[player]
+    assert distances[(near, also_near)] == 2
+    assert distances[(near, far)] == 10
+    network = game.estimated_agent_network[player]
+    assert also_near in network[near]
+    assert not far in network[near]
+    assert game.estimated_route_values[player] == 2
+    assert game.estimated_most_lucrative_route_player is player
+
+def test_router_tracks_inns_by_identity():
+    game = setup_game("Regular", players=[players_heuristical.PlayerRegularRouter("blue"), players_heuristical.PlayerRegularTrader("red")])
+    router = game.players[0]
+    adventurer = game.adventurers[router][0]
+    first, second, third = place_agents(game, router, [(1, 0), (0, 2), (0, 4)])
+    assert router.get_next_inn(adventurer) is None #no Inns are sought until the Adventurer has been to a city
+    router.visited_inns[adventurer] = set() #as when the Adventurer is at a city
+    assert router.get_next_inn(adventurer) is game.agent_routes[router][0]
+    route = game.agent_routes[router]
+    router.check_rest(adventurer, route[0])
+    assert router.get_next_inn(adventurer) is route[1]
+    #resting at an Inn other than the next one doesn't count it as visited
+    router.check_rest(adventurer, route[2])
+    assert router.get_next_inn(adventurer) is route[1]
+    #reordering the route mustn't send the Adventurer back to an Inn it has visited, or past one it hasn't
+    game.agent_routes[router] = tuple(reversed(route))
+    assert router.get_next_inn(adventurer) is route[2]
+    router.check_rest(adventurer, route[2])
+    assert router.get_next_inn(adventurer) is route[1]
+    router.check_rest(adventurer, route[1])
+    assert router.get_next_inn(adventurer) is None
+
+def test_routers_and_traders_play_on():
+    for game_mode in ["Beginner", "Regular", "Advanced"]:
+        players = [player_type(colour) for player_type, colour 
+                   in zip(heuristic_players(game_mode, ["Router", "Trader"]), ["blue", "red"])]
+        game = setup_game(game_mode, players=players, seed=3)
+        play_rounds(game, 20)
+        for player in players:
+            assert set(game.agent_routes[player]) == {agent for agent in game.agents[player]
+                                                      if agent.current_tile is not None and not agent.is_dispossessed}
@@ -0,0 +1,51 @@
+'''
+Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
+'''
+
+import itertools
+from base import Tile, WindDirection, TileEdges, WIND_DIRECTIONS
+from helpers import setup_game
+
+def reference_fit(potential_tile, current_tile, compass_point_moving, adjoining_edges_water, exploration_rules):
+    '''Tries rotations one at a time, as exploration did before the fit table, returning whether the tile fits'''
+    def null():
+        pass
+    if exploration_rules == "clockwise":
+        rotations = [null, potential_tile.rotate_tile_anti, potential_tile.rotate_tile_clock]
+    elif current_tile.orientation % 2 == 0:
+        if compass_point_moving in ["n", "s"]:
+            rotations = [null, potential_tile.rotate_tile_anti]
+        else:
+            rotations = [null, potential_tile.rotate_tile_clock]
+    else:
+        if compass_point_moving in ["n", "s"]:
+            rotations = [null, potential_tile.rotate_tile_clock]
+        else:
+            rotations = [null, potential_tile.rotate_tile_anti]
+    while rotations:
+        if all(adjoining_edges_water[compass_point] is None 
+               or adjoining_edges_water[compass_point] == potential_tile.compass_edge_water(compass_point)
+               for compass_point in ["n", "e", "s", "w"]):
+            return True
+        potential_tile.orientation = current_tile.orientation
+        rotations.pop()()
+    return False
+
+def test_fit_table_matches_trying_each_rotation():
+    for exploration_rules in ["clockwise", "continuous"]:
+        game = setup_game(exploration_rules=exploration_rules)
+        adventurer = game.adventurers[game.players[0]][0]
+        for edges in itertools.product([False, True], repeat=4):
+            potential_tile = Tile(game, "land", WindDirection(True, True), TileEdges(*edges), False)
+            reference_tile = Tile(game, "land", WindDirection(True, True), TileEdges(*edges), False)
+            for north, east in WIND_DIRECTIONS:
+                adventurer.current_tile = Tile(game, "water", WindDirection(north, east), TileEdges(True, True, True, True), False)
+                for adjoining in itertools.product([None, False, True], repeat=4):
+                    adjoining_edges_water = dict(zip(["n", "e", "s", "w"], adjoining))
+                    for compass_point_moving in ["n", "e", "s", "w"]:
+                        potential_tile.orientation = adventurer.current_tile.orientation
+                        reference_tile.orientation = adventurer.current_tile.orientation
+                        fits = adventurer.rotated_tile_fits(potential_tile, compass_point_moving, adjoining_edges_water)
+                        assert fits == reference_fit(reference_tile, adventurer.current_tile, compass_point_moving
+                                                     , adjoining_edges_water, exploration_rules)
+                        assert potential_tile.orientation == reference_tile.orientation
@@ -0,0 +1,53 @@
+'''
+Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
+'''
+
+import pickle
+from helpers import setup_game, play_rounds, fingerprint
+
+def stand_ins(game):
+    '''Makes fresh players of the same types to act in a fork, matching the ids of those they replace'''
+    players = {}
+    for player in game.players:
+        stand_in = type(player)(player.name)
+        stand_in.player_id = player.player_id
+        players[player] = stand_in
+    return players
+
+def outcome(game):
+    '''Summarises how a game turned out, in terms that don't depend on which objects were used'''
+    return (game.turn, game.win_type, [game.player_wealths[player] for player in game.players]
+            , sorted((tile.tile_position.longitude, tile.tile_position.latitude, tile.tile_id, tile.orientation) 
+                     for tile in game.play_area.all_tiles()))
+
+def test_playing_a_fork_leaves_the_game_untouched():
+    for game_mode in ["Beginner", "Regular", "Advanced"]:
+        game = setup_game(game_mode, num_players=3, seed=21)
+        play_rounds(game, 4)
+        before = fingerprint(game)
+        fork = game.fork(stand_ins(game))
+        play_rounds(fork, 10)
+        assert fork.turn > game.turn
+        assert fingerprint(game) == before
+        #and the game can carry on from where it was
+        play_rounds(game, 2)
+
+def test_a_fork_plays_out_like_the_game():
+    for game_mode in ["Beginner", "Regular", "Advanced"]:
+        game = setup_game(game_mode, num_players=3, seed=8)
+        fork = game.fork(stand_ins(game))
+        game.start_game()
+        fork.start_game()
+        assert outcome(fork) == outcome(game)
+
+def test_a_fork_can_be_sent_to_other_processes():
+    for game_mode in ["Regular", "Advanced"]:
+        game = setup_game(game_mode, num_players=3, seed=0)
+        #sets of Wonders visited hold tiles, which need their ids before the rest of them is unpickled
+        while not any(adventurer.wonders_visited for player in game.players for adventurer in game.adventurers[player]):
+            assert not play_rounds(game, 1)
+        fork = game.fork(stand_ins(game))
+        sent = pickle.loads(pickle.dumps(fork))
+        assert outcome(sent) == outcome(fork)
+        play_rounds(sent, 10)
+        assert sent.turn > fork.turn
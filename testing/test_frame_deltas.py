@@ -0,0 +1,119 @@
+'''
+Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
+'''
+
+import random
+import pytest
+
+pygame = pytest.importorskip("pygame")
+from live_visuals import WebServerVisualisation
+from helpers import setup_game, play_rounds
+
+def frame_comparer(last_frame, frame_size):
+    '''Sets up a web visual with only what it needs to compare frames, without a window or a client'''
+    visual = WebServerVisualisation.__new__(WebServerVisualisation)
+    visual.last_frame, visual.last_frame_size = last_frame, frame_size
+    return visual
+
+def changed_blocks(last_frame, frame, frame_size, block_size):
+    '''Lists the top left corners of the blocks with any pixel changed, by checking every pixel'''
+    width, height = frame_size
+    blocks = set()
+    for y in range(height):
+        for x in range(width):
+            pixel = 4 * (y * width + x)
+            if frame[pixel:pixel+4] != last_frame[pixel:pixel+4]:
+                blocks.add((x - x % block_size, y - y % block_size))
+    return blocks
+
+def blocks_covered(rects, block_size):
+    '''Lists the top left corners of the blocks in each rect, checking that no block is in more than one'''
+    blocks = set()
+    for left, top, width, height in rects:
+        assert left % block_size == 0 and top % block_size == 0
+        for x in range(left, left + width, block_size):
+            for y in range(top, top + height, block_size):
+                assert not (x, y) in blocks
+                blocks.add((x, y))
+    return blocks
+
+def test_changed_rects_cover_exactly_the_changed_blocks():
+    rng = random.Random(24)
+    block_size = WebServerVisualisation.FRAME_BLOCK_SIZE
+    #sizes that aren't a whole number of blocks check the partial blocks along the edges
+    for frame_size in [(4 * block_size, 3 * block_size), (3 * block_size + 5, 2 * block_size + 7)]:
+        width, height = frame_size
+        last_frame = bytes(rng.randrange(256) for byte_num in range(4 * width * height))
+        for num_changes in [0, 1, 3, 10, 40]:
+            frame = bytearray(last_frame)
+            for change_num in range(num_changes):
+                #change small patches, some of which straddle blocks
+                x, y = rng.randrange(width), rng.randrange(height)
+                for patch_y in range(y, min(y + rng.randrange(1, 4), height)):
+                    for patch_x in range(x, min(x + rng.randrange(1, 4), width)):
+                        pixel = 4 * (patch_y * width + patch_x)
+                        frame[pixel + rng.randrange(4)] ^= 0xff
+            frame = bytes(frame)
+            rects = frame_comparer(last_frame, frame_size).find_changed_rects(frame)
+            for left, top, rect_width, rect_height in rects:
+                assert left + rect_width <= width and top + rect_height <= height
+            assert blocks_covered(rects, block_size) == changed_blocks(last_frame, frame, frame_size, block_size)
+
+def test_matching_changes_are_joined():
+    block_size = WebServerVisualisation.FRAME_BLOCK_SIZE
+    frame_size = (4 * block_size, 4 * block_size)
+    width, height = frame_size
+    last_frame = bytes(4 * width * height)
+    frame = bytearray(last_frame)
+    #change a pixel in each block of a square two blocks across, which should be sent as one rect
+    for x, y in [(block_size, block_size), (2 * block_size, block_size), (block_size, 2 * block_size), (2 * block_size, 2 * block_size)]:
+        frame[4 * (y * width + x)] = 1
+    rects = frame_comparer(last_frame, frame_size).find_changed_rects(bytes(frame))
+    assert [list(rect) for rect in rects] == [[block_size, block_size, 2 * block_size, 2 * block_size]]
+
+class RecordingClient:
+    '''Stands in for a client's socket, keeping the kinds of message sent to it'''
+    address = ("test", 0)
+    
+    def __init__(self):
+        self.message_types = []
+    
+    def sendMessage(self, message):
+        self.message_types.append(message.split("[00100]")[0])
+
+def test_keyframes_are_sent_when_asked_for():
+    visual = frame_comparer(None, None)
+    visual.window = pygame.Surface((64, 64), pygame.SRCALPHA, 32)
+    visual.protocol, visual.frame_format = "image", "png"
+    visual.keyframe_requested = False
+    visual.atlas_sent = set()
+    visual.client = RecordingClient()
+    visual.update_web_display()
+    visual.update_web_display() #nothing has changed, so nothing is sent
+    visual.window.set_at((3, 3), (255, 0, 0, 255))
+    visual.update_web_display()
+    visual.request_keyframe()
+    visual.update_web_display()
+    assert visual.client.message_types == ["IMAGE", "DELTA", "IMAGE"]
+
+def test_state_shows_the_cards_and_piles_that_can_be_clicked():
+    game = setup_game("Advanced", seed=3)
+    play_rounds(game, 3)
+    client = RecordingClient()
+    visual = WebServerVisualisation(game, [], {player:player.name for player in game.players}, client, 1200, 800, protocol="state")
+    visual.current_adventurer = visual.viewed_adventurer = game.adventurers[game.players[0]][0]
+    visual.current_adventurer_number = visual.viewed_adventurer_number = 0
+    visual.refresh_visual()
+    state = visual.get_game_state()
+    #the stack of cards fills the rect that clicks select them from
+    stack_top, stack_height = visual.stack_rect[1], visual.stack_rect[3]
+    stacked_cards = [card for card in state["cards"] if card[1] >= stack_top]
+    assert stacked_cards and stacked_cards[0][1] == stack_top
+    assert stacked_cards[-1][1] + stacked_cards[-1][3] == pytest.approx(stack_top + stack_height)
+    assert [pile[4] for pile in state["menus"]["piles"]] == [str(len(game.tile_piles[tile_back].tiles)) + " / " + str(game.NUM_TILES[tile_back])
+                                                         for tile_back in game.tile_piles]
+    assert {title[2] for title in state["titles"]} >= {"Maps to draw:", "Failed map draws:"}
+    #the art for the piles is sent along with them
+    visual.send_game_state()
+    assert client.message_types == ["STATE"]
+    assert {pile[3] for pile in state["menus"]["piles"]} <= visual.atlas_sent
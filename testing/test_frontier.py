@@ -0,0 +1,55 @@
+'''
+Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
+'''
+
+from base import Tile, WindDirection, TileEdges
+from helpers import setup_game, play_rounds, checking_player, heuristic_players
+
+def expected_frontier(play_area):
+    '''Works out the gaps next to the map by looking around every tile laid'''
+    frontier = {}
+    for tile in play_area.all_tiles():
+        for longitude_increment, latitude_increment in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+            gap = (tile.tile_position.longitude + longitude_increment, tile.tile_position.latitude + latitude_increment)
+            if play_area.get_tile(*gap) is None:
+                edges = []
+                for compass_point, (edge_longitude, edge_latitude) in zip(["s", "w", "n", "e"], [(0, 1), (1, 0), (0, -1), (-1, 0)]):
+                    neighbour = play_area.get_tile(gap[0] + edge_longitude, gap[1] + edge_latitude)
+                    edges.append(None if neighbour is None else neighbour.compass_edge_water(compass_point))
+                frontier[gap] = tuple(edges)
+    return frontier
+
+def check_gaps(adventurer, play_on):
+    '''Checks the frontier against the map, and that the gaps an Adventurer can reach are valued at least as the explorations open to it'''
+    play_area = adventurer.game.play_area
+    assert play_area.frontier == expected_frontier(play_area)
+    best_gaps = adventurer.get_best_gaps()
+    values = {gap:exploration_value for exploration_value, moves, gap, step in best_gaps}
+    for exploration_value, moves, gap, step in best_gaps:
+        assert gap in play_area.frontier
+    checks = 0
+    for action_type, compass_point, gap in adventurer.get_legal_actions():
+        if action_type == "explore":
+            adjoining_edges = dict(zip(["n", "e", "s", "w"], play_area.frontier[gap]))
+            assert values[gap] >= adventurer.get_exploration_value(adjoining_edges, compass_point)
+            checks += 1
+    return checks
+
+def test_frontier_follows_the_map():
+    for game_mode in ["Beginner", "Regular", "Advanced"]:
+        players = [checking_player(player_type, check_gaps) 
+                   for player_type in heuristic_players(game_mode, ["Explorer", "Trader"])]
+        game = setup_game(game_mode, players=players, seed=19)
+        play_rounds(game, 12)
+        assert sum(player.checks for player in players) > 5
+
+def test_frontier_is_restored_when_tiles_are_lifted():
+    game = setup_game("Regular", num_players=2, seed=19)
+    play_rounds(game, 4)
+    frontier = dict(game.play_area.frontier)
+    game.save()
+    for longitude in range(30, 33):
+        Tile(game, "water", WindDirection(True, True), TileEdges(True, False, True, False), False).place_tile(longitude, 30)
+    assert game.play_area.frontier == expected_frontier(game.play_area)
+    game.restore()
+    assert game.play_area.frontier == frontier
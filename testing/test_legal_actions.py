@@ -0,0 +1,45 @@
+'''
+Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
+'''
+
+from helpers import setup_game, play_rounds, checking_player, heuristic_players
+
+def reference_movements(adventurer):
+    '''Works out the moves and explorations open to an Adventurer one compass point at a time, as players used to'''
+    movements = []
+    if not adventurer.has_remaining_moves():
+        return movements
+    position = adventurer.current_tile.tile_position
+    for compass_point in ["n", "e", "s", "w"]:
+        if adventurer.can_move(compass_point):
+            longitude = position.longitude + int(compass_point == "e") - int(compass_point == "w")
+            latitude = position.latitude + int(compass_point == "n") - int(compass_point == "s")
+            if adventurer.exploration_needed(longitude, latitude):
+                movements.append(("explore", compass_point, (longitude, latitude)))
+            else:
+                movements.append(("move", compass_point, (longitude, latitude)))
+    return movements
+
+def check_legal_actions(adventurer, play_on):
+    '''Checks the legal actions listed for an Adventurer against checking each direction and the tokens alongside it'''
+    actions = adventurer.get_legal_actions()
+    assert [action for action in actions if action[0] in ["move", "explore"]] == reference_movements(adventurer)
+    assert actions[-1] == ("wait", None, None)
+    assert len(actions) == len(set(actions))
+    for action_type, compass_point, token in actions:
+        if action_type == "rest":
+            assert token.current_tile is adventurer.current_tile
+            assert adventurer.can_rest(token)
+        elif action_type == "attack":
+            assert token.current_tile is adventurer.current_tile
+            assert not token is adventurer
+    return len(actions)
+
+def test_legal_actions_match_checking_each_direction():
+    for game_mode in ["Beginner", "Regular", "Advanced"]:
+        for movement_rules in ["initial", "budgetted"]:
+            players = [checking_player(player_type, check_legal_actions) 
+                       for player_type in heuristic_players(game_mode, ["Explorer", "Trader", "Router"])]
+            game = setup_game(game_mode, players=players, seed=13, movement_rules=movement_rules)
+            play_rounds(game, 20)
+            assert sum(player.checks for player in players) > 20
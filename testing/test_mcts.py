@@ -0,0 +1,50 @@
+'''
+Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
+'''
+
+import os
+import players_mcts
+from players_mcts import PlayerMCTS
+from players_heuristical import PlayerRegularTrader, PlayerAdvancedTrader
+from helpers import setup_game, play_rounds
+
+def test_evaluate_ignores_cities_still_in_the_pile():
+    player = PlayerMCTS("blue", think_time=0.01, num_workers=1)
+    game = setup_game("Regular", players=[player, PlayerRegularTrader("red")], mythical_city=True, seed=7)
+    assert any(city.tile_position.longitude is None for city in game.cities)
+    game.adventurers[player][0].wealth = 5
+    assert 0.5 < player.evaluate(game, player) <= 1
+
+def test_short_games_with_a_mythical_city():
+    for game_mode, opponent_type in [("Regular", PlayerRegularTrader), ("Advanced", PlayerAdvancedTrader)]:
+        players = [PlayerMCTS("blue", think_time=0.01, num_workers=1), opponent_type("red")]
+        game = setup_game(game_mode, players=players, mythical_city=True, seed=7)
+        play_rounds(game, 8)
+        assert game.turn > 1
+
+def test_short_games_with_worker_processes():
+    for game_mode, opponent_type in [("Regular", PlayerRegularTrader), ("Advanced", PlayerAdvancedTrader)]:
+        player = PlayerMCTS("blue", think_time=0.01, num_workers=2)
+        player.worker_timeout = 5
+        game = setup_game(game_mode, players=[player, opponent_type("red")], seed=3)
+        try:
+            play_rounds(game, 6)
+            assert player.pool is not None #the workers returned their results, rather than being given up on
+        finally:
+            player.end_game(game)
+        assert player.pool is None
+
+def die_in_worker(search_args):
+    '''Stands in for the worker's search, ending the process as if it had crashed'''
+    os._exit(1)
+
+def test_moves_are_still_made_when_workers_die(monkeypatch):
+    monkeypatch.setattr(players_mcts, "search_in_worker", die_in_worker)
+    player = PlayerMCTS("blue", think_time=0.01, num_workers=2)
+    player.worker_timeout = 0.5
+    game = setup_game("Regular", players=[player, PlayerRegularTrader("red")], seed=3)
+    try:
+        play_rounds(game, 2)
+    finally:
+        player.end_game(game)
+    assert game.turn == 2
@@ -0,0 +1,140 @@
+'''
+Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
+'''
+
+import heapq
+import itertools
+from base import Tile, CityTile, WindDirection, TileEdges
+from helpers import setup_game, play_rounds
+
+INCREMENTS = {"n":(0, 1), "e":(1, 0), "s":(0, -1), "w":(-1, 0)}
+
+def move_type(tile, compass_point):
+    if not tile.compass_edge_water(compass_point):
+        return "land"
+    elif tile.compass_edge_downwind(compass_point):
+        return "downwind"
+    return "upwind"
+
+def next_state(adventurer, state, compass_point, target):
+    '''Gives the cost and position after a move that the rules allow, or None if they don't allow it'''
+    longitude, latitude, land_moves, downwind_moves, upwind_moves = state
+    play_area = adventurer.game.play_area
+    next_longitude, next_latitude = longitude + INCREMENTS[compass_point][0], latitude + INCREMENTS[compass_point][1]
+    next_tile = play_area.get_tile(next_longitude, next_latitude)
+    if next_tile is None or land_moves + downwind_moves + upwind_moves >= adventurer.max_downwind_moves:
+        return None
+    kind = move_type(play_area.get_tile(longitude, latitude), compass_point)
+    if not adventurer.within_move_budget(kind, land_moves, downwind_moves, upwind_moves):
+        return None
+    if isinstance(next_tile, CityTile) and (next_longitude, next_latitude) != target:
+        return 1, (next_longitude, next_latitude, 0, 0, 0)
+    counts = [land_moves + (kind == "land"), downwind_moves + (kind == "downwind"), upwind_moves + (kind == "upwind")]
+    return 0, (next_longitude, next_latitude, *counts)
+
+def quickest_route(adventurer, start, target):
+    '''Finds the fewest turns and then moves to reach a target, by uniform cost search without any estimate'''
+    costs = {start:(0, 0)}
+    queue = [(0, 0, start)]
+    while queue:
+        turns, moves, state = heapq.heappop(queue)
+        if (turns, moves) > costs[state]:
+            continue
+        if state[:2] == target:
+            return turns, moves
+        options = []
+        if sum(state[2:]) > 0:
+            options.append(((turns + 1, moves), state[:2] + (0, 0, 0)))
+        for compass_point in INCREMENTS:
+            result = next_state(adventurer, state, compass_point, target)
+            if result is not None:
+                options.append(((turns + result[0], moves + 1), result[1]))
+        for cost, option in options:
+            if option not in costs or cost < costs[option]:
+                costs[option] = cost
+                heapq.heappush(queue, (cost[0], cost[1], option))
+    return None
+
+def follow_route(adventurer, target):
+    '''Follows route_towards step by step from the Adventurer's position, giving the turns and moves taken'''
+    position = adventurer.current_tile.tile_position
+    state = (position.longitude, position.latitude, adventurer.land_moves, adventurer.downwind_moves, adventurer.upwind_moves)
+    turns, moves = 0, 0
+    while state[:2] != target:
+        step = adventurer.route_towards(*target)
+        assert step is not None
+        if step == "wait":
+            turns += 1
+            state = state[:2] + (0, 0, 0)
+        else:
+            result = next_state(adventurer, state, step, target)
+            assert result is not None, "route stepped "+step+" where the rules don't allow it"
+            turns += result[0]
+            moves += 1
+            state = result[1]
+        adventurer.current_tile = adventurer.game.play_area.get_tile(*state[:2])
+        adventurer.land_moves, adventurer.downwind_moves, adventurer.upwind_moves = state[2:]
+    return turns, moves
+
+def test_routes_are_the_quickest_allowed():
+    for game_mode, movement_rules in itertools.product(["Beginner", "Regular"], ["initial", "budgetted"]):
+        game = setup_game(game_mode, num_players=3, seed=17, movement_rules=movement_rules)
+        play_rounds(game, 12)
+        adventurer = game.adventurers[game.players[0]][0]
+        capital = game.cities[0]
+        num_routes = 0
+        for tile in list(game.play_area.all_tiles())[::3]:
+            for wealth in [0, 3]:
+                adventurer.wealth = wealth
+                adventurer.current_tile = capital
+                adventurer.land_moves = adventurer.downwind_moves = adventurer.upwind_moves = 0
+                target = (tile.tile_position.longitude, tile.tile_position.latitude)
+                quickest = quickest_route(adventurer, (0, 0, 0, 0, 0), target)
+                if quickest is None:
+                    assert adventurer.route_towards(*target) is None
+                else:
+                    assert follow_route(adventurer, target) == quickest
+                    num_routes += 1
+        assert num_routes > 5
+
+def test_regular_move_budgets_follow_the_rules():
+    for movement_rules in ["initial", "budgetted"]:
+        game = setup_game("Regular", seed=1, movement_rules=movement_rules)
+        adventurer = game.adventurers[game.players[0]][0]
+        for wealth, land_moves, downwind_moves, upwind_moves in itertools.product([0, 2], range(5), range(5), range(5)):
+            adventurer.wealth = wealth
+            unburdened = wealth == 0
+            if movement_rules == "initial":
+                moves_since_rest = land_moves + downwind_moves + upwind_moves
+                expected = {"land":moves_since_rest < adventurer.max_land_moves 
+                            or (unburdened and moves_since_rest < adventurer.max_land_moves_unburdened)
+                            , "downwind":moves_since_rest < adventurer.max_downwind_moves
+                            , "upwind":moves_since_rest < adventurer.max_upwind_moves 
+                            or (unburdened and moves_since_rest < adventurer.max_upwind_moves_unburdened)}
+            else:
+                expected = {"land":land_moves < adventurer.max_land_moves 
+                            or (unburdened and land_moves < adventurer.max_land_moves_unburdened and upwind_moves == 0)
+                            , "downwind":land_moves + downwind_moves + upwind_moves < adventurer.max_downwind_moves
+                            , "upwind":(upwind_moves < adventurer.max_upwind_moves 
+                                        or (unburdened and upwind_moves < adventurer.max_upwind_moves_unburdened)) 
+                            and land_moves == 0}
+            for kind in expected:
+                assert adventurer.within_move_budget(kind, land_moves, downwind_moves, upwind_moves) == expected[kind]
+
+def test_routes_are_kept_per_map_until_it_changes():
+    game = setup_game("Regular", num_players=2, seed=17)
+    play_rounds(game, 6)
+    adventurer = game.adventurers[game.players[0]][0]
+    adventurer.current_tile = game.cities[0]
+    adventurer.land_moves = adventurer.downwind_moves = adventurer.upwind_moves = 0
+    play_area = game.play_area
+    play_area.routes = {}
+    adventurer.route_away_from(0, 0)
+    assert play_area.routes == {}
+    tile = list(play_area.all_tiles())[-1]
+    adventurer.route_towards(tile.tile_position.longitude, tile.tile_position.latitude)
+    assert play_area.routes
+    fork = game.fork()
+    assert fork.play_area.routes == {}
+    Tile(game, "water", WindDirection(True, True), TileEdges(True, True, True, True), False).place_tile(60, 60)
+    assert play_area.routes == {}
@@ -0,0 +1,38 @@
+'''
+Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
+'''
+
+import pickle
+from utils import attribute_names
+from helpers import setup_game, play_rounds
+
+def tiles_and_tokens(game):
+    '''Gathers the tiles in play, their value objects, and the tokens on them'''
+    for tile in game.play_area.all_tiles():
+        yield tile
+        yield tile.tile_position
+        yield tile.tile_edges
+        for adventurer in tile.adventurers:
+            yield adventurer
+        if tile.agent is not None:
+            yield tile.agent
+
+def test_tiles_and_tokens_keep_no_instance_dict():
+    for game_mode in ["Beginner", "Regular", "Advanced"]:
+        game = setup_game(game_mode, num_players=3, seed=3)
+        play_rounds(game, 8)
+        for subject in tiles_and_tokens(game):
+            assert not hasattr(subject, "__dict__"), type(subject).__name__+" has an instance __dict__"
+
+def test_slotted_attributes_are_listed_and_pickled():
+    game = setup_game("Advanced", num_players=2, seed=3)
+    play_rounds(game, 3)
+    adventurer = game.adventurers[game.players[0]][0]
+    names = attribute_names(adventurer)
+    for name in ["game", "player", "current_tile", "wealth", "route", "chest_tiles", "character_card"]:
+        assert name in names
+    copied = pickle.loads(pickle.dumps(adventurer))
+    assert copied.wealth == adventurer.wealth
+    assert copied.current_tile.tile_position.longitude == adventurer.current_tile.tile_position.longitude
+    assert copied.current_tile.tile_position.latitude == adventurer.current_tile.tile_position.latitude
+    assert [tile.tile_id for tile in copied.chest_tiles] == [tile.tile_id for tile in adventurer.chest_tiles]
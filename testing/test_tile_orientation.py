@@ -0,0 +1,49 @@
+'''
+Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
+'''
+
+import itertools
+from base import Tile, WindDirection, TileEdges, WIND_DIRECTIONS
+from helpers import setup_game
+
+#The edge facing each compass point for each wind direction, as the rules describe them
+EDGES_FACING = {(True, True):["downwind_anti", "downwind_clock", "upwind_anti", "upwind_clock"]
+                , (False, True):["upwind_clock", "downwind_anti", "downwind_clock", "upwind_anti"]
+                , (False, False):["upwind_anti", "upwind_clock", "downwind_anti", "downwind_clock"]
+                , (True, False):["downwind_clock", "upwind_anti", "upwind_clock", "downwind_anti"]}
+
+def all_tiles(game):
+    '''Makes a tile for every combination of water edges and wind direction'''
+    for edges in itertools.product([False, True], repeat=4):
+        for north, east in WIND_DIRECTIONS:
+            yield Tile(game, "water", WindDirection(north, east), TileEdges(*edges), False)
+
+def test_edges_match_the_rules_for_every_tile():
+    game = setup_game()
+    for tile in all_tiles(game):
+        wind = (tile.wind_direction.north, tile.wind_direction.east)
+        for compass_index, compass_point in enumerate(["n", "e", "s", "w"]):
+            expected_water = getattr(tile.tile_edges, EDGES_FACING[wind][compass_index]+"_water")
+            assert tile.compass_edge_water(compass_point) == expected_water
+            assert tile.compass_edge_water(compass_point.upper()) == expected_water
+        assert tile.compass_edge_downwind("north") == wind[0]
+        assert tile.compass_edge_downwind("east") == wind[1]
+        assert tile.compass_edge_downwind("south") == (not wind[0])
+        assert tile.compass_edge_downwind("west") == (not wind[1])
+
+def test_rotations_turn_the_wind_a_quarter_at_a_time():
+    game = setup_game()
+    tile = Tile(game, "water", WindDirection(True, True), TileEdges(True, False, False, False), False)
+    clockwise = []
+    for rotation in range(4):
+        tile.rotate_tile_clock()
+        clockwise.append((tile.wind_direction.north, tile.wind_direction.east))
+    assert clockwise == [(False, True), (False, False), (True, False), (True, True)]
+    for wind in reversed(clockwise[:3]):
+        tile.rotate_tile_anti()
+        assert (tile.wind_direction.north, tile.wind_direction.east) == wind
+    #the edges turn with the wind, so what was south is now west after a clockwise turn
+    tile = Tile(game, "water", WindDirection(True, True), TileEdges(True, False, False, False), False)
+    south_water = tile.compass_edge_water("s")
+    tile.rotate_tile_clock()
+    assert tile.compass_edge_water("w") == south_water
@@ -0,0 +1,57 @@
+'''
+Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
+'''
+
+import random
+import pytest
+from base import Tile, TilePile
+from helpers import setup_game
+
+def draw_all(tile_pile, rng):
+    '''Draws every tile from the pile, returning their ids in the order drawn'''
+    tile_ids = []
+    tile = tile_pile.draw_tile(rng)
+    while tile is not None:
+        tile_ids.append(tile.tile_id)
+        tile = tile_pile.draw_tile(rng)
+    return tile_ids
+
+def make_pile(game, num_tiles):
+    return TilePile("water", [Tile(game, "water") for tile_num in range(num_tiles)])
+
+def test_every_tile_is_drawn_once():
+    game = setup_game("Regular")
+    tile_pile = make_pile(game, 30)
+    tile_ids = [tile.tile_id for tile in tile_pile.tiles]
+    drawn_ids = draw_all(tile_pile, random.Random(4))
+    assert sorted(drawn_ids) == sorted(tile_ids)
+    assert tile_pile.tiles == []
+    assert tile_pile.draw_tile(random.Random(4)) is None
+
+def test_seeded_draws_repeat():
+    game = setup_game("Regular")
+    tile_pile = make_pile(game, 30)
+    other_pile = TilePile("water", list(tile_pile.tiles))
+    assert draw_all(tile_pile, random.Random(4)) == draw_all(other_pile, random.Random(4))
+
+def test_seeded_games_draw_the_same_piles():
+    draws = []
+    for attempt in range(2):
+        game = setup_game("Regular", seed=8)
+        draws.append([draw_all(game.tile_piles[tile_back], game.rng) for tile_back in ["water", "land"]])
+    assert draws[0] == draws[1]
+
+def test_draws_are_spread_over_the_pile():
+    game = setup_game("Regular")
+    tiles = [Tile(game, "water") for tile_num in range(4)]
+    rng = random.Random(1)
+    first_draws = {tile.tile_id:0 for tile in tiles}
+    for draw_num in range(4000):
+        first_draws[TilePile("water", list(tiles)).draw_tile(rng).tile_id] += 1
+    for count in first_draws.values():
+        assert count == pytest.approx(1000, rel=0.1)
+
+def test_draws_need_a_generator():
+    game = setup_game("Regular")
+    with pytest.raises(TypeError):
+        make_pile(game, 3).draw_tile()
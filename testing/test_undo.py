@@ -0,0 +1,41 @@
+'''
+Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
+'''
+
+from base import Tile
+from helpers import setup_game, play_rounds, fingerprint, checking_player, heuristic_players
+
+def check_undo(adventurer, play_on):
+    '''Plays the turn and undoes it, checking that the game was put back exactly, so that it can be played again'''
+    game = adventurer.game
+    game.save()
+    before = fingerprint(game)
+    play_on()
+    game.restore()
+    assert fingerprint(game) == before
+    return 1
+
+def test_undo_restores_the_game_exactly():
+    for game_mode in ["Beginner", "Regular", "Advanced"]:
+        players = [checking_player(player_type, check_undo, "continue_turn") 
+                   for player_type in heuristic_players(game_mode, ["Explorer", "Trader", "Router"])]
+        game = setup_game(game_mode, players=players, seed=11)
+        play_rounds(game, 15)
+        assert sum(player.checks for player in players) > 15
+
+def test_undo_lifts_laid_tiles_and_restores_wealth():
+    game = setup_game("Regular", num_players=2, seed=5)
+    play_rounds(game, 3)
+    num_tiles = len(list(game.play_area.all_tiles()))
+    player = game.players[0]
+    adventurer = game.adventurers[player][0]
+    wealth, vault = adventurer.wealth, game.player_wealths[player]
+    game.save()
+    Tile(game, "water").place_tile(50, 50)
+    adventurer.wealth += 7
+    game.player_wealths[player] += 3
+    game.restore()
+    assert game.play_area.get_tile(50, 50) is None
+    assert len(list(game.play_area.all_tiles())) == num_tiles
+    assert adventurer.wealth == wealth
+    assert game.player_wealths[player] == vault
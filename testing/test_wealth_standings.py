@@ -0,0 +1,57 @@
+'''
+Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
+'''
+
+from helpers import setup_game, play_rounds, checking_player, heuristic_players
+
+def check_standings(game):
+    '''Recomputes the wealth standings from every Vault and checks them against those the game kept up to date'''
+    wealths = sorted(game.player_wealths.values(), reverse=True)
+    assert game.total_vault_wealth == sum(wealths)
+    assert game.max_wealth == max(0, wealths[0])
+    if game.max_wealth > 0:
+        assert game.player_wealths[game.winning_player] == game.max_wealth
+        assert game.wealth_difference == wealths[0] - max(0, wealths[1])
+    else:
+        assert game.wealth_difference == 0
+
+def check_turn_standings(adventurer, play_on):
+    '''Checks the standings at the start and end of a turn, and after undoing it so that it can be played again'''
+    game = adventurer.game
+    check_standings(game)
+    game.save()
+    play_on()
+    check_standings(game)
+    game.restore()
+    check_standings(game)
+    return 1
+
+def test_standings_follow_the_vaults():
+    for game_mode in ["Beginner", "Regular", "Advanced"]:
+        players = [checking_player(player_type, check_turn_standings, "continue_turn")
+                   for player_type in heuristic_players(game_mode, ["Explorer", "Trader", "Router"])]
+        game = setup_game(game_mode, players=players, seed=19)
+        play_rounds(game, 40)
+        check_standings(game)
+        assert sum(player.checks for player in players) > 0
+
+def test_standings_follow_vault_changes():
+    game = setup_game("Regular", num_players=3)
+    first, second, third = game.players
+    game.change_vault_wealth(first, 5)
+    game.change_vault_wealth(second, 3)
+    assert (game.winning_player, game.max_wealth, game.wealth_difference, game.total_vault_wealth) == (first, 5, 2, 8)
+    game.change_vault_wealth(third, 9)
+    assert (game.winning_player, game.max_wealth, game.wealth_difference, game.total_vault_wealth) == (third, 9, 4, 17)
+    game.change_vault_wealth(third, -6)
+    assert (game.winning_player, game.max_wealth, game.wealth_difference, game.total_vault_wealth) == (first, 5, 2, 11)
+
+def test_win_by_wealth_difference():
+    game = setup_game("Regular")
+    player = game.players[0]
+    game.change_vault_wealth(player, game.game_winning_difference)
+    assert not game.check_win_conditions()
+    game.change_vault_wealth(player, 1)
+    assert game.check_win_conditions()
+    assert game.win_type == "wealth difference"
+    assert game.winning_player is player
@@ -6,6 +6,19 @@ Supporting funcitons to the game Cartolan
 @author: tom
 """
 
+def attribute_names(subject):
+    '''Lists the instance attributes that have been set on an object, whether it keeps them in __slots__ or a __dict__
+    
+    Arguments:
+    subject takes an object
+    '''
+    names = list(getattr(subject, "__dict__", {}))
+    for cls in type(subject).__mro__:
+        for name in cls.__dict__.get("__slots__", ()):
+            if hasattr(subject, name) and not name in names:
+                names.append(name)
+    return names
+
 def replace_references(old_reference, new_reference, subject, memo, valid_classes):
     '''Recursively crawls the graph of an object's attributes, replacing memory references to one object with those for another
     
@@ -59,13 +72,13 @@ def replace_references(old_reference, new_reference, subject, memo, valid_classe
 #                    else:
 #    #                    print("Exploring a step futher into the object hierarchy, through "+str(new_subject))
 #                        replace_references(old_reference, new_reference, new_subject, memo, valid_classes)
-            for attribute_name in subject.__dict__:
-                new_subject = subject.__dict__[attribute_name]
+            for attribute_name in attribute_names(subject):
+                new_subject = getattr(subject, attribute_name)
                 if not callable(new_subject): #exclude methods, but deal with all other data structures
 #                    print("Directly comparing for replacement the "+str(attribute_name)+" attribute of "+str(subject)+", with value "+str(new_subject))
                     if id(old_reference) == id(new_subject):
 #                        print("Found an instance of "+str(old_reference)+" as "+str(new_subject)+" in "+str(subject)+" and replaced with "+str(new_reference))
-                        subject.__dict__[attribute_name] = new_reference
+                        setattr(subject, attribute_name, new_reference)
                     else:
     #                    print("Exploring a step futher into the object hierarchy, through "+str(new_subject))
                         replace_references(old_reference, new_reference, new_subject, memo, valid_classes)
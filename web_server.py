@@ -4,7 +4,7 @@ Copyright 2020 Tom Wilkinson, delwddrylliwr@gmail.com
 Based on this example from AlexiK: https://stackoverflow.com/questions/32595130/javascript-html5-canvas-display-from-python-websocket-server
 '''
 
-from SimpleWebSocketServer import WebSocket, SimpleWebSocketServer  # , SimpleSSLWebSocketServer
+import websockets
 from main_game import setup_simulation
 # from live_visuals import ClientGameVisualisation, WebServerVisualisation
 from live_visuals import WebServerVisualisation
@@ -19,12 +19,21 @@ from players_heuristical import PlayerAdvancedExplorer, PlayerAdvancedTrader, Pl
 import sys
 # import os
 import time
+import logging
 import random
 import string
 import json
-from threading import Thread
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Empty
 
 DEFAULT_PORT = 10000
+# Connections and game set-up all run as coroutines in one thread, but each game needs a worker thread while it's
+# played, because the rules wait on players' decisions from deep within each move
+MAX_GAME_THREADS = 256
+# The image format and quality for frames sent to clients, where jpeg and webp need Pillow
+FRAME_FORMAT = "png"
+FRAME_QUALITY = 80
 
 DEFAULT_WIDTH = int(0.8 * 1366)
 DEFAULT_HEIGHT = int(0.8 * 768)
@@ -83,13 +92,15 @@ new_game_types = {}  # referenced by game ID
 new_game_colours = {}  # referenced by game ID
 new_game_players = {}  # referenced by game ID, return the colour assigned to them
 new_game_cpu_players = {}  # referenced by game ID, dicts of CPU players and their colours
+# The records above are only changed from the event loop's thread, so games' worker threads hand changes back to it
+game_executor = ThreadPoolExecutor(max_workers=MAX_GAME_THREADS)
 
 
 def id_generator(size=10, chars=string.ascii_uppercase + string.digits):
     return ''.join(random.choice(chars) for _ in range(size))
 
 
-class ClientSocket(WebSocket):
+class ClientSocket:
     '''Shares whole images of clients' play areas and receives input coordinates.
     
     Architecture:
@@ -98,26 +109,84 @@ class ClientSocket(WebSocket):
                                                /\                \/
                                               Player <- Adventurer/Agent
     
+    Messages are received and sent by coroutines on the server's event loop, which also run the set-up of games.
+    Games themselves are played in worker threads, which wait on the input queues and send via the outbox.
     '''
-    INPUT_DELAY = 0.1  # delay time between checking for input, in seconds
     TIMEOUT_DELAY = 5  # delay time between heartbeats, after which loop will stop keeping the socket alive
 
     width = DEFAULT_WIDTH
     height = DEFAULT_HEIGHT
+    protocol = "image"  # whether the client is sent images of play, or the state of play to render itself
     global DIMENSION_INCREMENT
 
-    coords_buffer = None
-    text_buffer = None
+    def __init__(self, websocket, loop):
+        self.websocket = websocket
+        self.loop = loop
+        self.address = websocket.remote_address
+        self.data = None
+        self.connection_confirmed = False
+        self.closed = False  # set once the client disconnects, so that games stop waiting on it
+        self.lobby_task = None
+        # Messages are sent in order by a coroutine, whichever thread queued them
+        self.outbox = asyncio.Queue()
+        # Input is queued as handleMessage receives it, so that game threads can wait on it rather than polling
+        self.text_queue = Queue()
+        self.coords_queue = Queue()
+        self.text_received = asyncio.Event()
+        # Visuals waiting on input from any of a game's clients register an Event here to be woken
+        self.input_events = set()
+
+    def sendMessage(self, message):
+        """Queues a message for the event loop to send to the client, so that game threads can share visuals too
+        """
+        # Once the client has gone there is nothing left to send the messages, so they are dropped
+        if self.closed:
+            return
+        self.loop.call_soon_threadsafe(self.outbox.put_nowait, message)
+
+    async def send_messages(self):
+        """Sends the queued messages to the client, for as long as the connection lasts
+        """
+        while True:
+            message = await self.outbox.get()
+            await self.websocket.send(message)
+
+    async def receive_text(self):
+        """Waits for the next text input from this client, without holding up the event loop
+        """
+        while self.text_queue.empty():
+            self.text_received.clear()
+            await self.text_received.wait()
+        return self.text_queue.get_nowait()
+
+    def get_text(self, block=False, timeout=None):
+        """Takes the next text input from this client, waiting for it if asked to block, or None if there is none
+        """
+        if self.closed:
+            return None
+        try:
+            return self.text_queue.get(block, timeout)
+        except Empty:
+            return None
+
+    def get_coords(self, block=False, timeout=None):
+        """Takes the next click coordinates from this client, waiting for them if asked to block, or None if there are none
+        """
+        try:
+            return self.coords_queue.get(block, timeout)
+        except Empty:
+            return None
 
-    def get_text(self):
-        output = self.text_buffer
-        self.text_buffer = None
-        return output
+    def has_coords(self):
+        """Checks whether click coordinates have been received and not yet taken
+        """
+        return not self.coords_queue.empty()
 
-    def get_coords(self):
-        output = self.coords_buffer
-        self.coords_buffer = None
-        return output
+    def signal_input(self):
+        """Wakes any visuals that are waiting on input from this client
+        """
+        for input_event in list(self.input_events):
+            input_event.set()
 
     #    def init_ZMQ(self):
     #        '''Set up a socket with a secure threadsafe message queue based on ZeroMQ: https://en.wikipedia.org/wiki/ZeroMQ
@@ -139,7 +208,7 @@ class ClientSocket(WebSocket):
     #        self.width = "0"
     #        self.height = "0"
 
-    def setup_client_players(self, num_client_players):
+    async def setup_client_players(self, num_client_players):
         """Seeks remote input to determine the names of
         """
         global client_players
@@ -152,7 +221,7 @@ class ClientSocket(WebSocket):
             self.sendMessage("PROMPT[00100]" + prompt_text)
             print("Prompting client at " + str(self.address) + " with: " + prompt_text)
             while player_name is None:
-                player_name = self.get_text()
+                player_name = await self.receive_text()
                 if player_name is not None:
                     if len(player_name) > MAX_NAME_CHARS:
                         prompt_text = (player_name.capitalize() + " is too long. Pick a new name for the " + ORDINALS[
@@ -173,13 +242,11 @@ class ClientSocket(WebSocket):
                         break
                     self.sendMessage("PROMPT[00100]" + prompt_text)
                     print("Prompting client at " + str(self.address) + " with: " + prompt_text)
-                else:
-                    time.sleep(self.INPUT_DELAY)
             player = PlayerHuman(player_name)
             players[player_name] = player
             client_players[self].append(player)
 
-    def create_game(self, new_game_type="", num_client_players=None, num_virtual_players=0, num_players=None):
+    async def create_game(self, new_game_type="", num_client_players=None, num_virtual_players=0, num_players=None):
         """Seeks remote input to specify and set up a game that can then be joined by players.
         """
         global next_game_id, client_players
@@ -202,7 +269,7 @@ class ClientSocket(WebSocket):
             print("Prompting client at " + str(self.address) + " with: " + prompt_text)
             self.sendMessage("PROMPT[00100]" + prompt_text)
         while not new_game_type in valid_options:
-            new_game_type = self.get_text()
+            new_game_type = await self.receive_text()
             if new_game_type:
                 if new_game_type == "BLANK":
                     print("Game type prompt was left blank, so assuming default mode of " + DEFAULT_GAME_MODE)
@@ -210,12 +277,11 @@ class ClientSocket(WebSocket):
                 elif not new_game_type in valid_options:
                     new_game_type = None
                     self.sendMessage("PROMPT[00100]" + prompt_text)
-            time.sleep(self.INPUT_DELAY)
         # new_game_type = DEFAULT_GAME_MODE  # Deprecating multiple game modes
         new_game_types[game_id] = new_game_type
         min_players = GAME_MODES[new_game_type]["game_type"].MIN_PLAYERS
         max_players = GAME_MODES[new_game_type]["game_type"].MAX_PLAYERS
-        available_colours = random.sample(GAME_MODES[new_game_type]["player_set"].keys(), max_players)
+        available_colours = random.sample(list(GAME_MODES[new_game_type]["player_set"].keys()), max_players)
         new_game_colours[game_id] = []
         # Get remote user input about how many players they have at their end
         valid_options = [str(i) for i in range(1, max_players + 1)]
@@ -227,7 +293,7 @@ class ClientSocket(WebSocket):
             print("Prompting client at " + str(self.address) + " with: " + prompt_text)
             self.sendMessage("PROMPT[00100]" + prompt_text)
         while not str(num_client_players) in valid_options:
-            received_input = self.get_text()
+            received_input = await self.receive_text()
             if received_input:
                 if received_input.isnumeric():
                     num_client_players = int(received_input)
@@ -237,13 +303,11 @@ class ClientSocket(WebSocket):
                 else:
                     # For any input besides a number, assume the default
                     num_client_players = DEFAULT_LOCAL_PLAYERS
-            else:
-                time.sleep(self.INPUT_DELAY)
         # Name and set up these host human players
         if (client_players.get(self) is None
                 or not len(client_players[self]) == num_client_players):
             # Name and set up these host human players
-            self.setup_client_players(num_client_players)
+            await self.setup_client_players(num_client_players)
         # Assign colours to these local players
         new_game_players[game_id] = {}
         for player in client_players[self]:
@@ -261,7 +325,7 @@ class ClientSocket(WebSocket):
             self.sendMessage("PROMPT[00100]" + prompt_text)
             num_virtual_players = None
             while not str(num_virtual_players) in valid_options:
-                received_input = self.get_text()
+                received_input = await self.receive_text()
                 if received_input:
                     if received_input.isnumeric():
                         num_virtual_players = int(received_input)
@@ -272,8 +336,6 @@ class ClientSocket(WebSocket):
                         # For any input besides a number, assume the default, or the closest to it possible
                         num_virtual_players = practical_default
                         print("No viable option chosen, so defaulting to " + str(practical_default))
-                else:
-                    time.sleep(self.INPUT_DELAY)
         # Assign random names and colours to these CPU players
         if new_game_cpu_players.get(game_id) is None:
             new_game_cpu_players[game_id] = {}
@@ -302,7 +364,7 @@ class ClientSocket(WebSocket):
             self.sendMessage("PROMPT[00100]" + prompt_text)
             num_players = None
             while not num_players in range(min_players, max_players + 1):
-                received_input = self.get_text()
+                received_input = await self.receive_text()
                 if received_input:
                     if received_input.isnumeric():
                         num_players = num_client_players + num_virtual_players + int(received_input)
@@ -313,12 +375,10 @@ class ClientSocket(WebSocket):
                         # For any input besides a number, assume the default or the closest to it possible
                         num_players = num_client_players + num_virtual_players + practical_default
                         print("No viable option chosen, so defaulting to " + str(practical_default))
-                else:
-                    time.sleep(self.INPUT_DELAY)
             new_game_colours[game_id] = random.sample(available_colours, num_players - len(new_game_players[game_id]))
         return game_id
 
-    def join_game(self, game_id, num_client_players=None):
+    async def join_game(self, game_id, num_client_players=None):
         """Attempts to join a specific game, and otherwise joins the game queue
         """
         global client_players
@@ -345,7 +405,7 @@ class ClientSocket(WebSocket):
             print("Prompting client at " + str(self.address) + " with: " + prompt_text)
             self.sendMessage("PROMPT[00100]" + prompt_text)
             while not num_client_players in range(1, max_players + 1):
-                received_input = self.get_text()
+                received_input = await self.receive_text()
                 if received_input:
                     if received_input.isnumeric():
                         num_client_players = int(received_input)
@@ -356,14 +416,13 @@ class ClientSocket(WebSocket):
                         # For any input besides a number, assume the default
                         num_client_players = practical_default
                         print("No viable option chosen, so defaulting to " + str(practical_default))
-                else:
-                    time.sleep(self.INPUT_DELAY)
         # Check whether the players have been set up for this client
         if (client_players.get(self) is None
                 or not len(client_players[self]) == num_client_players):
             # Name and set up these host human players
-            self.setup_client_players(num_client_players)
-        # No blocking is done, check whether the number of spaces for this game has changed and start again if so
+            await self.setup_client_players(num_client_players)
+        # Other clients' coroutines may have joined while this one awaited input, so check whether the number of
+        # spaces for this game has changed and start again if so
         num_spaces = len(new_game_colours[game_id])
         num_existing_players = len(new_game_players[game_id])
         num_players = num_existing_players + num_spaces
@@ -371,9 +430,7 @@ class ClientSocket(WebSocket):
             prompt_text = (
                 "This game filled up while you were responding. Enter any response to continue and wait for another.")
             print("Prompting client at " + str(self.address) + " with: " + prompt_text)
-            response = None
-            while response is None:
-                response = self.get_text()
+            response = await self.receive_text()
             game_id = None
             return False
         # Assign colours to each new player
@@ -382,8 +439,8 @@ class ClientSocket(WebSocket):
             new_game_players[game_id][player] = player_colour
         return True
 
-    def join_queue(self):
-        """Adds players to a queue, the first specifies setup, the last hosts in their thread.
+    async def join_queue(self):
+        """Adds players to a queue, the first specifies setup, the last starts the game off.
         """
         global new_game_clients, new_game_types, new_game_colours, new_game_players
 
@@ -399,7 +456,7 @@ class ClientSocket(WebSocket):
         while not in_queue:
             if len(new_game_types) == 0 or len(tried_games) == len(new_game_types):
                 print("With no games queued up, configuring a new game.")
-                game_id = self.create_game()
+                game_id = await self.create_game()
                 # Notify the player that they are in the queue and how many more players are awaited
                 report_queue(self, game_id)
                 in_queue = True
@@ -410,8 +467,8 @@ class ClientSocket(WebSocket):
                 # Select a (semi-)random game to join
                 game_id = list(new_game_types.keys())[random.randint(0, len(new_game_types) - 1)]
 
-                # Now blocking is done, try to reserve a place in this game
-                if self.join_game(game_id):
+                # Try to reserve a place in this game, after awaiting input
+                if await self.join_game(game_id):
                     # Notify the client that they are in the queue and how many more players are awaited
                     new_game_clients[game_id].append(self)
                     for client in new_game_clients[game_id]:
@@ -420,7 +477,7 @@ class ClientSocket(WebSocket):
                 else:
                     tried_games.append(game_id)
         # If this client's game is now full then try to start it off
-        if not self.start_game(
+        if not await self.start_game(
                 game_id):  # testing the negative because otherwise it will take until game conclusion to return
             # Otherwise keep connection alive until a game is joined
             connection_alive = True
@@ -430,18 +487,18 @@ class ClientSocket(WebSocket):
                 connection_alive = self.connection_confirmed
                 self.connection_confirmed = False
                 self.sendMessage("PING[00100]")
-                time.sleep(self.TIMEOUT_DELAY)
+                await asyncio.sleep(self.TIMEOUT_DELAY)
             print(self.address, " timed out")
         else:
             return True
 
-    def start_game(self, game_id):
-        """Checks whether a game is full and launches it, then runs it in this thread until completion
+    async def start_game(self, game_id):
+        """Checks whether a game is full and launches it, then waits for a worker thread to play it to completion
 
         Arguments:
         game_id takes an integer unique reference for a Cartolan game in the global games list
         """
-        global clients, client_visuals, client_players, games
+        global client_players, games
         global new_game_clients, new_game_types, new_game_colours, new_game_players
         num_spaces = len(new_game_colours[game_id])
         if not num_spaces == 0:
@@ -465,51 +522,85 @@ class ClientSocket(WebSocket):
             , "clients": new_game_clients.pop(game_id)
                           }
         new_game_colours.pop(game_id)
+        game_clients_players = {client: client_players[client] for client in games[game_id]["clients"]}
+        game_future = self.loop.run_in_executor(game_executor, self.play_game, games[game_id], game_clients_players)
+        # Tidy up once the game is completed, even if this client has disconnected and stopped waiting on it
+        game_future.add_done_callback(lambda future: games.pop(game_id, None))
+        await asyncio.shield(game_future)
+        # Indicate that a game was joined and completed
+        return True
+
+    def play_game(self, game_data, game_clients_players):
+        """Sets up visuals for each client and plays a game to completion, in one of the worker threads
+
+        Arguments:
+        game_data takes a dict of the game's records from the global games list
+        game_clients_players takes a dict of the Cartolan players at each ClientSocket
+        """
         # Set up a visual tailored to each client's screen
-        clients = games[game_id]["clients"]
         visuals = []
-        for client in clients:
+        game_visuals = {}
+        for client in game_data["clients"]:
             # create game visualisation corresponding to each client's window resolution
-            game_vis = WebServerVisualisation(self.game, visuals, games[game_id]["player_colours"], client,
-                                              client.width, client.height)
+            game_vis = WebServerVisualisation(self.game, visuals, game_data["player_colours"], client,
+                                              client.width, client.height, FRAME_FORMAT, FRAME_QUALITY, client.protocol)
             print("Visual created for client at " + str(client.address) + " with dimensions: " + str(
                 client.width) + "x" + str(client.height))
-            client_visuals[client] = game_vis
+            game_visuals[client] = game_vis
             visuals.append(game_vis)
-            game_vis.client_players = client_players[client]
-            for player in client_players[client]:
+            game_vis.client_players = game_clients_players[client]
+            for player in game_clients_players[client]:
                 player.connect_gui(game_vis)
+        # The shared records are updated back on the event loop's thread
+        self.loop.call_soon_threadsafe(client_visuals.update, game_visuals)
 
         # start game in this thread including all the client visuals (so that the players created here are available
         # to just one thread)
         self.game.game_started = True
         self.game.turn = 0
         self.game.game_over = False
-        while not self.game.game_over:
-            self.game.turn += 1
-            self.game.game_over = self.game.play_round()
+        left_names = None
+        try:
+            while not self.game.game_over:
+                self.game.turn += 1
+                self.game.game_over = self.game.play_round()
+        except Exception:
+            # A game waiting on a client that has disconnected is ended, so that its thread is free for other games
+            closed_clients = [client for client in game_data["clients"] if client.closed]
+            if not closed_clients:
+                raise
+            self.game.game_over = True
+            left_names = [player.name for client in closed_clients for player in game_clients_players[client]
+                          if isinstance(player, PlayerHuman)]
+            print("Ending game, because players left: " + ", ".join(left_names))
+        for player in self.game.players:
+            player.end_game(self.game)
 
         # Inform all clients that the game has ended
-        win_message = self.game.winning_player.name + " won the game"
-        if self.game.wealth_difference >= self.game.game_winning_difference:
-            win_message += " by buying a global monopoly with their extra wealth"
+        if left_names is not None:
+            win_message = " and ".join(left_names) + " left, so the game has ended"
         else:
-            win_message += " as the richest when the world map was completed"
+            win_message = self.game.winning_player.name + " won the game"
+            if self.game.wealth_difference >= self.game.game_winning_difference:
+                win_message += " by buying a global monopoly with their extra wealth"
+            else:
+                win_message += " as the richest when the world map was completed"
         win_message += " (refresh to play again)"
-        for client in games[game_id]["clients"]:
+        for client in game_data["clients"]:
+            if client.closed:
+                continue
             print("Closing game for client: " + str(client.address))
-            game_vis = client_visuals[client]
+            game_vis = game_visuals[client]
             game_vis.draw_play_area()
             game_vis.draw_scores()
             game_vis.draw_tokens()
-            game_vis.current_player_colour = game_vis.player_colours[
-                self.game.winning_player]  # Change the prompt colour to reflect the winning player
+            if left_names is None:
+                game_vis.current_player_colour = game_vis.player_colours[
+                    self.game.winning_player]  # Change the prompt colour to reflect the winning player
             game_vis.give_prompt(win_message)
             game_vis.update_web_display()
-        game_vis.close()
-        # Tidy up and indicate that a game was joined and completed, and allow the thread to terminate
-        games.pop(game_id)
-        return True
+        for game_vis in visuals:
+            game_vis.close()
 
     def swap_player(self, game_id, old_player, new_player):
         """Introduces one player in place of another within a game.
@@ -531,6 +622,10 @@ class ClientSocket(WebSocket):
         for agent in agents:
             agent.player = new_player
         game.agents[new_player] = agents
+        for agent_records in [game.estimated_agent_network, game.estimated_agent_distances, game.agent_routes, game.estimated_route_values]:
+            agent_records[new_player] = agent_records.pop(old_player)
+        if game.estimated_most_lucrative_route_player == old_player:
+            game.estimated_most_lucrative_route_player = new_player
 
         # Remove old player from game and introduce the new player instead
         old_index = game.players.index(old_player)
@@ -563,16 +658,25 @@ class ClientSocket(WebSocket):
             #           #Check whether there are enough players in the queue for a game,
             #           #start one in a Thread if so
             #           #@TODO join specifically the game that has been asked for
-            self.width, self.height = [int(coord) for coord in msg.split("[55555]")]
-            print("Received width: ", self.width, " and height: ", self.height)
-            Thread(target=self.join_queue).start()
+            start_values = msg.split("[55555]")
+            self.width, self.height = [int(coord) for coord in start_values[:2]]
+            if len(start_values) > 2 and start_values[2] in WebServerVisualisation.PROTOCOLS:
+                self.protocol = start_values[2]
+            print("Received width: ", self.width, " and height: ", self.height, " for protocol: ", self.protocol)
+            self.lobby_task = asyncio.ensure_future(self.join_queue())
+        elif protocode == ("KEYFRAME"):
+            # The client's frames have got out of step, so the next update should send the whole frame
+            if self in client_visuals:
+                client_visuals[self].request_keyframe()
         elif protocode == ("PONG"):
             print("Client responded to ping")
             self.connection_confirmed = True
         elif protocode == ("TEXT"):
             print("TEXT... " + msg)
             if not msg == "":
-                self.text_buffer = msg
+                self.text_queue.put(msg)
+                self.text_received.set()
+                self.signal_input()
         #           msg = str(msg)
         #           ident, mdata = msg.split("[11111]")
         #           msg = ('%sSPLIT%s' % (ident, mdata))
@@ -583,11 +687,9 @@ class ClientSocket(WebSocket):
             print(time.strftime('%Y-%m-%d %H:%M %Z', time.gmtime(time.time())))  # timestamp
             try:
                 if len(input_coords) == 2:
-                    self.coords_buffer = []
-                    for coord in input_coords:
-                        self.coords_buffer.append(int(coord))
+                    self.coords_queue.put([int(coord) for coord in input_coords])
+                    self.signal_input()
             except:
-                self.coords_buffer = None
                 print("The client response could not be converted into a pair of integer coordinates.")
         #           msg = str(msg)
         #           ident, mdata = msg.split("[11111]")
@@ -655,20 +757,53 @@ class ClientSocket(WebSocket):
     #        channel.setup()
 
     def handleClose(self):
-        """Gracefully remove a client
+        """Gracefully remove a client, letting go of any game or lobby that is waiting on its input
         """
-        clients.pop(self)
+        self.closed = True
+        # Wake any game thread waiting on this client's input, which will then see that it has gone
+        self.text_queue.put(None)
+        self.signal_input()
+        # Games are shielded from this, so only a lobby still waiting on input is stopped
+        if self.lobby_task is not None:
+            self.lobby_task.cancel()
+        client_visuals.pop(self, None)
+        clients.remove(self)
         print(self.address, 'closed')
         for client in clients:
             client.sendMessage(self.address[0] + u' - disconnected')
 
 
+async def serve_client(websocket, path=None):
+    """Handles each message from a client connection as it arrives, while sending it anything queued for it
+    """
+    client = ClientSocket(websocket, asyncio.get_running_loop())
+    client.handleConnected()
+    sender = asyncio.ensure_future(client.send_messages())
+    try:
+        async for message in websocket:
+            client.data = message
+            client.handleMessage()
+    except websockets.ConnectionClosed:
+        pass
+    finally:
+        sender.cancel()
+        client.handleClose()
+
+
+async def main(port):
+    """Serves clients on the port until the server is stopped
+    """
+    async with websockets.serve(serve_client, '', port):
+        print("Starting server on port: ", port)
+        await asyncio.Future()  # run forever
+
+
 if __name__ == "__main__":
+    #Game events are logged by the rules modules, so keep reporting the main ones to the console
+    logging.basicConfig(level=logging.INFO)
     if len(sys.argv) > 1:
         print("Server port taken to be " + sys.argv[1])
         port = sys.argv[1]
     else:
         port = DEFAULT_PORT
-    server = SimpleWebSocketServer('', port, ClientSocket)
-    print("Starting server on port: ", port)
-    server.serveforever()
+    asyncio.run(main(port))